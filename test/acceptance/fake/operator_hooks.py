@@ -0,0 +1,284 @@
+"""
+Hooks of the fake API server standing in for the controllers the test steps rely on:
+
+* namespaces become Active,
+* deployments become Available right away and get a running pod, replaced whenever the pod template changes,
+* the Service Binding Operator collects the bindings of a ServiceBinding into a secret, injects the secret
+  into the application and sets the conditions of the ServiceBinding.
+
+The simulated operator covers the common cases only: bindings are collected from secrets and from the
+'service.binding' annotations of the services (mappings with Go templates are not evaluated) and the application
+is a deployment looked up by name.
+"""
+
+import base64
+import glob
+import hashlib
+import os
+import sys
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "features", "steps"))
+
+from jsonpath import jsonpath  # noqa: E402
+
+binding_groups = ("binding.operators.coreos.com", "servicebinding.io")
+crds_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "config", "crd", "bases")
+
+
+def short_hash(value, length=5):
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()[:length]
+
+
+def condition(type, status, reason="", message=""):
+    return {"type": type, "status": status, "reason": reason, "message": message}
+
+
+def encode(value):
+    return base64.b64encode(str(value).encode("utf-8")).decode("utf-8")
+
+
+def namespace_hook(store, event_type, resource, obj):
+    if resource.kind == "Namespace" and event_type != "DELETED" and obj.get("status", {}).get("phase") != "Active":
+        obj["status"] = {"phase": "Active"}
+        put_unless_changed(store, resource, obj)
+
+
+def deployment_hook(store, event_type, resource, obj):
+    if resource.kind != "Deployment":
+        return
+    pods = store.find_resource("", "v1", "pods")
+    namespace = obj["metadata"]["namespace"]
+    name = obj["metadata"]["name"]
+    owned = [pod for pod in store.list(pods, namespace) if pod["metadata"].get("labels", {}).get("fake/deployment") == name]
+    if event_type == "DELETED":
+        for pod in owned:
+            store.delete(pods, namespace, pod["metadata"]["name"])
+        return
+    template = obj["spec"].get("template", {})
+    pod_name = f"{name}-{short_hash(str(template), 10)}-{short_hash(name)}"
+    for pod in owned:
+        if pod["metadata"]["name"] != pod_name:
+            store.delete(pods, namespace, pod["metadata"]["name"])
+    labels = dict(template.get("metadata", {}).get("labels") or {}, **{"fake/deployment": name})
+    store.put(pods, {"metadata": {"name": pod_name, "namespace": namespace, "labels": labels},
+                     "spec": template.get("spec", {}), "status": {"phase": "Running"}})
+    replicas = obj["spec"].get("replicas", 1)
+    status = {"observedGeneration": obj["metadata"]["generation"], "replicas": replicas, "readyReplicas": replicas,
+              "availableReplicas": replicas, "updatedReplicas": replicas,
+              "conditions": [condition("Available", "True", "MinimumReplicasAvailable"), condition("Progressing", "True", "NewReplicaSetAvailable")]}
+    if obj.get("status") != status:
+        obj["status"] = status
+        put_unless_changed(store, resource, obj)
+
+
+def service_of(store, service, namespace):
+    """
+    Returns the object of the given service of the ServiceBinding, None if it does not exist.
+    """
+    if "apiVersion" in service:
+        api_version = service["apiVersion"]
+    else:
+        api_version = f"{service.get('group', '')}/{service['version']}".strip("/")
+    resource = store.find_kind(api_version, service["kind"])
+    if resource is None:
+        return None
+    return store.get(resource, service.get("namespace", namespace) if resource.namespaced else None, service["name"])
+
+
+def collect(store, service, namespace):
+    """
+    Returns the bindings of the given service object, as a dict of base64 encoded values.
+    """
+    secrets = store.find_resource("", "v1", "secrets")
+    configmaps = store.find_resource("", "v1", "configmaps")
+    if service["kind"] == "Secret":
+        return dict(service.get("data") or {})
+    bindings = {}
+    provisioned = service.get("status", {}).get("binding", {}).get("name")
+    if provisioned is not None:
+        secret = store.get(secrets, namespace, provisioned)
+        bindings.update(secret.get("data") or {} if secret is not None else {})
+    for annotation, value in (service["metadata"].get("annotations") or {}).items():
+        if not annotation.startswith("service.binding"):
+            continue
+        key = annotation.partition("/")[2]
+        options = dict(option.partition("=")[::2] for option in value.split(","))
+        if "path" not in options:
+            continue
+        found = jsonpath(service, options["path"])
+        if options.get("objectType") in ("Secret", "ConfigMap"):
+            referred = store.get(secrets if options["objectType"] == "Secret" else configmaps, namespace, found)
+            if referred is None:
+                continue
+            data = referred.get("data") or {}
+            if options["objectType"] == "ConfigMap":
+                data = {k: encode(v) for k, v in data.items()}
+            if options.get("sourceKey"):
+                bindings[key or options["sourceKey"]] = data.get(options["sourceKey"], "")
+            else:
+                bindings.update(data)
+        elif key:
+            bindings[key] = encode(found)
+    return bindings
+
+
+def workload_of(store, sb, namespace):
+    spec = sb["spec"]
+    deployments = store.find_resource("apps", "v1", "deployments")
+    workload = spec.get("workload") or spec.get("application") or {}
+    if "name" not in workload:
+        return None
+    return store.get(deployments, namespace, workload["name"])
+
+
+def inject(container, volumes, sb, secret_name, bind_as_files):
+    """
+    Injects the secret into the container the way the operator does: as environment variables or as files
+    mounted under $SERVICE_BINDING_ROOT.
+    """
+    name = sb["metadata"]["name"]
+    if not bind_as_files:
+        env_from = container.setdefault("envFrom", [])
+        if {"secretRef": {"name": secret_name}} not in env_from:
+            env_from.append({"secretRef": {"name": secret_name}})
+        return
+    env = container.setdefault("env", [])
+    root = next((e.get("value") for e in env if e["name"] == "SERVICE_BINDING_ROOT"), None)
+    if root is None:
+        root = "/bindings"
+        env.append({"name": "SERVICE_BINDING_ROOT", "value": root})
+    mounts = container.setdefault("volumeMounts", [])
+    if not any(m["name"] == name for m in mounts):
+        mounts.append({"name": name, "mountPath": f"{root}/{name}"})
+    if not any(v["name"] == name for v in volumes):
+        volumes.append({"name": name, "secret": {"secretName": secret_name}})
+
+
+def eject(container, volumes, sb, secret_name):
+    name = sb["metadata"]["name"]
+    container["envFrom"] = [e for e in container.get("envFrom", []) if e.get("secretRef", {}).get("name") != secret_name]
+    container["volumeMounts"] = [m for m in container.get("volumeMounts", []) if m["name"] != name]
+    volumes[:] = [v for v in volumes if v["name"] != name]
+
+
+def update_workload(store, workload, change):
+    deployments = store.find_resource("apps", "v1", "deployments")
+    pod_spec = workload["spec"]["template"].setdefault("spec", {})
+    volumes = pod_spec.setdefault("volumes", [])
+    for container in pod_spec.get("containers", []):
+        change(container, volumes)
+    put_unless_changed(store, deployments, workload)
+
+
+def reconcile(store, resource, sb):
+    namespace = sb["metadata"]["namespace"]
+    name = sb["metadata"]["name"]
+    spec = sb["spec"]
+    secrets = store.find_resource("", "v1", "secrets")
+    secret_name = f"{name}-{short_hash(name)}"
+    status = dict(sb.get("status") or {}, observedGeneration=sb["metadata"]["generation"])
+    services = spec.get("services") or ([spec["service"]] if "service" in spec else [])
+    bindings = {}
+    provisioned = None
+    for service in services:
+        obj = service_of(store, service, namespace)
+        if obj is None:
+            status["conditions"] = [condition("CollectionReady", "False", "ServiceNotFound", f"{service['kind']} {service['name']} not found"),
+                                    condition("InjectionReady", "False", "ServiceNotFound"), condition("Ready", "False", "ServiceNotFound")]
+            return set_status(store, resource, sb, status)
+        collected = collect(store, obj, service.get("namespace", namespace))
+        if resource.group == "binding.operators.coreos.com" and not spec.get("bindAsFiles", True):
+            prefix = service.get("id") or obj["kind"]
+            collected = {f"{prefix}_{key}".upper(): value for key, value in collected.items()}
+        bindings.update(collected)
+        provisioned = obj.get("status", {}).get("binding", {}).get("name") if len(services) == 1 else None
+    for mapping in spec.get("mappings") or []:
+        if "{{" not in mapping.get("value", ""):
+            bindings[mapping["name"]] = encode(mapping["value"])
+    for field in ("type", "provider"):
+        if field in spec:
+            bindings[field] = encode(spec[field])
+    if provisioned is not None and not spec.get("mappings") and "type" not in spec and "provider" not in spec:
+        # nothing to add to the secret of a provisioned service, so it is bound as it is
+        secret_name = provisioned
+    else:
+        store.put(secrets, {"metadata": {"name": secret_name, "namespace": namespace, "labels": {"fake/servicebinding": name}},
+                            "type": "Opaque", "data": bindings})
+    if resource.group == "servicebinding.io":
+        status["binding"] = {"name": secret_name}
+    else:
+        status["secret"] = secret_name
+    workload = workload_of(store, sb, namespace)
+    if workload is None:
+        status["conditions"] = [condition("CollectionReady", "True", "DataCollected"),
+                                condition("InjectionReady", "False", "ApplicationNotFound", "Application not found"),
+                                condition("Ready", "False", "ApplicationNotFound")]
+        return set_status(store, resource, sb, status)
+    bind_as_files = spec.get("bindAsFiles", True) or resource.group == "servicebinding.io"
+    update_workload(store, workload, lambda container, volumes: inject(container, volumes, sb, secret_name, bind_as_files))
+    status["conditions"] = [condition("CollectionReady", "True", "DataCollected"), condition("InjectionReady", "True", "ApplicationsBound"),
+                            condition("Ready", "True", "ApplicationsBound")]
+    set_status(store, resource, sb, status)
+
+
+def set_status(store, resource, sb, status):
+    if sb.get("status") != status:
+        sb["status"] = status
+        put_unless_changed(store, resource, sb)
+
+
+def put_unless_changed(store, resource, obj):
+    """
+    Stores the object unless it has been changed meanwhile, in which case the change gets reconciled on its own.
+    """
+    metadata = obj["metadata"]
+    with store.lock:
+        current = store.get(resource, metadata.get("namespace"), metadata["name"])
+        if current is not None and current["metadata"]["resourceVersion"] == metadata["resourceVersion"]:
+            store.put(resource, obj)
+
+
+def unbind(store, sb):
+    namespace = sb["metadata"]["namespace"]
+    status = sb.get("status") or {}
+    secret_name = status.get("secret") or status.get("binding", {}).get("name")
+    if secret_name is None:
+        return
+    secrets = store.find_resource("", "v1", "secrets")
+    secret = store.get(secrets, namespace, secret_name)
+    if secret is not None and secret["metadata"].get("labels", {}).get("fake/servicebinding") == sb["metadata"]["name"]:
+        store.delete(secrets, namespace, secret_name)
+    workload = workload_of(store, sb, namespace)
+    if workload is not None:
+        update_workload(store, workload, lambda container, volumes: eject(container, volumes, sb, secret_name))
+
+
+def service_binding_hook(store, event_type, resource, obj):
+    if resource.kind == "ServiceBinding" and resource.group in binding_groups:
+        if event_type == "DELETED":
+            unbind(store, obj)
+        else:
+            reconcile(store, resource, obj)
+        return
+    namespace = obj["metadata"].get("namespace")
+    if namespace is None or obj["metadata"].get("labels", {}).get("fake/servicebinding") is not None:
+        return
+    # any other change in the namespace might be a service or an application a binding waits for
+    for group, version in (("binding.operators.coreos.com", "v1alpha1"), ("servicebinding.io", "v1alpha3")):
+        bindings = store.find_resource(group, version, "servicebindings")
+        for sb in store.list(bindings, namespace) if bindings is not None else []:
+            reconcile(store, bindings, sb)
+
+
+def register(store):
+    """
+    Installs the CRDs of the operator and its hooks.
+    """
+    crds = store.find_resource("apiextensions.k8s.io", "v1", "customresourcedefinitions")
+    for path in sorted(glob.glob(os.path.join(crds_dir, "*.yaml"))):
+        with open(path, "r") as f:
+            crd = yaml.safe_load(f)
+        crd.pop("status", None)
+        store.put(crds, crd)
+    store.hooks.extend([namespace_hook, deployment_hook, service_binding_hook])
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Fake Kubernetes API server keeping all the objects in memory, for running the test steps without a cluster.
+
+It serves the subset of the API used by the steps: discovery (built-in resources plus the ones registered by CRDs),
+get, list (with label and name selectors), watch, create, server-side apply, merge and JSON patch and delete.
+Instead of controllers, hooks (see operator_hooks.py) react to the changes of the objects, e.g. the simulated operator
+collects the bindings of the ServiceBindings into secrets and sets their conditions.
+
+Usage:
+    server.py [--port PORT] [--kubeconfig FILE] [--namespace NAMESPACE] [--hooks MODULE ...]
+
+The kubeconfig written to FILE points to the server, so both the REST client of the steps and the fake CLI
+(bin/kubectl, bin/oc) can be used with it.
+"""
+
+import argparse
+import base64
+import copy
+import importlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+import yaml
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# group, version, plural, kind, namespaced, short names
+builtin_resources = [
+    ("", "v1", "namespaces", "Namespace", False, ["ns"]),
+    ("", "v1", "pods", "Pod", True, ["po"]),
+    ("", "v1", "secrets", "Secret", True, []),
+    ("", "v1", "configmaps", "ConfigMap", True, ["cm"]),
+    ("", "v1", "services", "Service", True, ["svc"]),
+    ("", "v1", "serviceaccounts", "ServiceAccount", True, ["sa"]),
+    ("", "v1", "nodes", "Node", False, ["no"]),
+    ("apps", "v1", "deployments", "Deployment", True, ["deploy"]),
+    ("rbac.authorization.k8s.io", "v1", "roles", "Role", True, []),
+    ("rbac.authorization.k8s.io", "v1", "rolebindings", "RoleBinding", True, []),
+    ("rbac.authorization.k8s.io", "v1", "clusterroles", "ClusterRole", False, []),
+    ("rbac.authorization.k8s.io", "v1", "clusterrolebindings", "ClusterRoleBinding", False, []),
+    ("apiextensions.k8s.io", "v1", "customresourcedefinitions", "CustomResourceDefinition", False, ["crd", "crds"]),
+]
+
+
+class Resource(object):
+
+    def __init__(self, group, version, plural, kind, namespaced, short_names):
+        self.group = group
+        self.version = version
+        self.plural = plural
+        self.kind = kind
+        self.namespaced = namespaced
+        self.short_names = short_names
+
+    def api_version(self):
+        return f"{self.group}/{self.version}" if self.group else self.version
+
+    def qualified_name(self):
+        return f"{self.plural}.{self.group}" if self.group else self.plural
+
+    def to_dict(self):
+        return {"name": self.plural, "singularName": self.kind.lower(), "kind": self.kind, "namespaced": self.namespaced,
+                "shortNames": self.short_names, "verbs": ["create", "delete", "get", "list", "patch", "update", "watch"]}
+
+
+class Store(object):
+    """
+    The objects keyed by (group, plural, namespace, name), along with the history of their changes for the watches.
+    Every change is also passed to the hooks, one at a time and in order, by a worker thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Condition(threading.RLock())
+        self.resource_version = 100
+        self.objects = {}
+        self.events = []
+        # the watches starting from a resourceVersion older than this one have expired
+        self.compacted = 0
+        self.resources = [Resource(*r) for r in builtin_resources]
+        self.hooks = []
+        self.changes = queue.Queue()
+        threading.Thread(target=self.run_hooks, daemon=True).start()
+
+    def find_resource(self, group, version, plural):
+        for resource in self.resources:
+            if resource.group == group and resource.version == version and resource.plural == plural:
+                return resource
+        return None
+
+    def find_kind(self, api_version, kind):
+        group, _, version = api_version.rpartition("/")
+        for resource in self.resources:
+            if resource.group == group and resource.version == version and resource.kind == kind:
+                return resource
+        return None
+
+    def register(self, crd):
+        spec = crd["spec"]
+        for version in spec.get("versions") or [{"name": spec.get("version")}]:
+            if self.find_resource(spec["group"], version["name"], spec["names"]["plural"]) is None:
+                self.resources.append(Resource(spec["group"], version["name"], spec["names"]["plural"], spec["names"]["kind"],
+                                               spec.get("scope", "Namespaced") == "Namespaced", spec["names"].get("shortNames", [])))
+
+    def get(self, resource, namespace, name):
+        with self.lock:
+            obj = self.objects.get((resource.group, resource.plural, namespace, name))
+            return copy.deepcopy(obj) if obj is not None else None
+
+    def list(self, resource, namespace=None):
+        with self.lock:
+            return [copy.deepcopy(obj) for (group, plural, ns, _), obj in sorted(self.objects.items(), key=lambda item: (item[0][2] or "", item[0][3]))
+                    if group == resource.group and plural == resource.plural and (namespace is None or ns == namespace)]
+
+    def put(self, resource, obj):
+        """
+        Stores the object (setting its system fields) and returns the stored copy, None if the object has not changed.
+        """
+        metadata = obj.setdefault("metadata", {})
+        obj["apiVersion"] = resource.api_version()
+        obj["kind"] = resource.kind
+        if resource.kind == "Secret" and "stringData" in obj:
+            # the same as the real API server, the string data is stored encoded along with the rest of the data
+            string_data = {key: base64.b64encode(str(value).encode("utf-8")).decode("utf-8") for key, value in (obj.pop("stringData") or {}).items()}
+            obj["data"] = dict(obj.get("data") or {}, **string_data)
+        key = (resource.group, resource.plural, metadata.get("namespace") if resource.namespaced else None, metadata["name"])
+        with self.lock:
+            current = self.objects.get(key)
+            if current is not None:
+                if without_system_fields(current) == without_system_fields(obj):
+                    return None
+                for field in ("uid", "creationTimestamp"):
+                    metadata[field] = current["metadata"][field]
+                generation = current["metadata"].get("generation", 1)
+                metadata["generation"] = generation + 1 if current.get("spec") != obj.get("spec") else generation
+            else:
+                metadata["uid"] = str(uuid.uuid4())
+                metadata["creationTimestamp"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                metadata["generation"] = 1
+            self.resource_version += 1
+            metadata["resourceVersion"] = str(self.resource_version)
+            self.objects[key] = obj
+            self.changed("ADDED" if current is None else "MODIFIED", resource, obj)
+            if resource.kind == "CustomResourceDefinition":
+                self.register(obj)
+            return copy.deepcopy(obj)
+
+    def delete(self, resource, namespace, name):
+        with self.lock:
+            obj = self.objects.pop((resource.group, resource.plural, namespace, name), None)
+            if obj is None:
+                return None
+            self.resource_version += 1
+            obj["metadata"]["resourceVersion"] = str(self.resource_version)
+            self.changed("DELETED", resource, obj)
+            if resource.kind == "Namespace":
+                for key in [key for key in self.objects if key[2] == name]:
+                    self.delete(self.find_plural(key[0], key[1]), key[2], key[3])
+            return obj
+
+    def find_plural(self, group, plural):
+        return next(r for r in self.resources if r.group == group and r.plural == plural)
+
+    def changed(self, event_type, resource, obj):
+        self.events.append((int(obj["metadata"]["resourceVersion"]), event_type, resource, copy.deepcopy(obj)))
+        self.lock.notify_all()
+        self.changes.put((event_type, resource, copy.deepcopy(obj)))
+
+    def run_hooks(self):
+        while True:
+            event_type, resource, obj = self.changes.get()
+            for hook in self.hooks:
+                try:
+                    hook(self, event_type, resource, obj)
+                except Exception as err:  # a broken hook should not bring the whole server down
+                    print(f"Hook {hook.__name__} failed on {resource.kind} {obj['metadata']['name']}: {err!r}", file=sys.stderr)
+
+    def events_since(self, resource_version):
+        return [event for event in self.events if event[0] > resource_version]
+
+    def compact(self):
+        """
+        Drops the history of the changes the same way the compaction of etcd does: the watches from any resourceVersion
+        older than the next one, including those in progress, expire (410 Gone) and their clients have to list again.
+        """
+        with self.lock:
+            self.events = []
+            self.resource_version += 1
+            self.compacted = self.resource_version
+            self.lock.notify_all()
+
+
+def without_system_fields(obj):
+    obj = copy.deepcopy(obj)
+    for field in ("resourceVersion", "generation", "uid", "creationTimestamp", "managedFields"):
+        obj.get("metadata", {}).pop(field, None)
+    return obj
+
+
+def merge(target, patch):
+    """
+    Merges the patch into the target the way a JSON merge patch does (null removes the field).
+    """
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge(target[key], value)
+        elif value is None:
+            target.pop(key, None)
+        else:
+            target[key] = copy.deepcopy(value)
+    return target
+
+
+def json_patch(target, operations):
+    """
+    Applies the add, replace and remove operations of a JSON patch to the target.
+    """
+    for operation in operations:
+        *parents, last = [p.replace("~1", "/").replace("~0", "~") for p in operation["path"].lstrip("/").split("/")]
+        parent = target
+        for p in parents:
+            parent = parent[int(p)] if isinstance(parent, list) else parent[p]
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if operation["op"] == "add":
+                parent.insert(index, copy.deepcopy(operation["value"]))
+            elif operation["op"] == "replace":
+                parent[index] = copy.deepcopy(operation["value"])
+            elif operation["op"] == "remove":
+                del parent[index]
+            else:
+                raise ValueError(f"unsupported operation {operation['op']}")
+        elif operation["op"] in ("add", "replace"):
+            parent[last] = copy.deepcopy(operation["value"])
+        elif operation["op"] == "remove":
+            del parent[last]
+        else:
+            raise ValueError(f"unsupported operation {operation['op']}")
+    return target
+
+
+def matches_labels(obj, selector):
+    labels = obj["metadata"].get("labels") or {}
+    for requirement in selector.split(","):
+        key, op, value = requirement.partition("!=") if "!=" in requirement else requirement.partition("=")
+        key = key.strip()
+        if op == "":
+            if key.startswith("!"):
+                if key[1:] in labels:
+                    return False
+            elif key not in labels:
+                return False
+        elif op == "!=" and labels.get(key) == value.lstrip("="):
+            return False
+        elif op == "=" and labels.get(key) != value.lstrip("="):
+            return False
+    return True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    store = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, code, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def status(self, code, reason, message):
+        self.send(code, {"kind": "Status", "apiVersion": "v1", "status": "Failure", "reason": reason, "message": message, "code": code})
+
+    def parse(self):
+        url = urlparse(self.path)
+        return [p for p in url.path.split("/") if p], {k: v[0] for k, v in parse_qs(url.query).items()}
+
+    def route(self, parts):
+        """
+        Returns the resource, namespace and name addressed by the path, e.g. /apis/apps/v1/namespaces/foo/deployments/bar.
+        """
+        if parts[0] == "api":
+            group, version, rest = "", parts[1], parts[2:]
+        else:
+            group, version, rest = parts[1], parts[2], parts[3:]
+        namespace = None
+        if len(rest) >= 3 and rest[0] == "namespaces":
+            namespace, rest = rest[1], rest[2:]
+        resource = self.store.find_resource(group, version, rest[0]) if len(rest) > 0 else None
+        return resource, namespace, rest[1] if len(rest) > 1 else None
+
+    def body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return yaml.safe_load(self.rfile.read(length)) if length > 0 else None
+
+    def do_GET(self):
+        parts, query = self.parse()
+        if parts == ["api"]:
+            return self.send(200, {"kind": "APIVersions", "versions": ["v1"]})
+        if parts == ["apis"]:
+            return self.send(200, self.group_list())
+        if parts == ["api", "v1"] or (len(parts) == 3 and parts[0] == "apis"):
+            return self.resource_list("" if parts[0] == "api" else parts[1], parts[-1])
+        if parts == ["version"]:
+            return self.send(200, {"major": "1", "minor": "22", "gitVersion": "v1.22.0-fake"})
+        resource, namespace, name = self.route(parts)
+        if resource is None:
+            return self.status(404, "NotFound", "the server could not find the requested resource")
+        if query.get("watch") in ("true", "1"):
+            return self.watch(resource, namespace, query)
+        if name is not None:
+            obj = self.store.get(resource, namespace, name)
+            if obj is None:
+                return self.status(404, "NotFound", f'{resource.qualified_name()} "{name}" not found')
+            return self.send(200, obj)
+        items = self.store.list(resource, namespace)
+        if query.get("labelSelector"):
+            items = [obj for obj in items if matches_labels(obj, query["labelSelector"])]
+        field_selector = query.get("fieldSelector", "")
+        if field_selector.startswith("metadata.name="):
+            items = [obj for obj in items if obj["metadata"]["name"] == field_selector.partition("=")[2]]
+        self.send(200, {"kind": f"{resource.kind}List", "apiVersion": resource.api_version(),
+                        "metadata": {"resourceVersion": str(self.store.resource_version)}, "items": items})
+
+    def group_list(self):
+        groups = {}
+        for resource in self.store.resources:
+            if resource.group != "":
+                groups.setdefault(resource.group, [])
+                if resource.version not in groups[resource.group]:
+                    groups[resource.group].append(resource.version)
+        return {"kind": "APIGroupList", "apiVersion": "v1", "groups": [
+            {"name": group, "versions": [{"groupVersion": f"{group}/{v}", "version": v} for v in versions],
+             "preferredVersion": {"groupVersion": f"{group}/{versions[0]}", "version": versions[0]}} for group, versions in groups.items()]}
+
+    def resource_list(self, group, version):
+        resources = [r.to_dict() for r in self.store.resources if r.group == group and r.version == version]
+        if len(resources) == 0:
+            return self.status(404, "NotFound", "the server could not find the requested resource")
+        self.send(200, {"kind": "APIResourceList", "apiVersion": "v1", "groupVersion": f"{group}/{version}".strip("/"), "resources": resources})
+
+    def watch(self, resource, namespace, query):
+        resource_version = int(query.get("resourceVersion") or self.store.resource_version)
+        deadline = time.monotonic() + float(query.get("timeoutSeconds", "300"))
+        field_selector = query.get("fieldSelector", "")
+        name = field_selector.partition("=")[2] if field_selector.startswith("metadata.name=") else None
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            with self.store.lock:
+                while time.monotonic() < deadline:
+                    if resource_version < self.store.compacted:
+                        self.chunk({"type": "ERROR", "object": {"kind": "Status", "apiVersion": "v1", "status": "Failure", "code": 410,
+                                                                "reason": "Expired", "message": f"too old resource version: {resource_version}"}})
+                        break
+                    for event_resource_version, event_type, event_resource, obj in self.store.events_since(resource_version):
+                        resource_version = event_resource_version
+                        if event_resource is not resource or (namespace is not None and obj["metadata"].get("namespace") != namespace):
+                            continue
+                        if name is not None and obj["metadata"]["name"] != name:
+                            continue
+                        self.chunk({"type": event_type, "object": obj})
+                    self.store.lock.wait(max(0, min(1, deadline - time.monotonic())))
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def chunk(self, event):
+        data = (json.dumps(event) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        parts, _ = self.parse()
+        resource, namespace, _ = self.route(parts)
+        if resource is None:
+            return self.status(404, "NotFound", "the server could not find the requested resource")
+        obj = self.body()
+        if namespace is not None:
+            obj["metadata"]["namespace"] = namespace
+        with self.store.lock:
+            if self.store.get(resource, namespace, obj["metadata"]["name"]) is not None:
+                return self.status(409, "AlreadyExists", f'{resource.qualified_name()} "{obj["metadata"]["name"]}" already exists')
+            self.send(201, self.store.put(resource, obj))
+
+    def do_PATCH(self):
+        parts, query = self.parse()
+        resource, namespace, name = self.route(parts)
+        if resource is None:
+            return self.status(404, "NotFound", "the server could not find the requested resource")
+        patch = self.body()
+        with self.store.lock:
+            current = self.store.get(resource, namespace, name)
+            if self.headers.get("Content-Type", "").startswith("application/apply-patch"):
+                # server-side apply, simplified to merging the applied configuration into the current object
+                obj = merge(current, patch) if current is not None else patch
+                if namespace is not None:
+                    obj.setdefault("metadata", {})["namespace"] = namespace
+            elif current is None:
+                return self.status(404, "NotFound", f'{resource.qualified_name()} "{name}" not found')
+            elif self.headers.get("Content-Type", "").startswith("application/json-patch"):
+                try:
+                    obj = json_patch(current, patch)
+                except (KeyError, IndexError, ValueError) as err:
+                    return self.status(422, "Invalid", f"the JSON patch cannot be applied: {err!r}")
+            else:
+                obj = merge(current, patch)
+            stored = self.store.put(resource, obj)
+            self.send(201 if current is None else 200, stored if stored is not None else self.store.get(resource, namespace, name))
+
+    def do_DELETE(self):
+        parts, _ = self.parse()
+        resource, namespace, name = self.route(parts)
+        if resource is None:
+            return self.status(404, "NotFound", "the server could not find the requested resource")
+        obj = self.store.delete(resource, namespace, name)
+        if obj is None:
+            return self.status(404, "NotFound", f'{resource.qualified_name()} "{name}" not found')
+        self.send(200, {"kind": "Status", "apiVersion": "v1", "status": "Success", "details": {"name": name, "kind": resource.plural}})
+
+
+def serve(store, port=0):
+    """
+    Starts serving the store on the given port (any free port by default) in a background thread and returns the server.
+    """
+    handler = type("StoreHandler", (Handler,), {"store": store})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_kubeconfig(path, port, namespace):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        yaml.safe_dump({"apiVersion": "v1", "kind": "Config", "current-context": "fake",
+                        "clusters": [{"name": "fake", "cluster": {"server": f"http://127.0.0.1:{port}"}}],
+                        "users": [{"name": "developer", "user": {"token": "fake"}}],
+                        "contexts": [{"name": "fake", "context": {"cluster": "fake", "user": "developer", "namespace": namespace}}]}, f)
+
+
+def new_store(namespace="default", hook_modules=()):
+    """
+    Returns a store with the default and the given namespaces and the hooks of the simulated operator (operator_hooks.py)
+    as well as of the given modules (each of them having a register(store) function).
+    """
+    store = Store()
+    for module in ("operator_hooks",) + tuple(hook_modules):
+        importlib.import_module(module).register(store)
+    namespaces = store.find_resource("", "v1", "namespaces")
+    for name in sorted({"default", namespace}):
+        store.put(namespaces, {"metadata": {"name": name}, "spec": {}, "status": {"phase": "Active"}})
+    # the node the NodePort services are exposed on
+    node = {"metadata": {"name": "fake-node"}, "spec": {}, "status": {"addresses": [{"type": "InternalIP", "address": "127.0.0.1"}]}}
+    store.put(store.find_resource("", "v1", "nodes"), node)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves an in-memory fake Kubernetes API.")
+    parser.add_argument("--port", type=int, default=0, help="port to listen on, any free port by default")
+    parser.add_argument("--kubeconfig", default=os.path.join("out", "fake", "kubeconfig"), help="kubeconfig file to write")
+    parser.add_argument("--namespace", default=os.getenv("TEST_NAMESPACE", "default"), help="namespace of the kubeconfig context")
+    parser.add_argument("--hooks", action="append", default=[], help="module with additional hooks, can be given several times")
+    args = parser.parse_args()
+    store = new_store(args.namespace, args.hooks)
+    server = serve(store, args.port)
+    write_kubeconfig(args.kubeconfig, server.server_port, args.namespace)
+    print(f"Serving fake API at http://127.0.0.1:{server.server_port}, KUBECONFIG={os.path.abspath(args.kubeconfig)}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
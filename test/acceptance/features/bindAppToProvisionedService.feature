@@ -1,3 +1,4 @@
+@exclusive
 Feature: Bind application to provisioned service
 
   As a user I would like to bind my applications to provisioned services, as defined by the binding spec
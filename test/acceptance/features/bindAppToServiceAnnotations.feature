@@ -1,4 +1,5 @@
 @annotations
+@exclusive
 Feature: Bind an application to a service using annotations
 
     As a user of Service Binding Operator
@@ -103,10 +104,12 @@ Feature: Bind an application to a service using annotations
             """
 
         Then Service Binding is ready
-        And The application env var "BACKEND_READY" has value "true"
-        And The application env var "BACKEND_HOST" has value "example.common"
-        And The application env var "BACKEND_ENVIRONMENT" has value "staging"
-        And The application env var "BACKEND_DATATYPE" has value "base64"
+        And The application env vars have values
+            | name                | value          |
+            | BACKEND_READY       | true           |
+            | BACKEND_HOST        | example.common |
+            | BACKEND_ENVIRONMENT | staging        |
+            | BACKEND_DATATYPE    | base64         |
 
     Scenario: Each value in referred map from service resource gets injected into app as separate env variable
         Given Generic test application is running
@@ -1,3 +1,4 @@
+@exclusive
 Feature: Bind values from a config map referred in backing service resource
 
     As a user I would like to inject into my app as env variables
@@ -1,3 +1,4 @@
+@exclusive
 Feature: Discover bindable resources in a cluster
 
     As a user of Service Binding Operator
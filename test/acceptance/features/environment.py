@@ -12,21 +12,41 @@ before_all(context), after_all(context)
     These run before and after the whole shooting match.
 """
 
-from steps.command import Command
-from steps.environment import ctx
-
+import json
 import os
-import semver
+import sys
+
+# Import the step modules the same way the steps import each other,
+# so that the hooks share the very same module state with the steps.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "steps"))
+
+from command import Command  # noqa: E402
+from environment import ctx  # noqa: E402
+from openshift import Openshift  # noqa: E402
+from util import scenario_id_of  # noqa: E402
+
+import cassette  # noqa: E402
+import deferred  # noqa: E402
+import fixtures  # noqa: E402
+import informer  # noqa: E402
+import package_manifests  # noqa: E402
+import profiler  # noqa: E402
+import step_metrics  # noqa: E402
+import teardown  # noqa: E402
+import tracer  # noqa: E402
+import warm_pool  # noqa: E402
+import semver  # noqa: E402
 
 cmd = Command()
 
 
 def before_all(_context):
+    tracer.begin("run", "acceptance tests")
     if ctx.cli == "oc":
-        output, code = cmd.run("oc version --client | grep Client")
+        output, code = cmd.run("oc version --client")
         assert code == 0, f"Checking oc version failed: {output}"
 
-        oc_ver = output.split()[2]
+        oc_ver = [line for line in output.splitlines() if line.startswith("Client")][0].split()[2]
         assert semver.compare(oc_ver, "4.5.0") > 0, f"oc version is required 4.5+, but is {oc_ver}."
 
         namespace = os.getenv("TEST_NAMESPACE")
@@ -40,18 +60,88 @@ def before_all(_context):
     if start_sbo == "local":
         assert not str(os.getenv("TEST_ACCEPTANCE_SBO_STARTED")).startswith("FAILED"), "TEST_ACCEPTANCE_SBO_STARTED shoud not be FAILED."
     elif start_sbo == "remote":
-        output, code = cmd.run(
-            f"{ctx.cli} get deployment --all-namespaces -o json"
-            + " | jq -rc '.items[] | select(.metadata.name == \"service-binding-operator\").metadata.namespace'")
-        assert code == 0, f"Non-zero return code while trying to detect namespace for SBO: {output}"
-        output = str(output).strip()
-        assert output != "", "Unable to find SBO's deployment in any namespace."
+        output = Openshift().lookup_namespace_for_resource("deployments", "service-binding-operator")
+        assert output is not None, "Unable to find SBO's deployment in any namespace."
         _context.sbo_namespace = output
     else:
         assert False, f"TEST_ACCEPTANCE_START_SBO={start_sbo} is currently unsupported."
 
+    # the commands of the pools and of the teardown run in the background, so they cannot be replayed in the order they were recorded
+    if cassette.mode() is None:
+        warm_pool.start(_context._runner.features, _context._runner.step_registry, _context.config)
+        teardown.start(_context._runner.features, _context._runner.step_registry, _context.config)
+
+
+def before_feature(_context, feature):
+    tracer.begin("feature", feature.name, location=str(feature.location))
+
+
+def after_feature(_context, feature):
+    fixtures.invalidate(scope="feature")
+    tracer.end("feature", status=feature.status.name)
+
 
 def before_scenario(_context, _scenario):
+    tracer.begin("scenario", _scenario.name, location=str(_scenario.location))
+    cassette.start(scenario_id_of(_scenario))
+    deferred.reset()
+    if cassette.mode() is not None:
+        # the package manifests are listed by each scenario, the same as when its cassette has been recorded
+        package_manifests.clear()
     _context.bindings = dict()
+    _context.applied = dict()
+    _context.secret_snapshots = dict()
     output, code = cmd.run(f'{ctx.cli} get ns default -o jsonpath="{{.metadata.name}}"')
     assert code == 0, f"Checking connection to OS cluster by getting the 'default' project failed: {output}"
+
+
+def before_step(_context, step):
+    _context.current_step = step
+    match = _context._runner.step_registry.find_match(step)
+    step_metrics.start(step, _context.scenario.name, f"{match.func.__name__} ({match.location})" if match is not None else None)
+    tracer.begin("step", f"{step.keyword} {step.name}", location=str(step.location))
+    deferred.before_step(step, match)
+
+
+def after_step(_context, step):
+    tracer.end("step", status=step.status.name)
+    metrics = step_metrics.finish(step)
+    if metrics is not None and step_metrics.enforce_budgets():
+        assert not metrics.over_budget(), f"Step took {metrics.duration:.1f}s, over its budget of {metrics.budget:.1f}s"
+
+
+def after_scenario(_context, scenario):
+    failures = deferred.settle()
+    informer.stop()
+    cassette.stop()
+    teardown.scenario_finished(scenario)
+
+    durations_file = os.getenv("TEST_ACCEPTANCE_DURATIONS_FILE")
+    if durations_file is not None:
+        with open(durations_file, "a") as f:
+            f.write(json.dumps({"scenario": scenario_id_of(scenario), "duration": scenario.duration}) + "\n")
+    tracer.end("scenario", status=scenario.status.name if failures is None else "failed")
+    assert failures is None, failures
+
+
+def after_all(_context):
+    warm_pool.stop()
+    teardown.stop()
+    cassette.close()
+
+    steps = [metrics.to_dict() for metrics in step_metrics.recorded]
+    background = step_metrics.background.to_dict()
+    report = os.getenv("TEST_ACCEPTANCE_STEP_REPORT")
+    if report is not None:
+        step_metrics.write_report(report, steps, background)
+    step_metrics.print_summary(steps, background)
+
+    if profiler.path() is not None:
+        profile = profiler.profile()
+        profiler.write(profiler.path(), profile)
+        profiler.print_summary(profile)
+
+    tracer.end("run")
+    if tracer.path() is not None:
+        tracer.write(tracer.path(), tracer.trace(os.getenv("TEST_ACCEPTANCE_WORKER")))
+        print(f"Trace written into {tracer.path()}, it can be opened by https://ui.perfetto.dev or chrome://tracing")
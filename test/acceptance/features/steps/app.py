@@ -2,8 +2,11 @@ from openshift import Openshift
 from command import Command
 from environment import ctx
 from behave import step
-from util import substitute_scenario_id
-import polling2
+from util import substitute_scenario_id, run_blocking
+from waiter import Waiter
+import deferred
+import wait_policy
+import endpoints
 import json
 
 
@@ -25,20 +28,44 @@ class App(object):
         self.port = port
         self.resource = resource
 
+    def wait_for_available_cmd(self, wait=False):
+        return f"{ctx.cli} wait --for=condition=Available=True {self.resource}/{self.name} -n {self.namespace} --timeout={300 if wait else 0}s"
+
     def is_running(self, wait=False):
-        output, exit_code = self.cmd.run(
-            f"{ctx.cli} wait --for=condition=Available=True {self.resource}/{self.name} -n {self.namespace} --timeout={300 if wait else 0}s")
+        output, exit_code = self.cmd.run(self.wait_for_available_cmd(wait))
+        running = exit_code == 0
+        if running:
+            self.route_url = wait_policy.poll(lambda: self.base_url(),
+                                              check_success=lambda v: v != "", max_interval=1, timeout=100)
+        return running
+
+    async def is_running_async(self, wait=False):
+        output, exit_code = await self.cmd.run_async(self.wait_for_available_cmd(wait))
         running = exit_code == 0
         if running:
-            self.route_url = polling2.poll(lambda: self.base_url(),
-                                           check_success=lambda v: v != "", step=1, timeout=100)
+            self.route_url = await wait_policy.poll_async(lambda: run_blocking(self.base_url),
+                                                          check_success=lambda v: v != "", max_interval=1, timeout=100)
         return running
 
+    def endpoint(self):
+        return endpoints.client(self.route_url)
+
     def install(self, bindingRoot=None):
         self.openshift.new_app(self.name, self.app_image, self.namespace, bindingRoot, self.resource == "deploymentconfig")
         self.openshift.expose_service_route(self.name, self.namespace, self.port)
         return self.is_running(wait=True)
 
+    async def install_async(self, bindingRoot=None):
+        await run_blocking(self.openshift.new_app, self.name, self.app_image, self.namespace, bindingRoot, self.resource == "deploymentconfig")
+        await run_blocking(self.openshift.expose_service_route, self.name, self.namespace, self.port)
+        return await self.is_running_async(wait=True)
+
+    async def ensure_running_async(self, bindingRoot=None):
+        if not await self.is_running_async():
+            print(f"application {self.name} is not running, trying to import it")
+            await self.install_async(bindingRoot=bindingRoot)
+        return self
+
     def base_url(self):
         return self.openshift.get_route_host(self.name, self.namespace)
 
@@ -50,11 +77,12 @@ class App(object):
 
 @step(u'jsonpath "{json_path}" on "{res_name}" should return "{json_value}"')
 @step(u'jsonpath "{json_path}" on "{res_name}" should return no value')
+@deferred.assertion
 def resource_jsonpath_value(context, json_path, res_name, json_value=""):
     openshift = Openshift()
     json_path = substitute_scenario_id(context, json_path)
     res_name = substitute_scenario_id(context, res_name)
     json_value = substitute_scenario_id(context, json_value)
     (crdName, name) = res_name.split("/")
-    polling2.poll(lambda: openshift.get_resource_info_by_jsonpath(crdName, name, context.namespace.name, json_path) == json_value,
-                  step=5, timeout=800, ignore_exceptions=(json.JSONDecodeError,))
+    Waiter(crdName, name, context.namespace.name).wait(lambda obj: openshift.resource_info_by_jsonpath(crdName, obj, json_path) == json_value,
+                                                       timeout=800, ignore_exceptions=(json.JSONDecodeError,))
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+
+from environment import ctx
+
+
+class Cassette(object):
+    """
+    The commands run by a single scenario together with their outputs, exit codes and durations.
+
+    When replaying, the n-th run of a command (with the same stdin) gets the n-th recorded response of that command,
+    so that polls see the same sequence of states as in the recorded run; runs beyond the recorded ones get the last response.
+    """
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.interactions = []
+        self.responses = {}
+        self.served = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        assert os.path.exists(self.path), f"No cassette recorded for {self.name}: {self.path}"
+        with open(self.path, "r") as f:
+            self.interactions = json.load(f)["interactions"]
+        for interaction in self.interactions:
+            self.responses.setdefault((interaction["command"], interaction["stdin"]), []).append(interaction)
+        return self
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({"name": self.name, "interactions": self.interactions}, f, indent=2)
+
+    def record(self, cmd, stdin, output, exit_code, duration):
+        with self.lock:
+            self.interactions.append({"command": cmd, "stdin": stdin, "output": output, "exit_code": exit_code, "duration": round(duration, 3)})
+
+    def play(self, cmd, stdin):
+        key = (cmd, stdin)
+        with self.lock:
+            responses = self.responses.get(key)
+            assert responses is not None, f"Command not recorded in cassette {self.path}: {cmd}"
+            index = self.served.get(key, 0)
+            self.served[key] = index + 1
+        return responses[min(index, len(responses) - 1)]
+
+
+current = None
+# cassette of the commands run outside of any scenario (e.g. in before_all)
+outside = None
+lock = threading.Lock()
+
+
+def mode():
+    """
+    Returns 'record', 'replay' or None as given by TEST_ACCEPTANCE_CASSETTES.
+    """
+    value = os.getenv("TEST_ACCEPTANCE_CASSETTES")
+    assert value in (None, "", "record", "replay"), f"TEST_ACCEPTANCE_CASSETTES should be record or replay, but is {value}"
+    if value in ("record", "replay"):
+        assert ctx.backend == "cli", "Cassettes record the CLI commands only, they cannot be used with TEST_ACCEPTANCE_BACKEND=api"
+    return value or None
+
+
+def directory():
+    return os.getenv("TEST_ACCEPTANCE_CASSETTES_DIR", os.path.join("out", "acceptance-tests-cassettes"))
+
+
+def delay_factor():
+    """
+    How much of the recorded durations is spent when replaying: 0 (by default) replays instantly, 1 keeps the recorded timing.
+    It scales the waits between polls as well.
+    """
+    return float(os.getenv("TEST_ACCEPTANCE_CASSETTES_DELAY", "0"))
+
+
+def open_cassette(name):
+    cassette = Cassette(name, os.path.join(directory(), f"{name}.json"))
+    return cassette.load() if mode() == "replay" else cassette
+
+
+def start(name):
+    global current
+    stop()
+    if mode() is not None:
+        cassette = open_cassette(name)
+        with lock:
+            current = cassette
+
+
+def stop():
+    global current
+    with lock:
+        cassette = current
+        current = None
+    if cassette is not None and mode() == "record":
+        cassette.save()
+
+
+def close():
+    global outside
+    stop()
+    with lock:
+        cassette = outside
+        outside = None
+    if cassette is not None and mode() == "record":
+        cassette.save()
+
+
+def active():
+    global outside
+    if mode() is None:
+        return None
+    with lock:
+        if current is not None:
+            return current
+        if outside is None:
+            outside = open_cassette("_global")
+        return outside
+
+
+def play(cmd, stdin):
+    """
+    Returns the recorded (output, exit_code) of the command when replaying, None otherwise.
+    """
+    cassette = active()
+    if cassette is None or mode() != "replay":
+        return None
+    interaction = cassette.play(cmd, stdin)
+    if delay_factor() > 0:
+        time.sleep(interaction["duration"] * delay_factor())
+    return interaction["output"], interaction["exit_code"]
+
+
+def record(cmd, stdin, output, exit_code, duration):
+    cassette = active()
+    if cassette is not None and mode() == "record":
+        cassette.record(cmd, stdin, output, exit_code, duration)
+
+
+def scale_delay(delay):
+    """
+    Scales a wait between polls, which is compressed the same way as the recorded durations when replaying.
+    """
+    return delay * delay_factor() if mode() == "replay" else delay
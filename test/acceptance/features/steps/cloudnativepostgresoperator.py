@@ -1,4 +1,4 @@
-from olm import Operator
+from olm import Operator, provision, provisions
 from environment import ctx
 from behave import given
 
@@ -13,13 +13,14 @@ class CloudNativePostgresOperator(Operator):
         self.operator_catalog_image = "quay.io/operatorhubio/catalog:latest"
         self.package_name = name
 
+    def install(self):
+        if ctx.cli == "oc":
+            self.install_catalog_source()
+        self.install_operator_subscription()
+
 
 @given(u'Cloud Native Postgres operator is running')
+@provisions(CloudNativePostgresOperator)
 def install(_context):
-    operator = CloudNativePostgresOperator()
-    if not operator.is_running():
-        if ctx.cli == "oc":
-            operator.install_catalog_source()
-        operator.install_operator_subscription()
-        operator.is_running(wait=True)
+    provision(CloudNativePostgresOperator)
     print("Cloud Native Postgres operator is running")
@@ -1,13 +1,20 @@
+import asyncio
+import cassette
 import subprocess
+import profiler
+import singleflight
+import step_metrics
 import time
+import tracer
+import wait_policy
 import os
 
 
 class Command(object):
     path = ""
-    env = {}
 
     def __init__(self, path=None):
+        self.env = dict()
         if path is None:
             self.path = os.getcwd()
         else:
@@ -29,6 +36,11 @@ class Command(object):
         print(f",---------,-\n| COMMAND : {cmd}\n'---------'-")  # for debugging purposes
         output = None
         exit_code = 0
+        start = time.monotonic()
+        played = cassette.play(cmd, stdin)
+        if played is not None:
+            self.account(cmd, time.monotonic() - start, played[1], replayed=True)
+            return played
         try:
             if stdin is None:
                 output = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT, cwd=self.path, env=self.env)
@@ -39,17 +51,44 @@ class Command(object):
             exit_code = err.returncode
             print('ERROR MESSGE:', output)
             print('ERROR CODE:', exit_code)
+        duration = time.monotonic() - start
+        self.account(cmd, duration, exit_code)
+        cassette.record(cmd, stdin, output.decode("utf-8"), exit_code, duration)
         return output.decode("utf-8"), exit_code
 
+    async def run_async(self, cmd, stdin=None):
+        print(f",---------,-\n| COMMAND : {cmd}\n'---------'-")  # for debugging purposes
+        start = time.monotonic()
+        played = await asyncio.get_running_loop().run_in_executor(None, cassette.play, cmd, stdin)
+        if played is not None:
+            self.account(cmd, time.monotonic() - start, played[1], replayed=True, asynchronous=True)
+            return played
+        process = await asyncio.create_subprocess_shell(cmd, stdin=subprocess.PIPE if stdin is not None else None, stdout=subprocess.PIPE,
+                                                        stderr=subprocess.STDOUT, cwd=self.path, env=self.env)
+        output, _ = await process.communicate(stdin.encode("utf-8") if stdin is not None else None)
+        exit_code = process.returncode
+        duration = time.monotonic() - start
+        self.account(cmd, duration, exit_code, asynchronous=True)
+        cassette.record(cmd, stdin, output.decode("utf-8"), exit_code, duration)
+        if exit_code != 0:
+            print('ERROR MESSGE:', output)
+            print('ERROR CODE:', exit_code)
+        return output.decode("utf-8"), exit_code
+
+    def account(self, cmd, duration, exit_code, replayed=False, asynchronous=False):
+        if cmd.split()[1:2] != ["get"]:
+            # any other command might change the cluster, the reads issued from now on do not share a response read before
+            singleflight.wrote()
+        step_metrics.command_ran(duration)
+        profiler.record(cmd, duration)
+        tracer.complete("command", cmd, duration, asynchronous, exit_code=exit_code, replayed=replayed)
+
     def run_wait_for_status(self, cmd, status, interval=20, timeout=180):
         cmd_output = None
         exit_code = -1
-        start = 0
-        while ((start + interval) <= timeout):
+        for _ in wait_policy.attempts(timeout, interval):
             cmd_output, exit_code = self.run(cmd)
             if status in cmd_output:
                 return True, cmd_output, exit_code
-            time.sleep(interval)
-            start += interval
         print("ERROR: Time out while waiting for status message.")
         return False, cmd_output, exit_code
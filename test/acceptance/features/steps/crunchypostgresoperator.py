@@ -1,4 +1,4 @@
-from olm import Operator
+from olm import Operator, provision, provisions
 from environment import ctx
 from behave import given
 
@@ -18,9 +18,7 @@ class CrunchyPostgresOperator(Operator):
 
 
 @given(u'Crunchy Data Postgres operator is running')
+@provisions(CrunchyPostgresOperator)
 def install(_context):
-    operator = CrunchyPostgresOperator()
-    if not operator.is_running():
-        operator.install_operator_subscription()
-        operator.is_running(wait=True)
+    provision(CrunchyPostgresOperator)
     print("Crunchy Data Postgres operator is running")
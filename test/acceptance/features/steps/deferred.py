@@ -0,0 +1,143 @@
+import functools
+import os
+import threading
+import traceback
+
+import cassette
+
+from behave.model_core import Status
+
+
+class StepContext(object):
+    """
+    The context of a deferred step: its text, table and current step are those of the step, the other attributes are read from the
+    context of the scenario. A deferred step cannot set attributes, the steps after it would not see them until it is settled.
+    """
+
+    def __init__(self, context, step):
+        object.__setattr__(self, "_context", context)
+        object.__setattr__(self, "_own", {"text": context.text, "table": context.table, "current_step": step})
+
+    def __getattr__(self, name):
+        if name in self._own:
+            return self._own[name]
+        return getattr(self._context, name)
+
+    def __setattr__(self, name, _value):
+        raise AttributeError(f"Deferred step '{self._own['current_step'].name}' cannot set context.{name}, it should not be marked as an assertion")
+
+    def __contains__(self, name):
+        return name in self._own or name in self._context
+
+
+class Assertion(object):
+    """
+    An assertion step running in the background, its failure is reported against the step by settle().
+    """
+
+    def __init__(self, step, context, run):
+        self.step = step
+        self.context = context
+        self.error = None
+        self.traceback = None
+        self.thread = threading.Thread(target=self.run, args=(run,), name=f"assertion-{step.line}", daemon=True)
+        self.thread.start()
+
+    def run(self, run):
+        try:
+            run(self.context)
+        except Exception as e:
+            self.error = e
+            self.traceback = traceback.format_exc()
+
+    def error_message(self):
+        if isinstance(self.error, AssertionError) and self.error.args:
+            return f"Assertion Failed: {self.error}"
+        return self.traceback
+
+
+# assertions of the current scenario still running or not settled yet
+pending = []
+# the step about to run deferred, set by before_step()
+deferring = None
+
+
+def enabled():
+    # the commands of a scenario are replayed in the order they were recorded, so nothing runs concurrently with cassettes
+    return os.getenv("TEST_ACCEPTANCE_DEFER_ASSERTIONS", "false").lower() == "true" and cassette.mode() is None
+
+
+def assertion(step):
+    """
+    Marks a step as an assertion which only waits for the cluster to reach a state, without setting any attribute
+    of the context. With deferred assertions enabled,
+    such a step used as a Then step runs in the background and returns immediately; its failure is reported by settle().
+    Called from another step, it always runs right away.
+    """
+    @functools.wraps(step)
+    def run(context, *args, **kwargs):
+        global deferring
+        current = getattr(context, "current_step", None) if not isinstance(context, StepContext) else None
+        if deferring is None or deferring is not current:
+            return step(context, *args, **kwargs)
+        deferring = None
+        print(f"Deferring '{current.keyword} {current.name}'")
+        pending.append(Assertion(current, StepContext(context, current), lambda c: step(c, *args, **kwargs)))
+    run.deferred_assertion = True
+    return run
+
+
+def reset():
+    """
+    Forgets the assertions left by the previous scenario (e.g. when it has been interrupted), before a scenario starts.
+    """
+    global pending, deferring
+    pending = []
+    deferring = None
+
+
+def barrier(step):
+    """
+    Marks a step which settles the deferred assertions itself, so they are not settled before it.
+    """
+    step.deferred_barrier = True
+    return step
+
+
+def before_step(step, match):
+    """
+    Lets a Then assertion step run deferred, any other step settles the deferred assertions first,
+    so that it does not change what they are waiting for.
+    """
+    global deferring
+    deferring = None
+    func = match.func if match is not None else None
+    if enabled() and step.step_type == "then" and getattr(func, "deferred_assertion", False):
+        deferring = step
+        return
+    if getattr(func, "deferred_barrier", False):
+        return
+    failures = settle()
+    assert failures is None, failures
+
+
+def settle():
+    """
+    Waits for the deferred assertions and marks the steps of those which have failed as failed.
+    Returns the description of the failures, None if there were none.
+    """
+    global pending, deferring
+    assertions, pending = pending, []
+    deferring = None
+    failed = []
+    for a in assertions:
+        a.thread.join()
+        if a.error is not None:
+            a.step.status = Status.failed
+            a.step.exception = a.error
+            a.step.error_message = a.error_message()
+            failed.append(a)
+    if len(failed) == 0:
+        return None
+    failures = [f"{a.step.location} {a.step.keyword} {a.step.name}\n{a.step.error_message}" for a in failed]
+    return f"{len(failed)} deferred assertion(s) failed:\n" + "\n".join(failures)
@@ -0,0 +1,55 @@
+import threading
+import requests
+import tracer
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+# errors of a probe worth retrying: the application is not reachable (yet) or too slow to answer
+transient_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+class Endpoint(object):
+    """
+    HTTP client of the endpoints exposed by a single application, keeping the connections to it alive between the probes
+    instead of opening a new one for each request. Every request is bounded by the connect and read timeouts.
+    """
+
+    def __init__(self, base_url, pool_size=8, connect_timeout=5, read_timeout=30):
+        self.base_url = base_url if "://" in base_url else f"http://{base_url}"
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, path):
+        with tracer.Span("probe", path, url=self.base_url) as span:
+            response = self.session.get(f"{self.base_url}{path}", timeout=self.timeout)
+            span.args["status"] = response.status_code
+        return response
+
+    def get_many(self, paths):
+        """
+        Fetches all the paths concurrently over the pooled connections and returns the responses in the same order.
+        The first error of any of the requests is raised.
+        """
+        if len(paths) <= 1:
+            return [self.get(path) for path in paths]
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, len(paths))) as executor:
+            return list(executor.map(self.get, paths))
+
+
+clients = {}
+clients_lock = threading.Lock()
+
+
+def client(base_url):
+    """
+    Returns the client shared by all the probes of the application with the given route (host or URL).
+    """
+    with clients_lock:
+        if base_url not in clients:
+            clients[base_url] = Endpoint(base_url)
+        return clients[base_url]
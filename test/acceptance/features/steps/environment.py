@@ -3,12 +3,21 @@ import os
 
 class Environment(object):
     cli = "oc"
+    backend = "cli"
+    informer = False
+    wait_profile = "default"
 
-    def __init__(self, cli):
+    def __init__(self, cli, backend="cli", informer=False, wait_profile="default"):
         self.cli = cli
+        assert backend in {"cli", "api"}, f"Unsupported backend '{backend}', it should be one of cli or api"
+        self.backend = backend
+        assert not informer or backend == "api", "The informer cache requires the api backend"
+        self.informer = informer
+        self.wait_profile = wait_profile
 
 
 # This is a global context (complementing behave's context)
 # to be accesible from any place, even where behave's context is not available.
 global ctx
-ctx = Environment(os.getenv("TEST_ACCEPTANCE_CLI", "oc"))
+ctx = Environment(os.getenv("TEST_ACCEPTANCE_CLI", "oc"), os.getenv("TEST_ACCEPTANCE_BACKEND", "cli"),
+                  os.getenv("TEST_ACCEPTANCE_INFORMER", "false").lower() == "true", os.getenv("TEST_ACCEPTANCE_WAIT_PROFILE", "default"))
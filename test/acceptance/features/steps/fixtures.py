@@ -0,0 +1,88 @@
+import functools
+import os
+import threading
+
+import cassette
+
+scopes = ("run", "feature", "namespace")
+
+# (fixture, arguments, scope, scope key) -> (result, resources provided by the fixture)
+cache = {}
+lock = threading.Lock()
+# resources provided by the fixture being run, None outside of a fixture
+providing = None
+
+
+def enabled():
+    # the commands of a scenario are replayed in the order they were recorded, so nothing is skipped with cassettes
+    return os.getenv("TEST_ACCEPTANCE_FIXTURES", "false").lower() == "true" and cassette.mode() is None
+
+
+def scope_key(context, scope):
+    if scope == "feature":
+        return context.feature.filename if "feature" in context else None
+    if scope == "namespace":
+        return context.namespace.name if "namespace" in context else None
+    return None
+
+
+def fixture(scope="run"):
+    """
+    Marks an idempotent step as a fixture. Its result is cached by its arguments (e.g. the parameters of the step) within the scope
+    (run, feature or namespace of the scenario), the later invocations return it without running the step again.
+    A step failing is not cached. The cached results are dropped by invalidate() and modified().
+    """
+    assert scope in scopes, f"Unknown fixture scope '{scope}', it should be one of {', '.join(scopes)}"
+
+    def wrap(step):
+        @functools.wraps(step)
+        def run(context, *args, **kwargs):
+            global providing
+            if not enabled():
+                return step(context, *args, **kwargs)
+            key = (step, args, tuple(sorted(kwargs.items())), scope, scope_key(context, scope))
+            with lock:
+                cached = cache.get(key)
+            if cached is not None:
+                print(f"{step.__name__}{args} is already done in this {scope}, skipping it")
+                return cached[0]
+            outer = providing
+            providing = set()
+            try:
+                result = step(context, *args, **kwargs)
+                with lock:
+                    cache[key] = (result, providing)
+                return result
+            finally:
+                providing = outer
+        run.fixture_scope = scope
+        return run
+    return wrap
+
+
+def provides(kind, name):
+    """
+    Records that the running fixture provides the given resource, so that its cached result is dropped once the resource is modified.
+    """
+    if providing is not None:
+        providing.add((kind, name))
+
+
+def modified(kind, name):
+    """
+    Drops the cached results of the fixtures which provide the given resource, e.g. when a step applies or deletes it.
+    """
+    with lock:
+        for key in [key for key, (_, resources) in cache.items() if (kind, name) in resources]:
+            del cache[key]
+
+
+def invalidate(step=None, scope=None, key=None):
+    """
+    Drops the cached results of the given fixture (of all of them by default), optionally only those of the scope
+    and of its key (e.g. the name of a deleted namespace).
+    """
+    with lock:
+        for cached in [c for c in cache if (step is None or c[0] is getattr(step, "__wrapped__", step))
+                       and (scope is None or c[3] == scope) and (key is None or c[4] == key)]:
+            del cache[cached]
@@ -1,12 +1,15 @@
+import os
 from app import App
-import requests
+import deferred
+import endpoints
 import json
-import polling2
 from behave import step
+from namespace import Namespace, namespace_of, used_namespace_steps
 from openshift import Openshift
-from util import substitute_scenario_id
+from util import substitute_scenario_id, substitute_scenario_id_of, run_blocking, run_concurrently
 from string import Template
-from polling2 import poll_decorator
+import wait_policy
+import warm_pool
 
 
 class GenericTestApp(App):
@@ -17,30 +20,42 @@ class GenericTestApp(App):
         App.__init__(self, name, namespace, app_image, "8080")
 
     def get_env_var_value(self, name):
-        resp = polling2.poll(lambda: requests.get(url=f"http://{self.route_url}/env/{name}"),
-                             check_success=lambda r: r.status_code in [200, 404], step=5, timeout=400, ignore_exceptions=(requests.exceptions.ConnectionError,))
-        print(f'env endpoint response: {resp.text} code: {resp.status_code}')
-        if resp.status_code == 200:
-            return json.loads(resp.text)
-        else:
-            return None
+        return self.get_env_var_values([name])[name]
+
+    def get_env_var_values(self, names):
+        responses = wait_policy.poll(lambda: self.endpoint().get_many([f"/env/{name}" for name in names]),
+                                     check_success=lambda rs: all(r.status_code in [200, 404] for r in rs), max_interval=5, timeout=400,
+                                     ignore_exceptions=endpoints.transient_errors)
+        values = {}
+        for name, resp in zip(names, responses):
+            print(f'env endpoint response: {resp.text} code: {resp.status_code}')
+            values[name] = json.loads(resp.text) if resp.status_code == 200 else None
+        return values
+
+    async def get_env_var_value_async(self, name):
+        return await run_blocking(self.get_env_var_value, name)
 
     def format_pattern(self, pattern):
         return pattern.format(name=self.name)
 
     def get_file_value(self, file_path):
-        resp = polling2.poll(lambda: requests.get(url=f"http://{self.route_url}{file_path}"),
-                             check_success=lambda r: r.status_code == 200, step=5, timeout=400, ignore_exceptions=(requests.exceptions.ConnectionError,))
-        print(f'file endpoint response: {resp.text} code: {resp.status_code}')
-        return resp.text
+        return self.get_file_values([file_path])[file_path]
+
+    def get_file_values(self, file_paths):
+        responses = wait_policy.poll(lambda: self.endpoint().get_many(file_paths),
+                                     check_success=lambda rs: all(r.status_code == 200 for r in rs), max_interval=5, timeout=400,
+                                     ignore_exceptions=endpoints.transient_errors)
+        for resp in responses:
+            print(f'file endpoint response: {resp.text} code: {resp.status_code}')
+        return {file_path: resp.text for file_path, resp in zip(file_paths, responses)}
 
     def assert_file_not_exist(self, file_path):
-        polling2.poll(lambda: requests.get(url=f"http://{self.route_url}{file_path}"),
-                      check_success=lambda r: r.status_code == 404, step=5, timeout=400, ignore_exceptions=(requests.exceptions.ConnectionError,))
+        wait_policy.poll(lambda: self.endpoint().get(file_path),
+                         check_success=lambda r: r.status_code == 404, max_interval=5, timeout=400, ignore_exceptions=endpoints.transient_errors)
 
-    @poll_decorator(step=5, timeout=400, ignore_exceptions=(requests.exceptions.ConnectionError,))
+    @wait_policy.poll_decorator(max_interval=5, timeout=400, ignore_exceptions=endpoints.transient_errors)
     def assert_file_exist(self, file_path):
-        resp = requests.get(url=f"http://{self.route_url}{file_path}")
+        resp = self.endpoint().get(file_path)
         if resp.status_code != 200:
             print(f'file endpoint response: {resp.text} code: {resp.status_code}')
         return resp.status_code == 200
@@ -48,6 +63,60 @@ class GenericTestApp(App):
     def set_label(self, label):
         self.openshift.set_label(self.name, label, self.namespace)
 
+    def claim(self, bindingRoot=None):
+        """
+        Waits for the application pool to deploy the application ahead of the scenario, returns None if the pool does not deploy it.
+        """
+        return warm_pool.claim("applications", (self.namespace, self.name, bindingRoot))
+
+    def reset(self, bindingRoot=None):
+        env = [{"name": "SERVICE_BINDING_ROOT", "value": bindingRoot}] if bindingRoot else None
+        self.openshift.reset_deployment(self.name, self.namespace, env)
+
+
+# steps applying a service binding or a backing service, the applications deployed after them are not deployed ahead
+ordered_steps = {("service_binding.py", "sbr_is_applied"), ("steps.py", "apply_yaml")}
+
+
+def plan_applications(scenario, steps):
+    """
+    Returns the generic test applications the scenario deploys as (namespace, name, binding root), those deployed before
+    any service binding or backing service is applied: some scenarios check the application is bound when it comes after them.
+    """
+    applications = []
+    namespace = None
+    for _, match in steps:
+        if match is not None and (os.path.basename(match.location.filename), match.func.__name__) in ordered_steps:
+            break
+        namespace = namespace_of(scenario, match, used_namespace_steps) or namespace
+        if match is None or match.func.__name__ != "is_running" or not match.location.filename.endswith("generic_testapp.py"):
+            continue
+        arguments = {argument.name: argument.value for argument in match.arguments}
+        if namespace is not None:
+            applications.append((namespace, substitute_scenario_id_of(scenario, arguments.get("application_name", "$scenario_id")),
+                                 arguments.get("bindingRoot")))
+    return applications
+
+
+def prepare_application(application):
+    """
+    Deploys the application unless it is running already, in which case it is reset to a clean state.
+    Returns False when the namespace of the application does not exist, so the scenario deploys the application itself.
+    """
+    namespace, name, bindingRoot = application
+    warm_pool.wait("namespaces", namespace)
+    if not Namespace(namespace).is_present():
+        return False
+    app = GenericTestApp(name, namespace)
+    if app.is_running():
+        app.reset(bindingRoot)
+    else:
+        app.install(bindingRoot=bindingRoot)
+    return True
+
+
+warm_pool.register("applications", "TEST_ACCEPTANCE_APP_POOL", plan_applications, prepare_application)
+
 
 @step(u'Generic test application "{application_name}" is running')
 @step(u'Generic test application "{application_name}" is running with binding root as "{bindingRoot}"')
@@ -59,14 +128,15 @@ def is_running(context, application_name=None, bindingRoot=None, asDeploymentCon
     application = GenericTestApp(application_name, context.namespace.name)
     if asDeploymentConfig:
         application.resource = "deploymentconfig"
+    elif application.claim(bindingRoot):
+        print(f"application {application.name} has been deployed by the pool")
     if not application.is_running():
         print("application is not running, trying to import it")
         application.install(bindingRoot=bindingRoot)
     context.application = application
 
     # save the generation number
-    context.original_application_generation = application.get_generation()
-    context.latest_application_generation = application.get_generation()
+    context.original_application_generation = context.latest_application_generation = application.get_generation()
 
 
 @step(u'Generic test application is running as deployment config')
@@ -75,60 +145,67 @@ def is_running_deployment_config(context):
 
 
 @step(u'The application env var "{name}" has value "{value}"')
+@deferred.assertion
 def check_env_var_value(context, name, value):
     value = substitute_scenario_id(context, value)
-    found = polling2.poll(lambda: context.application.get_env_var_value(name) == value, step=5, timeout=400)
+    found = wait_policy.poll(lambda: context.application.get_env_var_value(name) == value, max_interval=5, timeout=400)
     assert found, f'Env var "{name}" should contain value "{value}"'
 
 
+@step(u'The application env vars have values')
+@deferred.assertion
+def check_env_var_values(context):
+    expected = {row["name"]: substitute_scenario_id(context, row["value"]) for row in context.table}
+    found = wait_policy.poll(lambda: context.application.get_env_var_values(list(expected)) == expected, max_interval=5, timeout=400)
+    assert found, f'Env vars should contain values {expected}'
+
+
 @step(u'The env var "{name}" is not available to the application')
+@deferred.assertion
 def check_env_var_existence(context, name):
-    output = polling2.poll(lambda: context.application.get_env_var_value(name) is None, step=5, timeout=400)
+    output = wait_policy.poll(lambda: context.application.get_env_var_value(name) is None, max_interval=5, timeout=400)
     assert output, f'Env var "{name}" should not exist'
 
 
 @step(u'Content of file "{file_path}" in application pod is')
+@deferred.assertion
 def check_file_value(context, file_path):
     value = Template(context.text.strip()).substitute(NAMESPACE=context.namespace.name)
     resource = substitute_scenario_id(context, file_path)
-    polling2.poll(lambda: context.application.get_file_value(resource) == value, step=5, timeout=400)
+    wait_policy.poll(lambda: context.application.get_file_value(resource) == value, max_interval=5, timeout=400)
 
 
 @step(u'Application can connect to the projected Postgres database')
+@deferred.assertion
 def postgres_can_connect(context):
     check_file_exists(context, "/postgres-ready")
 
 
 @step(u'Application can connect to the projected MySQL database')
+@deferred.assertion
 def mysql_can_connect(context):
     check_file_exists(context, "/mysql-ready")
 
 
 @step(u'File "{file_path}" exists in application pod')
+@deferred.assertion
 def check_file_exists(context, file_path):
     resource = substitute_scenario_id(context, file_path)
     context.application.assert_file_exist(resource)
 
 
 @step(u'File "{file_path}" is unavailable in application pod')
+@deferred.assertion
 def check_file_unavailable(context, file_path):
     context.application.assert_file_not_exist(file_path)
 
 
 @step(u'Test applications "{first_app_name}" and "{second_app_name}" is running')
 def are_two_apps_running(context, first_app_name, second_app_name, bindingRoot=None):
-    first = substitute_scenario_id(context, first_app_name)
-    application1 = GenericTestApp(first, context.namespace.name)
-    if not application1.is_running():
-        print("application1 is not running, trying to import it")
-        application1.install(bindingRoot=bindingRoot)
+    application1 = GenericTestApp(substitute_scenario_id(context, first_app_name), context.namespace.name)
+    application2 = GenericTestApp(substitute_scenario_id(context, second_app_name), context.namespace.name)
+    run_concurrently(application1.ensure_running_async(bindingRoot), application2.ensure_running_async(bindingRoot))
     context.application1 = application1
-
-    second = substitute_scenario_id(context, second_app_name)
-    application2 = GenericTestApp(second, context.namespace.name)
-    if not application2.is_running():
-        print("application2 is not running, trying to import it")
-        application2.install(bindingRoot=bindingRoot)
     context.application2 = application2
 
 
@@ -139,9 +216,11 @@ def set_common_label(context, label):
 
 
 @step(u'The application env var "{name}" has value "{value}" in both apps')
+@deferred.assertion
 def check_env_var_value_in_both_apps(context, name, value):
-    polling2.poll(lambda: context.application1.get_env_var_value(name) == value, step=5, timeout=400)
-    polling2.poll(lambda: context.application2.get_env_var_value(name) == value, step=5, timeout=400)
+    run_concurrently(*[wait_policy.poll_async(lambda app=app: app.get_env_var_value_async(name), check_success=lambda v: v == value, max_interval=5,
+                                              timeout=400)
+                       for app in (context.application1, context.application2)])
 
 
 @step(u'The container declared in application resource contains env "{envVar}" set only once')
@@ -0,0 +1,192 @@
+import copy
+import threading
+import time
+import kubeapi
+
+from environment import ctx
+from kubeapi import ApiError
+
+
+class Informer(object):
+    """
+    In-memory cache of the namespaced resources of a single namespace kept up to date by list+watch.
+
+    A resource kind is listed and its watch started the first time it is read. Objects applied or deleted
+    through Openshift are recorded right away, so reads following a write are consistent with it: the watch events
+    of such an object are skipped until the event of that write (the one with the same resourceVersion) has come.
+    resourceVersions are opaque, they are only ever compared for equality. The reads return copies of the cached objects.
+    """
+
+    watch_timeout = 30
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.api = kubeapi.client()
+        self.lock = threading.RLock()
+        self.stores = {}
+        # resource kind -> name -> resourceVersion of the last write (None for a deletion) whose watch event has not come yet
+        self.written = {}
+        self.stopped = threading.Event()
+
+    def key(self, resource):
+        return (resource.group, resource.version, resource.kind)
+
+    def caches(self, resource_type):
+        return self.api.resolve(resource_type).namespaced
+
+    def get(self, resource_type, name):
+        resource = self.api.resolve(resource_type)
+        with self.lock:
+            obj = self.store(resource).get(name)
+        if obj is None:
+            # the object might have been created by a command that does not go through the cache (e.g. oc new-app)
+            obj = self.api.get(resource, name, self.namespace)
+            with self.lock:
+                self.store(resource)[name] = obj
+        return copy.deepcopy(obj)
+
+    def list(self, resource_type):
+        resource = self.api.resolve(resource_type)
+        with self.lock:
+            items = sorted(self.store(resource).values(), key=lambda o: o["metadata"]["name"])
+            items = copy.deepcopy(items)
+        return {"apiVersion": "v1", "kind": "List", "metadata": {}, "items": items}
+
+    def store(self, resource):
+        key = self.key(resource)
+        with self.lock:
+            if key not in self.stores:
+                self.stores[key] = {}
+                self.written[key] = {}
+                try:
+                    resource_version = self.relist(resource)
+                except ApiError:
+                    del self.stores[key]
+                    raise
+                threading.Thread(target=self.run, args=(resource, resource_version), daemon=True).start()
+            return self.stores[key]
+
+    def relist(self, resource):
+        resources = self.api.list(resource, self.namespace)
+        key = self.key(resource)
+        with self.lock:
+            # the list is newer than any write recorded before it
+            self.stores[key] = {obj["metadata"]["name"]: obj for obj in resources["items"]}
+            self.written[key] = {}
+        return resources["metadata"]["resourceVersion"]
+
+    def run(self, resource, resource_version):
+        while not self.stopped.is_set():
+            try:
+                for event in self.api.watch(resource, self.namespace, resource_version=resource_version, timeout=self.watch_timeout):
+                    if self.stopped.is_set():
+                        return
+                    obj = event["object"]
+                    resource_version = obj["metadata"]["resourceVersion"]
+                    if event["type"] != "BOOKMARK":
+                        self.watched(resource, event["type"], obj)
+            except ApiError as err:
+                if self.stopped.is_set():
+                    return
+                if err.status != 410:
+                    print(f"Watch of {resource.name} in {self.namespace} namespace failed, listing again: {err}")
+                    time.sleep(1)
+                try:
+                    resource_version = self.relist(resource)
+                except ApiError as err:
+                    print(f"Listing {resource.name} in {self.namespace} namespace failed: {err}")
+
+    def watched(self, resource, event_type, obj):
+        """
+        Replaces the cached object by the one of the watch event, unless the event precedes a write recorded already.
+        """
+        key = self.key(resource)
+        name = obj["metadata"]["name"]
+        with self.lock:
+            store = self.store(resource)
+            written = self.written[key]
+            if name in written:
+                if (written[name] is None and event_type == "DELETED") or written[name] == obj["metadata"].get("resourceVersion"):
+                    # the event of the write itself, the following ones are newer
+                    del written[name]
+                else:
+                    return
+            if event_type == "DELETED":
+                store.pop(name, None)
+            else:
+                store[name] = obj
+
+    def record(self, resource, obj):
+        key = self.key(resource)
+        name = obj["metadata"]["name"]
+        with self.lock:
+            if key not in self.stores:
+                # listed right now, after the write
+                self.store(resource)
+                return
+            store = self.store(resource)
+            current = store.get(name)
+            # a write which has not changed the object (e.g. an unchanged apply) does not make any watch event
+            if current is None or current["metadata"].get("resourceVersion") != obj["metadata"].get("resourceVersion"):
+                self.written[key][name] = obj["metadata"].get("resourceVersion")
+            store[name] = obj
+
+    def forget(self, resource, name):
+        key = self.key(resource)
+        with self.lock:
+            if key not in self.stores:
+                self.store(resource)
+                return
+            self.store(resource).pop(name, None)
+            self.written[key][name] = None
+
+    def stop(self):
+        self.stopped.set()
+
+
+current = None
+
+
+def start(namespace):
+    global current
+    stop()
+    if ctx.informer:
+        current = Informer(namespace)
+
+
+def stop():
+    global current
+    if current is not None:
+        current.stop()
+        current = None
+
+
+def lookup(namespace, user=None):
+    """
+    Returns the informer serving reads of the given namespace, if there is any.
+    Reads on behalf of a particular user are never cached.
+    """
+    if current is None or user is not None:
+        return None
+    if namespace is None:
+        namespace = kubeapi.client().default_namespace
+    return current if current.namespace == namespace else None
+
+
+def applied(resource, obj):
+    informer = lookup(obj["metadata"].get("namespace"))
+    if informer is not None and resource.namespaced:
+        informer.record(resource, obj)
+
+
+def deleted(resource, namespace, name, response):
+    informer = lookup(namespace)
+    if informer is None or not resource.namespaced:
+        return
+    if response.get("kind") != resource.kind:
+        informer.forget(resource, name)
+    elif len(response["metadata"].get("finalizers") or []) > 0:
+        # still waiting for the finalizers, the actual removal is going to come by the watch
+        informer.record(resource, response)
+    else:
+        informer.forget(resource, name)
@@ -0,0 +1,376 @@
+import functools
+import json
+import re
+
+
+class JqError(ValueError):
+    pass
+
+
+class Jq(object):
+    """
+    In-process evaluator of the subset of jq used by the steps: pipes, field access, iteration ('[]'), indexing,
+    array construction, comparisons, 'and'/'or', literals and the select, startswith, endswith, contains, test, has,
+    map, length, keys and not functions.
+    """
+
+    token_re = re.compile(r'\s*(?:(?P<string>"(?:\\.|[^"\\])*")|(?P<number>-?\d+(?:\.\d+)?)|(?P<op>==|!=|<=|>=|\.\.|[.\[\](),;|<>?])|'
+                          r'(?P<ident>[A-Za-z_][A-Za-z0-9_]*))')
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = self.tokenize(expression)
+        self.pos = 0
+        self.program = self.parse_pipe()
+        if self.peek() is not None:
+            raise JqError(f"Unexpected '{self.peek()[1]}' in jq expression: {expression}")
+
+    def tokenize(self, expression):
+        tokens = []
+        pos = 0
+        while pos < len(expression):
+            if expression[pos:].strip() == "":
+                break
+            match = self.token_re.match(expression, pos)
+            if match is None:
+                raise JqError(f"Unsupported syntax at position {pos} of jq expression: {expression}")
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "string":
+                value = json.loads(value)
+            elif kind == "number":
+                value = json.loads(value)
+            tokens.append((kind, value))
+            pos = match.end()
+        return tokens
+
+    # -- parser
+
+    def peek(self, offset=0):
+        if self.pos + offset < len(self.tokens):
+            return self.tokens[self.pos + offset]
+        return None
+
+    def accept(self, kind, value=None):
+        token = self.peek()
+        if token is not None and token[0] == kind and (value is None or token[1] == value):
+            self.pos += 1
+            return token
+        return None
+
+    def expect(self, kind, value=None):
+        token = self.accept(kind, value)
+        if token is None:
+            raise JqError(f"Expected '{value or kind}' in jq expression: {self.expression}")
+        return token
+
+    def parse_pipe(self):
+        node = self.parse_comma()
+        while self.accept("op", "|"):
+            node = ("pipe", node, self.parse_comma())
+        return node
+
+    def parse_comma(self):
+        node = self.parse_or()
+        while self.accept("op", ","):
+            node = ("comma", node, self.parse_or())
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.accept("ident", "or"):
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_comparison()
+        while self.accept("ident", "and"):
+            node = ("and", node, self.parse_comparison())
+        return node
+
+    def parse_comparison(self):
+        node = self.parse_postfix()
+        token = self.peek()
+        if token is not None and token[0] == "op" and token[1] in ("==", "!=", "<", "<=", ">", ">="):
+            self.pos += 1
+            node = ("compare", token[1], node, self.parse_postfix())
+        return node
+
+    def parse_postfix(self):
+        node = self.parse_primary()
+        while True:
+            if self.peek() == ("op", "."):
+                self.pos += 1
+                node = ("pipe", node, self.parse_field())
+            elif self.peek() == ("op", "["):
+                node = ("pipe", node, self.parse_brackets())
+            elif self.accept("op", "?"):
+                node = ("try", node)
+            else:
+                return node
+
+    def parse_field(self):
+        token = self.accept("ident") or self.accept("string")
+        if token is None:
+            raise JqError(f"Expected a field name in jq expression: {self.expression}")
+        return ("field", token[1])
+
+    def parse_brackets(self):
+        self.expect("op", "[")
+        if self.accept("op", "]"):
+            return ("iterate",)
+        index = self.parse_pipe()
+        self.expect("op", "]")
+        return ("index", index)
+
+    def parse_primary(self):
+        token = self.peek()
+        if token is None:
+            raise JqError(f"Unexpected end of jq expression: {self.expression}")
+        kind, value = token
+        if kind == "op" and value == ".":
+            self.pos += 1
+            following = self.peek()
+            if following is not None and following[0] in ("ident", "string"):
+                return self.parse_field()
+            return ("identity",)
+        if kind == "op" and value == "..":
+            self.pos += 1
+            return ("recurse",)
+        if kind == "op" and value == "(":
+            self.pos += 1
+            node = self.parse_pipe()
+            self.expect("op", ")")
+            return node
+        if kind == "op" and value == "[":
+            self.pos += 1
+            if self.accept("op", "]"):
+                return ("literal", [])
+            node = self.parse_pipe()
+            self.expect("op", "]")
+            return ("collect", node)
+        if kind in ("string", "number"):
+            self.pos += 1
+            return ("literal", value)
+        if kind == "ident":
+            self.pos += 1
+            if value in ("true", "false", "null"):
+                return ("literal", {"true": True, "false": False, "null": None}[value])
+            args = []
+            if self.accept("op", "("):
+                args.append(self.parse_pipe())
+                while self.accept("op", ";"):
+                    args.append(self.parse_pipe())
+                self.expect("op", ")")
+            return ("call", value, tuple(args))
+        raise JqError(f"Unexpected '{value}' in jq expression: {self.expression}")
+
+    # -- evaluation
+
+    def run(self, obj):
+        return list(self.evaluate(self.program, obj))
+
+    def evaluate(self, node, value):
+        kind = node[0]
+        if kind == "identity":
+            yield value
+        elif kind == "literal":
+            yield node[1]
+        elif kind == "field":
+            if value is None:
+                yield None
+            elif isinstance(value, dict):
+                yield value.get(node[1])
+            else:
+                raise JqError(f"Cannot index {type_name(value)} with \"{node[1]}\"")
+        elif kind == "iterate":
+            if isinstance(value, dict):
+                yield from value.values()
+            elif isinstance(value, list):
+                yield from value
+            else:
+                raise JqError(f"Cannot iterate over {type_name(value)}")
+        elif kind == "index":
+            for index in self.evaluate(node[1], value):
+                yield self.index(value, index)
+        elif kind == "recurse":
+            yield from recurse(value)
+        elif kind == "pipe":
+            for intermediate in self.evaluate(node[1], value):
+                yield from self.evaluate(node[2], intermediate)
+        elif kind == "comma":
+            yield from self.evaluate(node[1], value)
+            yield from self.evaluate(node[2], value)
+        elif kind == "try":
+            try:
+                yield from list(self.evaluate(node[1], value))
+            except JqError:
+                return
+        elif kind == "compare":
+            for right in self.evaluate(node[3], value):
+                for left in self.evaluate(node[2], value):
+                    yield compare(node[1], left, right)
+        elif kind == "and":
+            for left in self.evaluate(node[1], value):
+                if not truthy(left):
+                    yield False
+                    continue
+                for right in self.evaluate(node[2], value):
+                    yield truthy(right)
+        elif kind == "or":
+            for left in self.evaluate(node[1], value):
+                if truthy(left):
+                    yield True
+                    continue
+                for right in self.evaluate(node[2], value):
+                    yield truthy(right)
+        elif kind == "collect":
+            yield list(self.evaluate(node[1], value))
+        elif kind == "call":
+            yield from self.call(node[1], node[2], value)
+        else:
+            raise JqError(f"Unknown jq node: {node}")
+
+    def index(self, value, index):
+        if value is None:
+            return None
+        if isinstance(value, list) and isinstance(index, int):
+            return value[index] if -len(value) <= index < len(value) else None
+        if isinstance(value, dict) and isinstance(index, str):
+            return value.get(index)
+        raise JqError(f"Cannot index {type_name(value)} with {type_name(index)}")
+
+    def call(self, name, args, value):
+        if name == "select":
+            for condition in self.evaluate(args[0], value):
+                if truthy(condition):
+                    yield value
+        elif name == "not":
+            yield not truthy(value)
+        elif name == "length":
+            if isinstance(value, bool):
+                raise JqError(f"{type_name(value)} has no length")
+            yield 0 if value is None else abs(value) if isinstance(value, (int, float)) else len(value)
+        elif name == "keys":
+            if not isinstance(value, (dict, list)):
+                raise JqError(f"{type_name(value)} has no keys")
+            yield sorted(value.keys()) if isinstance(value, dict) else list(range(len(value)))
+        elif name == "map":
+            yield [result for item in self.evaluate(("iterate",), value) for result in self.evaluate(args[0], item)]
+        elif name in ("startswith", "endswith", "test"):
+            for argument in self.evaluate(args[0], value):
+                if not isinstance(value, str) or not isinstance(argument, str):
+                    raise JqError(f"{name}() requires string inputs")
+                if name == "startswith":
+                    yield value.startswith(argument)
+                elif name == "endswith":
+                    yield value.endswith(argument)
+                else:
+                    yield re.search(argument, value) is not None
+        elif name == "contains":
+            for argument in self.evaluate(args[0], value):
+                yield contains(value, argument)
+        elif name == "has":
+            for key in self.evaluate(args[0], value):
+                yield key in value if isinstance(value, dict) else isinstance(key, int) and 0 <= key < len(value)
+        else:
+            raise JqError(f"{name}/{len(args)} is not a supported jq function")
+
+    def format(self, obj, raw=False, compact=False):
+        output = ""
+        for result in self.run(obj):
+            output += format_value(result, raw, compact) + "\n"
+        return output
+
+
+def type_name(value):
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    return "object"
+
+
+def truthy(value):
+    return value is not None and value is not False
+
+
+def compare(operator, left, right):
+    if operator == "==":
+        return type_name(left) == type_name(right) and left == right
+    if operator == "!=":
+        return not (type_name(left) == type_name(right) and left == right)
+    left, right = sort_key(left), sort_key(right)
+    if operator == "<":
+        return left < right
+    if operator == "<=":
+        return left <= right
+    if operator == ">":
+        return left > right
+    return left >= right
+
+
+def sort_key(value):
+    # jq orders the values of different types as null < false < true < numbers < strings < arrays < objects,
+    # the objects by their sorted keys first and then by the values of those keys
+    rank = ("null", "boolean", "number", "string", "array", "object").index(type_name(value))
+    if isinstance(value, list):
+        return rank, [sort_key(v) for v in value]
+    if isinstance(value, dict):
+        keys = sorted(value.keys())
+        return rank, keys, [sort_key(value[k]) for k in keys]
+    return rank, value if value is not None else 0
+
+
+def contains(value, argument):
+    if type_name(value) != type_name(argument):
+        raise JqError(f"{type_name(value)} and {type_name(argument)} cannot have their containment checked")
+    return contained(value, argument)
+
+
+def contained(value, argument):
+    # unlike at the top level, the values of different types nested in arrays and objects are just not contained
+    if isinstance(value, str) and isinstance(argument, str):
+        return argument in value
+    if isinstance(value, list) and isinstance(argument, list):
+        return all(any(contained(v, a) for v in value) for a in argument)
+    if isinstance(value, dict) and isinstance(argument, dict):
+        return all(k in value and contained(value[k], v) for k, v in argument.items())
+    return type_name(value) == type_name(argument) and value == argument
+
+
+def recurse(value):
+    yield value
+    if isinstance(value, dict):
+        for v in value.values():
+            yield from recurse(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from recurse(v)
+
+
+def format_value(value, raw=False, compact=False):
+    if raw and isinstance(value, str):
+        return value
+    if compact:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    return json.dumps(value, indent=2, ensure_ascii=False)
+
+
+@functools.lru_cache(maxsize=256)
+def compile(expression):
+    return Jq(expression)
+
+
+def jq(obj, expression, raw=False, compact=False):
+    """
+    Evaluates the jq expression on the parsed object and returns the output as 'jq' would print it,
+    one result per line. The compiled expressions are cached, so repeated evaluations do not parse them again.
+    """
+    return compile(expression).format(obj, raw, compact)
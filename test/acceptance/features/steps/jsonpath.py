@@ -0,0 +1,252 @@
+import functools
+import json
+import re
+
+
+class JsonPath(object):
+    """
+    Evaluates kubectl flavoured JSONPath templates (e.g. '{.items[*].metadata.name}') on parsed JSON documents
+    and prints the results the same way 'kubectl get -o jsonpath=...' does.
+    """
+
+    field_re = re.compile(r'((?:\\.|[^.\[\\])+)')
+    filter_re = re.compile(r'^\?\(@((?:\\.|[^=!<>\s)])*)\s*(?:(==|!=|<=|>=|<|>)\s*(.+?))?\s*\)$')
+
+    def __init__(self, template):
+        self.template = template
+        self.segments = self.parse_template(template)
+
+    def parse_template(self, template):
+        segments = []
+        pos = 0
+        while pos < len(template):
+            start = template.find("{", pos)
+            if start < 0:
+                segments.append(("text", template[pos:]))
+                break
+            if start > pos:
+                segments.append(("text", template[pos:start]))
+            end = self.find_closing_brace(template, start)
+            expression = template[start + 1:end].strip()
+            if expression.startswith('"') and expression.endswith('"'):
+                segments.append(("text", json.loads(expression)))
+            else:
+                segments.append(("path", self.parse_path(expression)))
+            pos = end + 1
+        return segments
+
+    def find_closing_brace(self, template, start):
+        quote = None
+        depth = 0
+        for i in range(start, len(template)):
+            c = template[i]
+            if quote is not None:
+                if c == quote and template[i - 1] != "\\":
+                    quote = None
+            elif c in "\"'":
+                quote = c
+            elif c == "{":
+                depth += 1
+            elif c == "}":
+                depth -= 1
+                if depth == 0:
+                    return i
+        raise ValueError(f"Unclosed '{{' in JSONPath template: {template}")
+
+    def parse_path(self, expression):
+        steps = []
+        pos = 0
+        if expression.startswith("$"):
+            pos = 1
+        elif expression.startswith("@"):
+            pos = 1
+        while pos < len(expression):
+            c = expression[pos]
+            if expression.startswith("..", pos):
+                match = self.field_re.match(expression, pos + 2)
+                if match is None:
+                    raise ValueError(f"Invalid recursive descent in JSONPath: {expression}")
+                steps.append(("recursive", self.unescape(match.group(1))))
+                pos = match.end()
+            elif c == ".":
+                if expression.startswith(".*", pos):
+                    steps.append(("wildcard",))
+                    pos += 2
+                    continue
+                match = self.field_re.match(expression, pos + 1)
+                if match is None:
+                    pos += 1
+                    continue
+                steps.append(("field", self.unescape(match.group(1))))
+                pos = match.end()
+            elif c == "[":
+                end = self.find_closing_bracket(expression, pos)
+                steps.append(self.parse_bracket(expression[pos + 1:end].strip(), expression))
+                pos = end + 1
+            elif c.isspace():
+                pos += 1
+            else:
+                match = self.field_re.match(expression, pos)
+                steps.append(("field", self.unescape(match.group(1))))
+                pos = match.end()
+        return steps
+
+    def find_closing_bracket(self, expression, start):
+        quote = None
+        depth = 0
+        for i in range(start, len(expression)):
+            c = expression[i]
+            if quote is not None:
+                if c == quote:
+                    quote = None
+            elif c in "\"'":
+                quote = c
+            elif c == "[":
+                depth += 1
+            elif c == "]":
+                depth -= 1
+                if depth == 0:
+                    return i
+        raise ValueError(f"Unclosed '[' in JSONPath: {expression}")
+
+    def parse_bracket(self, content, expression):
+        if content == "*":
+            return ("wildcard",)
+        if content.startswith("?"):
+            match = self.filter_re.match(content)
+            if match is None:
+                raise ValueError(f"Unsupported filter in JSONPath: {expression}")
+            path = self.parse_path(match.group(1)) if match.group(1) else []
+            value = None
+            if match.group(2) is not None:
+                value = self.parse_literal(match.group(3))
+            return ("filter", path, match.group(2), value)
+        if content[0] in "\"'":
+            return ("field", content[1:-1])
+        if ":" in content:
+            parts = [int(p) if p.strip() else None for p in content.split(":")]
+            return ("slice", parts[0], parts[1] if len(parts) > 1 else None)
+        return ("index", int(content))
+
+    def parse_literal(self, text):
+        text = text.strip()
+        if text[0] in "\"'":
+            return text[1:-1]
+        if text in ("true", "false"):
+            return text == "true"
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+
+    def unescape(self, field):
+        return field.replace("\\.", ".")
+
+    def find(self, obj):
+        results = []
+        for kind, value in self.segments:
+            if kind == "path":
+                results.extend(self.evaluate(value, obj))
+        return results
+
+    def evaluate(self, steps, obj):
+        nodes = [obj]
+        for step in steps:
+            nodes = [result for node in nodes for result in self.apply_step(step, node)]
+        return nodes
+
+    def apply_step(self, step, node):
+        kind = step[0]
+        if kind == "field":
+            if isinstance(node, dict) and step[1] in node:
+                return [node[step[1]]]
+            return []
+        if kind == "wildcard":
+            if isinstance(node, dict):
+                return list(node.values())
+            if isinstance(node, list):
+                return list(node)
+            return []
+        if kind == "index":
+            if isinstance(node, list) and -len(node) <= step[1] < len(node):
+                return [node[step[1]]]
+            return []
+        if kind == "slice":
+            if isinstance(node, list):
+                return node[step[1]:step[2]]
+            return []
+        if kind == "recursive":
+            return self.descend(node, step[1])
+        if kind == "filter":
+            items = node if isinstance(node, list) else [node]
+            return [item for item in items if self.matches(step, item)]
+        raise ValueError(f"Unknown JSONPath step: {step}")
+
+    def descend(self, node, field):
+        found = []
+        if isinstance(node, dict):
+            if field in node:
+                found.append(node[field])
+            for value in node.values():
+                found.extend(self.descend(value, field))
+        elif isinstance(node, list):
+            for value in node:
+                found.extend(self.descend(value, field))
+        return found
+
+    def matches(self, step, item):
+        _, path, operator, expected = step
+        values = self.evaluate(path, item)
+        if operator is None:
+            return len(values) > 0
+        if len(values) == 0:
+            return False
+        actual = values[0]
+        try:
+            if operator == "==":
+                return actual == expected
+            if operator == "!=":
+                return actual != expected
+            if operator == "<":
+                return actual < expected
+            if operator == ">":
+                return actual > expected
+            if operator == "<=":
+                return actual <= expected
+            if operator == ">=":
+                return actual >= expected
+        except TypeError:
+            return False
+        return False
+
+    def format(self, obj):
+        output = ""
+        for kind, value in self.segments:
+            if kind == "text":
+                output += value
+            else:
+                output += " ".join(format_value(v) for v in self.evaluate(value, obj))
+        return output
+
+
+def format_value(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+    return str(value)
+
+
+@functools.lru_cache(maxsize=256)
+def compile(template):
+    return JsonPath(template)
+
+
+def jsonpath(obj, template):
+    return compile(template).format(obj)
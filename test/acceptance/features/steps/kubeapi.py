@@ -0,0 +1,404 @@
+import atexit
+import base64
+import json
+import os
+import tempfile
+import threading
+import requests
+import singleflight
+import tracer
+import yaml
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+
+class ApiError(Exception):
+
+    def __init__(self, status, reason, message):
+        Exception.__init__(self, f"{reason} ({status}): {message}")
+        self.status = status
+        self.reason = reason
+        self.message = message
+
+
+class Resource(object):
+
+    def __init__(self, group, version, name, kind, namespaced):
+        self.group = group
+        self.version = version
+        self.name = name
+        self.kind = kind
+        self.namespaced = namespaced
+
+    def api_version(self):
+        return f"{self.group}/{self.version}" if self.group else self.version
+
+    def qualified_kind(self):
+        return f"{self.kind.lower()}.{self.group}" if self.group else self.kind.lower()
+
+    def path(self, namespace=None, name=None):
+        path = f"/apis/{self.group}/{self.version}" if self.group else f"/api/{self.version}"
+        if self.namespaced and namespace is not None:
+            path += f"/namespaces/{namespace}"
+        path += f"/{self.name}"
+        if name is not None:
+            path += f"/{name}"
+        return path
+
+
+class KubeConfig(object):
+
+    def __init__(self, paths):
+        self.clusters = {}
+        self.users = {}
+        self.contexts = {}
+        self.current_context = None
+        # the first file to set a particular value wins, the same way kubectl merges KUBECONFIG
+        for path in paths:
+            with open(path, "r") as f:
+                config = yaml.safe_load(f) or {}
+            for item in config.get("clusters") or []:
+                self.clusters.setdefault(item["name"], item.get("cluster", {}))
+            for item in config.get("users") or []:
+                self.users.setdefault(item["name"], item.get("user", {}))
+            for item in config.get("contexts") or []:
+                self.contexts.setdefault(item["name"], item.get("context", {}))
+            if self.current_context is None and config.get("current-context"):
+                self.current_context = config["current-context"]
+
+    @staticmethod
+    def load():
+        kubeconfig = os.getenv("KUBECONFIG")
+        assert kubeconfig is not None, "KUBECONFIG needs to be set in the environment"
+        return KubeConfig([p for p in kubeconfig.split(os.pathsep) if p != "" and os.path.exists(p)])
+
+    def context(self):
+        assert self.current_context in self.contexts, f"Current context '{self.current_context}' is not defined in the kubeconfig"
+        return self.contexts[self.current_context]
+
+    def cluster(self):
+        name = self.context().get("cluster")
+        assert name in self.clusters, f"Cluster '{name}' is not defined in the kubeconfig"
+        return self.clusters[name]
+
+    def user(self, name=None):
+        if name is None:
+            name = self.context().get("user")
+        assert name in self.users, f"User '{name}' is not defined in the kubeconfig"
+        return self.users[name]
+
+    def namespace(self):
+        return self.context().get("namespace", "default")
+
+
+class KubeApi(object):
+    """
+    Minimal Kubernetes REST client talking to the API server from the kubeconfig directly,
+    keeping the connections alive between the calls instead of forking a CLI process for each one.
+    """
+
+    field_manager = "sbo-acceptance-tests"
+    temp_files = []
+    # kinds the other objects of a batch might depend on, they are applied ahead of them
+    prerequisite_kinds = ("Namespace", "CustomResourceDefinition")
+
+    def __init__(self, kubeconfig, user=None, pool_size=16):
+        cluster = kubeconfig.cluster()
+        credentials = kubeconfig.user(user)
+        self.server = cluster["server"].rstrip("/")
+        self.default_namespace = kubeconfig.namespace()
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        if cluster.get("insecure-skip-tls-verify"):
+            self.session.verify = False
+            requests.packages.urllib3.disable_warnings()
+        elif "certificate-authority-data" in cluster:
+            self.session.verify = self.data_file(cluster["certificate-authority-data"])
+        elif "certificate-authority" in cluster:
+            self.session.verify = cluster["certificate-authority"]
+
+        if "token" in credentials:
+            self.session.headers["Authorization"] = f"Bearer {credentials['token']}"
+        elif "tokenFile" in credentials:
+            with open(credentials["tokenFile"], "r") as f:
+                self.session.headers["Authorization"] = f"Bearer {f.read().strip()}"
+        elif "username" in credentials:
+            self.session.auth = (credentials["username"], credentials.get("password", ""))
+        assert "exec" not in credentials and "auth-provider" not in credentials, \
+            "Credential plugins are not supported by the api backend, use a token or a client certificate"
+        cert = credentials.get("client-certificate") or self.data_file(credentials.get("client-certificate-data"))
+        key = credentials.get("client-key") or self.data_file(credentials.get("client-key-data"))
+        if cert is not None:
+            self.session.cert = (cert, key)
+
+        self.lock = threading.Lock()
+        self.group_versions = None
+        self.resources = {}
+
+    def data_file(self, data):
+        if data is None:
+            return None
+        f = tempfile.NamedTemporaryFile(delete=False, prefix="kubeapi-")
+        f.write(base64.b64decode(data))
+        f.close()
+        KubeApi.temp_files.append(f.name)
+        return f.name
+
+    def request(self, method, path, params=None, body=None, content_type="application/json", stream=False, timeout=60):
+        print(f",---------,-\n| API : {method} {path} {params or ''}\n'---------'-")  # for debugging purposes
+        headers = {"Accept": "application/json"}
+        data = None
+        if body is not None:
+            headers["Content-Type"] = content_type
+            data = json.dumps(body)
+        try:
+            with tracer.Span("api", f"{method} {path}") as span:
+                response = self.session.request(method, self.server + path, params=params, data=data, headers=headers, stream=stream,
+                                                timeout=(10, timeout))
+                span.args["status"] = response.status_code
+        except requests.exceptions.RequestException as err:
+            raise ApiError(0, type(err).__name__, str(err))
+        finally:
+            if method != "GET":
+                singleflight.wrote()
+        if response.status_code >= 400:
+            raise self.error(response)
+        return response
+
+    def error(self, response):
+        try:
+            status = response.json()
+            return ApiError(response.status_code, status.get("reason", response.reason), status.get("message", response.text))
+        except ValueError:
+            return ApiError(response.status_code, response.reason, response.text)
+
+    def get_json(self, path, params=None):
+        return self.request("GET", path, params).json()
+
+    # -- discovery
+
+    def discover_group_versions(self):
+        group_versions = [("", "v1")]
+        for group in self.get_json("/apis").get("groups", []):
+            versions = [group["preferredVersion"]["version"]] + \
+                [v["version"] for v in group["versions"] if v["version"] != group["preferredVersion"]["version"]]
+            group_versions.extend((group["name"], version) for version in versions)
+        return group_versions
+
+    def discover_resources(self, group, version):
+        key = (group, version)
+        if key not in self.resources:
+            path = f"/apis/{group}/{version}" if group else f"/api/{version}"
+            try:
+                resource_list = self.get_json(path).get("resources", [])
+            except ApiError as err:
+                if err.status not in (404, 503):
+                    raise
+                resource_list = []
+            self.resources[key] = resource_list
+        return self.resources[key]
+
+    def find_resource(self, resource_type):
+        resource_type = resource_type.lower()
+        name, _, group = resource_type.partition(".")
+        with self.lock:
+            if self.group_versions is None:
+                self.group_versions = self.discover_group_versions()
+            preferred = set()
+            for g, v in self.group_versions:
+                if group == "":
+                    # without an explicit group only the preferred (first listed) version of each group is considered
+                    if g in preferred:
+                        continue
+                elif group not in (g, f"{v}.{g}".strip(".")):
+                    continue
+                for r in self.discover_resources(g, v):
+                    if "/" in r["name"]:
+                        continue
+                    if name in [r["name"], r.get("singularName", ""), r["kind"].lower()] + r.get("shortNames", []):
+                        return Resource(g, v, r["name"], r["kind"], r["namespaced"])
+                preferred.add(g)
+        return None
+
+    def find_kind(self, api_version, kind):
+        group, _, version = api_version.rpartition("/")
+        with self.lock:
+            for r in self.discover_resources(group, version):
+                if "/" not in r["name"] and r["kind"] == kind:
+                    return Resource(group, version, r["name"], r["kind"], r["namespaced"])
+        return None
+
+    def invalidate_discovery(self):
+        with self.lock:
+            self.group_versions = None
+            self.resources = {}
+
+    def resource(self, resource_type):
+        resource = self.find_resource(resource_type)
+        if resource is None:
+            # the resource might have been just created by a CRD, so refresh the cached discovery once
+            self.invalidate_discovery()
+            resource = self.find_resource(resource_type)
+        if resource is None:
+            raise ApiError(404, "NotFound", f'the server doesn\'t have a resource type "{resource_type}"')
+        return resource
+
+    def resolve(self, resource_type):
+        return resource_type if isinstance(resource_type, Resource) else self.resource(resource_type)
+
+    def resource_for(self, obj):
+        resource = self.find_kind(obj["apiVersion"], obj["kind"])
+        if resource is None:
+            self.invalidate_discovery()
+            resource = self.find_kind(obj["apiVersion"], obj["kind"])
+        if resource is None:
+            raise ApiError(404, "NotFound", f'no matches for kind "{obj["kind"]}" in version "{obj["apiVersion"]}"')
+        return resource
+
+    # -- operations
+
+    def namespace_for(self, resource, namespace):
+        if not resource.namespaced:
+            return None
+        return namespace if namespace is not None else self.default_namespace
+
+    def get(self, resource_type, name, namespace=None):
+        resource = self.resolve(resource_type)
+        return self.get_json(resource.path(self.namespace_for(resource, namespace), name))
+
+    def list(self, resource_type, namespace=None, all_namespaces=False, label_selector=None, field_selector=None):
+        resource = self.resolve(resource_type)
+        params = {}
+        if label_selector is not None:
+            params["labelSelector"] = label_selector
+        if field_selector is not None:
+            params["fieldSelector"] = field_selector
+        ns = None if all_namespaces else self.namespace_for(resource, namespace)
+        result = self.get_json(resource.path(ns), params)
+        for item in result.get("items") or []:
+            item.setdefault("apiVersion", resource.api_version())
+            item.setdefault("kind", resource.kind)
+        result["items"] = result.get("items") or []
+        result["apiVersion"] = "v1"
+        result["kind"] = "List"
+        return result
+
+    def watch(self, resource_type, namespace=None, name=None, resource_version=None, timeout=300):
+        """
+        Yields the watch events of the given resource type starting from the given resource version.
+        A watch that has expired on the server side (410 Gone) is reported as ApiError with the status 410.
+        """
+        resource = self.resolve(resource_type)
+        params = {"watch": "true", "allowWatchBookmarks": "true", "timeoutSeconds": str(max(1, int(timeout)))}
+        if name is not None:
+            params["fieldSelector"] = f"metadata.name={name}"
+        if resource_version is not None:
+            params["resourceVersion"] = resource_version
+        response = self.request("GET", resource.path(self.namespace_for(resource, namespace)), params, stream=True, timeout=timeout + 10)
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "ERROR":
+                    status = event["object"]
+                    raise ApiError(status.get("code", 500), status.get("reason", "Error"), status.get("message", ""))
+                yield event
+        finally:
+            response.close()
+
+    def create(self, resource_type, obj, namespace=None):
+        resource = self.resolve(resource_type)
+        return self.request("POST", resource.path(self.namespace_for(resource, namespace)), body=obj).json()
+
+    def patch(self, resource_type, name, patch, namespace=None, patch_type="application/merge-patch+json"):
+        resource = self.resolve(resource_type)
+        return self.request("PATCH", resource.path(self.namespace_for(resource, namespace), name), body=patch, content_type=patch_type).json()
+
+    def apply(self, obj, namespace=None, validate=False):
+        """
+        Server-side applies the given object and returns the applied object together
+        with the action kubectl would report for it (created, configured or unchanged).
+        """
+        resource = self.resource_for(obj)
+        ns = self.namespace_for(resource, obj.get("metadata", {}).get("namespace", namespace))
+        path = resource.path(ns, obj["metadata"]["name"])
+        try:
+            previous = self.get_json(path)["metadata"]["resourceVersion"]
+        except ApiError as err:
+            if err.status != 404:
+                raise
+            previous = None
+        params = {"fieldManager": self.field_manager, "force": "true", "fieldValidation": "Strict" if validate else "Ignore"}
+        applied = self.request("PATCH", path, params=params, body=obj, content_type="application/apply-patch+yaml").json()
+        if previous is None:
+            action = "created"
+        elif previous == applied["metadata"]["resourceVersion"]:
+            action = "unchanged"
+        else:
+            action = "configured"
+        return applied, action, resource
+
+    def apply_many(self, objects, namespace=None, validate=False):
+        """
+        Applies the given objects concurrently and returns, in their order, either the result of apply()
+        or the ApiError the object failed with. Namespaces and CRDs are applied in a wave of their own
+        before all the other objects.
+        """
+        results = [None] * len(objects)
+        waves = [[i for i, obj in enumerate(objects) if obj.get("kind") in self.prerequisite_kinds],
+                 [i for i, obj in enumerate(objects) if obj.get("kind") not in self.prerequisite_kinds]]
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            for wave in waves:
+                futures = [(i, executor.submit(self.apply, objects[i], namespace, validate)) for i in wave]
+                for i, future in futures:
+                    try:
+                        results[i] = future.result()
+                    except ApiError as err:
+                        results[i] = err
+        return results
+
+    def delete(self, obj, namespace=None):
+        """
+        Deletes the given object and returns its resource together with the server's response,
+        which is either the object still waiting for its finalizers or a Status.
+        """
+        resource = self.resource_for(obj)
+        ns = self.namespace_for(resource, obj.get("metadata", {}).get("namespace", namespace))
+        deleted = self.request("DELETE", resource.path(ns, obj["metadata"]["name"])).json()
+        return resource, deleted
+
+
+def load_documents(text):
+    documents = []
+    for doc in yaml.safe_load_all(text):
+        if doc is None:
+            continue
+        if doc.get("kind", "").endswith("List") and "items" in doc:
+            documents.extend(doc.get("items") or [])
+        else:
+            documents.append(doc)
+    return documents
+
+
+clients = {}
+clients_lock = threading.Lock()
+
+
+def client(user=None):
+    with clients_lock:
+        if user not in clients:
+            clients[user] = KubeApi(KubeConfig.load(), user)
+        return clients[user]
+
+
+@atexit.register
+def remove_temp_files():
+    for path in KubeApi.temp_files:
+        if os.path.exists(path):
+            os.remove(path)
@@ -1,6 +1,24 @@
+import os
+import threading
+import kubeapi
+import warm_pool
+import yaml
+
 from environment import ctx
 
 from command import Command
+from kubeapi import ApiError
+from util import substitute_scenario_id_of
+
+# label of the namespaces created by the pool, e.g. for 'kubectl delete namespaces -l sbo-acceptance-tests/pool'
+pool_label = "sbo-acceptance-tests/pool"
+# steps making sure a namespace exists (see steps.py), the pool creates their namespaces ahead of the scenarios
+namespace_steps = ("namespace_maybe_create", "namespace_is_used", "given_namespace_from_env_is_used")
+# those of them also setting the namespace the scenario uses from then on
+used_namespace_steps = ("namespace_is_used", "given_namespace_from_env_is_used")
+# namespaces created during the run, by the scenarios or by the pool
+created = set()
+created_lock = threading.Lock()
 
 
 class Namespace(object):
@@ -8,11 +26,92 @@ class Namespace(object):
         self.name = name
         self.cmd = Command()
 
-    def create(self):
-        output, exit_code = self.cmd.run(f"{ctx.cli} create namespace {self.name}")
-        assert exit_code == 0, f"Unexpected output when creating namespace: '{output}'"
+    def create(self, labels=None):
+        if ctx.backend == "api":
+            try:
+                kubeapi.client().create("namespaces", {"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": self.name, "labels": labels or {}}})
+            except ApiError as err:
+                assert False, f"Unexpected output when creating namespace: '{err}'"
+        else:
+            if labels:
+                namespace = {"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": self.name, "labels": labels}}
+                output, exit_code = self.cmd.run(f"{ctx.cli} create -f -", yaml.safe_dump(namespace))
+            else:
+                output, exit_code = self.cmd.run(f"{ctx.cli} create namespace {self.name}")
+            assert exit_code == 0, f"Unexpected output when creating namespace: '{output}'"
+        with created_lock:
+            created.add(self.name)
         return True
 
+    def delete(self):
+        """
+        Requests the deletion of the namespace without waiting for it, returns False if the request has failed.
+        """
+        if ctx.backend == "api":
+            try:
+                kubeapi.client().delete({"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": self.name}})
+                return True
+            except ApiError as err:
+                print(f"Unable to delete namespace {self.name}: {err}")
+                return err.status == 404
+        output, exit_code = self.cmd.run(f"{ctx.cli} delete namespace {self.name} --ignore-not-found --wait=false")
+        if exit_code != 0:
+            print(f"Unable to delete namespace {self.name}: {output}")
+        return exit_code == 0
+
     def is_present(self):
+        if ctx.backend == "api":
+            try:
+                kubeapi.client().get("namespaces", self.name)
+                return True
+            except ApiError:
+                return False
         _, exit_code = self.cmd.run(f'{ctx.cli} get ns {self.name}')
         return exit_code == 0
+
+    def lease(self):
+        """
+        Returns True once the namespace exists in case the namespace pool is preparing it, None if the pool is not.
+        """
+        return warm_pool.claim("namespaces", self.name)
+
+
+def plan_namespaces(scenario, steps):
+    """
+    Returns the namespaces the scenario uses, in the order of their first use.
+    """
+    names = []
+    for _, match in steps:
+        name = namespace_of(scenario, match)
+        if name is not None and name not in names:
+            names.append(name)
+    return names
+
+
+def named_namespaces(scenario, steps):
+    """
+    Returns the namespaces the scenario uses by their names, i.e. leaving out those given by environment variables.
+    """
+    return plan_namespaces(scenario, [(step, match) for step, match in steps if match is None or match.func.__name__ != "given_namespace_from_env_is_used"])
+
+
+def namespace_of(scenario, match, steps=namespace_steps):
+    """
+    Returns the name of the namespace of the given matched step of the scenario, None if it is not one of the given namespace steps.
+    """
+    if match is None or match.func.__name__ not in steps:
+        return None
+    arguments = {argument.name: argument.value for argument in match.arguments}
+    if "namespace_env" in arguments:
+        return os.getenv(arguments["namespace_env"])
+    return substitute_scenario_id_of(scenario, arguments["namespace_name"])
+
+
+def prepare_namespace(name):
+    namespace = Namespace(name)
+    if not namespace.is_present():
+        namespace.create({pool_label: "true"})
+    return True
+
+
+warm_pool.register("namespaces", "TEST_ACCEPTANCE_NAMESPACE_POOL", plan_namespaces, prepare_namespace)
@@ -1,12 +1,18 @@
 import re
+import threading
+import warm_pool
 
 from command import Command
+from namespace import Namespace, namespace_of, used_namespace_steps
 from openshift import Openshift
 
+# operators found running during the run, as (operator class, name, namespace)
+running = set()
+running_lock = threading.Lock()
+
 
 class Operator(object):
 
-    openshift = Openshift()
     cmd = Command()
     pod_name_pattern = "{name}.*"
 
@@ -16,8 +22,35 @@ class Operator(object):
     operator_catalog_channel = ""
     operator_subscription_csv_version = None
     package_name = ""
+    # whether the operator is installed into the namespace of the scenario rather than the operators namespace
+    namespaced = False
+
+    @property
+    def openshift(self):
+        # each operator has its own, as operators_namespace is changed by some of them and they can be installed concurrently
+        if "_openshift" not in self.__dict__:
+            self._openshift = Openshift()
+        return self._openshift
+
+    def running_key(self):
+        return (type(self).__name__, self.name, self.openshift.operators_namespace)
 
     def is_running(self, wait=False):
+        """
+        Checks whether the operator is running, the operators found running are remembered for the rest of the run.
+        """
+        key = self.running_key()
+        with running_lock:
+            if key in running:
+                print(f"The operator {self.name} has been found running already")
+                return True
+        result = self.check_running(wait)
+        if result:
+            with running_lock:
+                running.add(key)
+        return result
+
+    def check_running(self, wait=False):
         if wait:
             pod_name = self.openshift.wait_for_pod(self.pod_name_pattern.format(name=self.name), self.openshift.operators_namespace)
         else:
@@ -45,3 +78,69 @@ class Operator(object):
             print("Failed to create {} operator subscription".format(self.package_name))
             return False
         return True
+
+    def install(self):
+        self.install_operator_subscription()
+
+    def ensure_running(self, namespace=None):
+        """
+        Installs the operator unless it is running, into the given namespace in case the operator is namespaced.
+        """
+        if self.namespaced:
+            self.openshift.operators_namespace = namespace
+        if not self.is_running():
+            self.install()
+            self.is_running(wait=True)
+
+
+def provisions(operator_class):
+    """
+    Marks the step making sure the given operator is running, so that the operator pool installs the operator ahead of the scenarios.
+    """
+    def mark(step):
+        step.provisioned_operator = operator_class
+        return step
+    return mark
+
+
+def provision(operator_class, namespace=None):
+    """
+    Makes sure the operator is running, waiting for the operator pool in case it is installing the operator.
+    """
+    if not warm_pool.claim("operators", (operator_class, namespace if operator_class.namespaced else None)):
+        operator_class().ensure_running(namespace)
+
+
+def plan_operators(scenario, steps):
+    """
+    Returns the operators the scenario needs as (operator class, namespace), the namespace being None unless the operator is namespaced.
+    """
+    operators = []
+    namespace = None
+    for _, match in steps:
+        namespace = namespace_of(scenario, match, used_namespace_steps) or namespace
+        operator_class = getattr(match.func, "provisioned_operator", None) if match is not None else None
+        if operator_class is None:
+            continue
+        if not operator_class.namespaced:
+            operators.append((operator_class, None))
+        elif namespace is not None:
+            operators.append((operator_class, namespace))
+    return operators
+
+
+def prepare_operator(operator):
+    """
+    Installs the operator unless it is running. Returns False when the namespace of a namespaced operator does not exist,
+    so the scenario installs the operator itself.
+    """
+    operator_class, namespace = operator
+    if namespace is not None:
+        warm_pool.wait("namespaces", namespace)
+        if not Namespace(namespace).is_present():
+            return False
+    operator_class().ensure_running(namespace)
+    return True
+
+
+warm_pool.register("operators", "TEST_ACCEPTANCE_OPERATOR_POOL", plan_operators, prepare_operator)
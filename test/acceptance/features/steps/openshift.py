@@ -1,10 +1,39 @@
 import re
-import time
+import wait_policy
 import base64
 import json
+import deferred
+import informer
+import kubeapi
+import package_manifests
+import singleflight
+import requests
 from environment import ctx
 from command import Command
 from behave import step
+from jq import jq, JqError
+from jsonpath import jsonpath
+from kubeapi import ApiError
+
+
+class ApplyResult(object):
+    """
+    Outcome of applying a single object: the action reported for it (created, configured or unchanged)
+    or the error it failed with. The resourceVersion is known only with the api backend.
+    """
+
+    def __init__(self, kind, name, namespace=None, action=None, resource_version=None, error=None):
+        self.kind = kind
+        self.name = name
+        self.namespace = namespace
+        self.action = action
+        self.resource_version = resource_version
+        self.error = error
+
+    def __str__(self):
+        if self.error is not None:
+            return self.error
+        return f"{self.kind}/{self.name} {self.action}"
 
 
 class Openshift(object):
@@ -116,11 +145,70 @@ spec:
           value: {bindingRoot}
 '''
 
+    def get(self, resource_type, name=None, namespace=None, output=None, all_namespaces=False, user=None):
+        if ctx.backend == "api":
+            return self.api_get(resource_type, name, namespace, output, all_namespaces, user)
+        cmd = f'{ctx.cli} get {resource_type}'
+        if name is not None:
+            cmd += f" {name}"
+        if all_namespaces:
+            cmd += " --all-namespaces"
+        elif namespace is not None:
+            cmd += f" -n {namespace}"
+        if output is not None:
+            cmd += f' -o "{output}"'
+        if user:
+            cmd += f" --user={user}"
+        return singleflight.do(cmd, lambda: self.cmd.run(cmd))
+
+    def api_object(self, resource_type, name=None, namespace=None, all_namespaces=False, user=None):
+        cache = None if all_namespaces else informer.lookup(namespace, user)
+        if cache is not None and cache.caches(resource_type):
+            return cache.list(resource_type) if name is None else cache.get(resource_type, name)
+        api = kubeapi.client(user)
+        if name is None:
+            return singleflight.do(("list", resource_type, namespace, all_namespaces, user), lambda: api.list(resource_type, namespace, all_namespaces))
+        return singleflight.do(("get", resource_type, name, namespace, user), lambda: api.get(resource_type, name, namespace))
+
+    def api_get(self, resource_type, name=None, namespace=None, output=None, all_namespaces=False, user=None):
+        try:
+            obj = self.api_object(resource_type, name, namespace, all_namespaces, user)
+            if output is not None and output.startswith("jsonpath="):
+                return jsonpath(obj, output[len("jsonpath="):]), 0
+            return json.dumps(obj, indent=4) + "\n", 0
+        except ApiError as err:
+            return f"Error from server ({err.reason}): {err.message}\n", 1
+        except ValueError as err:
+            return f"error: {err}\n", 1
+
+    def get_object(self, resource_type, name=None, namespace=None, all_namespaces=False, user=None):
+        if ctx.backend == "api":
+            try:
+                return self.api_object(resource_type, name, namespace, all_namespaces, user)
+            except ApiError as err:
+                print(f"Error getting {resource_type}/{name} in {namespace}: {err}")
+                return None
+        output, exit_code = self.get(resource_type, name, namespace, "json", all_namespaces, user)
+        if exit_code != 0:
+            print(f"Error getting {resource_type}/{name} in {namespace}: {output}")
+            return None
+        return json.loads(output)
+
+    def wait_for_output(self, resource_type, name, namespace, output, status, interval=20, timeout=180):
+        cmd_output = None
+        exit_code = -1
+        for _ in wait_policy.attempts(timeout, interval):
+            cmd_output, exit_code = self.get(resource_type, name, namespace, output)
+            if status in cmd_output:
+                return True, cmd_output, exit_code
+        print("ERROR: Time out while waiting for status message.")
+        return False, cmd_output, exit_code
+
     def get_pod_lst(self, namespace):
         return self.get_resource_lst("pods", namespace)
 
     def get_resource_lst(self, resource_plural, namespace):
-        output, exit_code = self.cmd.run(f'{ctx.cli} get {resource_plural} -n {namespace} -o "jsonpath={{.items[*].metadata.name}}"')
+        output, exit_code = self.get(resource_plural, namespace=namespace, output="jsonpath={.items[*].metadata.name}")
         assert exit_code == 0, f"Getting resource list failed as the exit code is not 0 with output - {output}"
         if len(output.strip()) == 0:
             return list()
@@ -149,41 +237,106 @@ spec:
             return None
 
     def is_resource_in(self, resource_type, resource_name=None):
-        if resource_name is None:
-            _, exit_code = self.cmd.run(f'{ctx.cli} get {resource_type}')
-        else:
-            _, exit_code = self.cmd.run(f'{ctx.cli} get {resource_type} {resource_name}')
-
+        _, exit_code = self.get(resource_type, resource_name)
         return exit_code == 0
 
     def wait_for_pod(self, pod_name_pattern, namespace, interval=5, timeout=600):
-        pod = self.search_pod_in_namespace(pod_name_pattern, namespace)
-        start = 0
-        if pod is not None:
-            return pod
-        else:
-            while ((start + interval) <= timeout):
-                pod = self.search_pod_in_namespace(pod_name_pattern, namespace)
-                if pod is not None:
-                    return pod
-                time.sleep(interval)
-                start += interval
+        for _ in wait_policy.attempts(timeout, interval):
+            pod = self.search_pod_in_namespace(pod_name_pattern, namespace)
+            if pod is not None:
+                return pod
         return None
 
     def check_pod_status(self, pod_name, namespace, wait_for_status="Running"):
-        cmd = f'{ctx.cli} get pod {pod_name} -n {namespace} -o "jsonpath={{.status.phase}}"'
-        status_found, output, exit_status = self.cmd.run_wait_for_status(cmd, wait_for_status)
+        status_found, output, exit_status = self.wait_for_output("pod", pod_name, namespace, "jsonpath={.status.phase}", wait_for_status)
         return status_found
 
     def get_pod_status(self, pod_name, namespace):
-        cmd = f'{ctx.cli} get pod {pod_name} -n {namespace} -o "jsonpath={{.status.phase}}"'
-        output, exit_status = self.cmd.run(cmd)
+        output, exit_status = self.get("pod", pod_name, namespace, "jsonpath={.status.phase}")
         print(f"Get pod status: {output}, {exit_status}")
         if exit_status == 0:
             return output
         return None
 
+    def api_apply(self, yaml, namespace=None, user=None, validate=False):
+        try:
+            documents = kubeapi.load_documents(yaml)
+        except ValueError as err:
+            return f"error: {err}\n", 1
+        results = self.api_apply_documents(documents, namespace, user, validate)
+        exit_code = 0 if all(result.error is None for result in results) else 1
+        return "\n".join(str(result) for result in results) + "\n", exit_code
+
+    def api_apply_documents(self, documents, namespace=None, user=None, validate=False):
+        results = []
+        for doc, applied in zip(documents, kubeapi.client(user).apply_many(documents, namespace, validate)):
+            if isinstance(applied, ApiError):
+                results.append(ApplyResult(doc["kind"], doc["metadata"]["name"], doc["metadata"].get("namespace", namespace),
+                                           error=f"Error from server ({applied.reason}): {applied.message}"))
+                continue
+            obj, action, resource = applied
+            informer.applied(resource, obj)
+            results.append(ApplyResult(resource.qualified_kind(), obj["metadata"]["name"], obj["metadata"].get("namespace"), action,
+                                       obj["metadata"]["resourceVersion"]))
+        return results
+
+    def cli_apply_result(self, output, obj, namespace=None):
+        kind = obj["kind"].lower()
+        name = obj["metadata"]["name"]
+        match = re.search(rf"^({kind}(?:\.[\w.-]+)?)/{re.escape(name)} (created|configured|unchanged)$", output, re.MULTILINE)
+        if match is None:
+            # a single apply command reports the errors of all the objects piped into it, keep those naming this one
+            errors = [line for line in output.splitlines() if name in line and not re.match(r"^[\w.-]+/", line)]
+            return ApplyResult(kind, name, obj["metadata"].get("namespace", namespace),
+                               error="\n".join(errors) if len(errors) > 0 else output.strip())
+        return ApplyResult(match.group(1), name, obj["metadata"].get("namespace", namespace), match.group(2))
+
+    def apply_many(self, yamls, namespace=None, user=None):
+        """
+        Applies several YAMLs at once and returns, for each of them, the list of ApplyResult of the objects it contains.
+        With the api backend all the objects are applied concurrently, with the cli backend they are piped into a single
+        apply command. In both cases namespaces and CRDs are applied first, ahead of the objects that might need them.
+        """
+        documents = [kubeapi.load_documents(yaml) for yaml in yamls]
+        if ctx.backend == "api":
+            results = self.api_apply_documents([doc for docs in documents for doc in docs], namespace, user)
+            grouped = []
+            for docs in documents:
+                grouped.append(results[:len(docs)])
+                results = results[len(docs):]
+            return grouped
+        ns_arg = f"-n {namespace}" if namespace is not None else ""
+        user_arg = f"--user={user}" if user is not None else ""
+        prerequisite = [any(doc.get("kind") in kubeapi.KubeApi.prerequisite_kinds for doc in docs) for docs in documents]
+        grouped = [None] * len(yamls)
+        for wave in (True, False):
+            indices = [i for i in range(len(yamls)) if prerequisite[i] == wave]
+            if len(indices) == 0:
+                continue
+            output, exit_code = self.cmd.run(f"{ctx.cli} apply {ns_arg} {user_arg} --validate=false -f -", "\n---\n".join(yamls[i] for i in indices))
+            for i in indices:
+                grouped[i] = [self.cli_apply_result(output, doc, namespace) for doc in documents[i]]
+        return grouped
+
+    def api_delete(self, yaml, namespace=None):
+        lines = []
+        exit_code = 0
+        api = kubeapi.client()
+        for doc in kubeapi.load_documents(yaml):
+            try:
+                resource, response = api.delete(doc, namespace)
+                informer.deleted(resource, api.namespace_for(resource, doc["metadata"].get("namespace", namespace)), doc["metadata"]["name"], response)
+                lines.append(f'{resource.qualified_kind()} "{doc["metadata"]["name"]}" deleted')
+            except ApiError as err:
+                lines.append(f"Error from server ({err.reason}): {err.message}")
+                exit_code = 1
+        return "\n".join(lines) + "\n", exit_code
+
     def apply(self, yaml, namespace=None, user=None):
+        if ctx.backend == "api":
+            output, exit_code = self.api_apply(yaml, namespace, user)
+            assert exit_code == 0, f"Non-zero exit code ({exit_code}) while applying a YAML: {output}"
+            return output
         if namespace is not None:
             ns_arg = f"-n {namespace}"
         else:
@@ -197,6 +350,10 @@ spec:
         return output
 
     def apply_invalid(self, yaml, namespace=None):
+        if ctx.backend == "api":
+            output, exit_code = self.api_apply(yaml, namespace, validate=True)
+            assert exit_code != 0, f"the command should fail but it did not, output: {output}"
+            return output
         if namespace is not None:
             ns_arg = f"-n {namespace}"
         else:
@@ -206,6 +363,10 @@ spec:
         return output
 
     def delete(self, yaml, namespace=None):
+        if ctx.backend == "api":
+            output, exit_code = self.api_delete(yaml, namespace)
+            assert exit_code == 0, f"Non-zero exit code ({exit_code}) while deleting a YAML: {output}"
+            return output
         if namespace is not None:
             ns_arg = f"-n {namespace}"
         else:
@@ -219,29 +380,13 @@ spec:
         return self.apply(catalog_source)
 
     def get_current_csv(self, package_name, catalog, channel):
-        cmd = f'{ctx.cli} get packagemanifests -o json | jq -r \'.items[] \
-            | select(.metadata.name=="{package_name}") \
-            | select(.status.catalogSource=="{catalog}").status.channels[] \
-            | select(.name=="{channel}").currentCSV\''
-        current_csv, exit_code = self.cmd.run(cmd)
-        if exit_code != 0:
-            print(f"\nNon-zero exit code ({exit_code}) returned while getting currentCSV: {current_csv}")
-            return None
-        current_csv = current_csv.strip("\n")
-        return current_csv
+        return package_manifests.current_csv(lambda: self.get_object("packagemanifests"), package_name, catalog, channel)
 
     def wait_for_package_manifest(self, package_name, operator_source_name, operator_channel, interval=5, timeout=120):
-        current_csv = self.get_current_csv(package_name, operator_source_name, operator_channel)
-        start = 0
-        if current_csv is not None:
-            return True
-        else:
-            while ((start + interval) <= timeout):
-                current_csv = self.get_current_csv(package_name, operator_source_name, operator_channel)
-                if current_csv is not None:
-                    return True
-                time.sleep(interval)
-                start += interval
+        for _ in wait_policy.attempts(timeout, interval):
+            current_csv = self.get_current_csv(package_name, operator_source_name, operator_channel)
+            if current_csv is not None:
+                return True
         return False
 
     def expose_service_route(self, name, namespace, port=""):
@@ -253,11 +398,11 @@ spec:
 
     def get_route_host(self, name, namespace):
         if ctx.cli == "oc":
-            output, exit_code = self.cmd.run(f'{ctx.cli} get route {name} -n {namespace} -o "jsonpath={{.status.ingress[0].host}}"')
+            output, exit_code = self.get("route", name, namespace, "jsonpath={.status.ingress[0].host}")
             host = output
         else:
             addr = self.get_node_address()
-            output, exit_code = self.cmd.run(f'{ctx.cli} get service {name} -n {namespace} -o "jsonpath={{.spec.ports[0].nodePort}}"')
+            output, exit_code = self.get("service", name, namespace, "jsonpath={.spec.ports[0].nodePort}")
             host = f"{addr}:{output}"
 
         assert exit_code == 0, f"Getting route host failed as the exit code is not 0 with output - {output}"
@@ -265,7 +410,7 @@ spec:
         return host
 
     def get_node_address(self):
-        output, exit_code = self.cmd.run(f'{ctx.cli} get nodes -o "jsonpath={{.items[0].status.addresses}}"')
+        output, exit_code = self.get("nodes", output="jsonpath={.items[0].status.addresses}")
         assert exit_code == 0, f"Error accessing Node resources - {output}"
         addresses = json.loads(output)
         for addr in addresses:
@@ -274,39 +419,29 @@ spec:
         assert False, f"No IP addresses found in {output}"
 
     def get_deployment_status(self, deployment_name, namespace, wait_for_status=None, interval=5, timeout=400):
-        deployment_status_cmd = f'{ctx.cli} get deployment {deployment_name} -n {namespace} -o json' \
-            + ' | jq -rc \'.status.conditions[] | select(.type=="Available").status\''
-        output = None
-        exit_code = -1
+        json_path = 'jsonpath={.status.conditions[?(@.type=="Available")].status}'
         if wait_for_status is not None:
-            status_found, output, exit_code = self.cmd.run_wait_for_status(deployment_status_cmd, wait_for_status, interval, timeout)
+            status_found, output, exit_code = self.wait_for_output("deployment", deployment_name, namespace, json_path, wait_for_status, interval, timeout)
             if exit_code == 0:
                 assert status_found is True, f"Deployment {deployment_name} result after waiting for status is {status_found}"
         else:
-            output, exit_code = self.cmd.run(deployment_status_cmd)
+            output, exit_code = self.get("deployment", deployment_name, namespace, json_path)
         assert exit_code == 0, "Getting deployment status failed as the exit code is not 0"
 
         return output
 
     def get_deployment_env_info(self, name, namespace):
-        env_cmd = f'{ctx.cli} get deploy {name} -n {namespace} -o "jsonpath={{.spec.template.spec.containers[0].env}}"'
-        env, exit_code = self.cmd.run(env_cmd)
+        env, exit_code = self.get("deploy", name, namespace, "jsonpath={.spec.template.spec.containers[0].env}")
         assert exit_code == 0, f"Non-zero exit code ({exit_code}) returned while getting deployment's env: {env}"
         return env
 
     def get_deployment_envFrom_info(self, name, namespace):
-        env_from_cmd = f'{ctx.cli} get deploy {name} -n {namespace} -o "jsonpath={{.spec.template.spec.containers[0].envFrom}}"'
-        env_from, exit_code = self.cmd.run(env_from_cmd)
+        env_from, exit_code = self.get("deploy", name, namespace, "jsonpath={.spec.template.spec.containers[0].envFrom}")
         assert exit_code == 0, f"Non-zero exit code ({exit_code}) returned while getting deployment's envFrom: {env_from}"
         return env_from
 
     def get_resource_info_by_jsonpath(self, resource_type, name, namespace=None, json_path="{.*}", user=None):
-        oc_cmd = f'{ctx.cli} get {resource_type} {name} -o "jsonpath={json_path}"'
-        if namespace is not None:
-            oc_cmd += f" -n {namespace}"
-        if user:
-            oc_cmd += f" --user={user}"
-        output, exit_code = self.cmd.run(oc_cmd)
+        output, exit_code = self.get(resource_type, name, namespace, f"jsonpath={json_path}", user=user)
         if exit_code == 0:
             if resource_type == "secrets":
                 return base64.decodebytes(bytes(output, 'utf-8')).decode('utf-8')
@@ -316,17 +451,32 @@ spec:
             print(f'Error getting value for {resource_type}/{name} in {namespace} path={json_path}: {output}')
             return None
 
+    def resource_info_by_jsonpath(self, resource_type, obj, json_path):
+        if obj is None:
+            return None
+        output = jsonpath(obj, json_path)
+        if resource_type == "secrets":
+            return base64.decodebytes(bytes(output, 'utf-8')).decode('utf-8')
+        return output
+
+    def resource_info_by_jq(self, obj, jq_expression):
+        if obj is None:
+            return ""
+        try:
+            return jq(obj, jq_expression)
+        except JqError as err:
+            return f"jq: error: {err}\n"
+
     def get_json_resource(self, resource_type, name, namespace):
         error_msg = f"Error in getting resource: '{resource_type}' '{name}' namespace: '{namespace}'"
-        output, exit_code = self.cmd.run(f'{ctx.cli} get {resource_type} {name} -n {namespace} -o json')
+        output, exit_code = self.get(resource_type, name, namespace, "json")
         assert exit_code == 0, error_msg
         json_output = json.loads(output)
         assert json_output is not None, "Error in parsing JSON"
         return json_output
 
     def get_resource_info_by_jq(self, resource_type, name, namespace, jq_expression, wait=False, interval=5, timeout=120):
-        output, exit_code = self.cmd.run(f'{ctx.cli} get {resource_type} {name} -n {namespace} -o json | jq  \'{jq_expression}\'')
-        return output
+        return self.resource_info_by_jq(self.get_object(resource_type, name, namespace), jq_expression)
 
     def create_image_stream(self, name, registry_namespace):
         image_stream = self.image_stream_template.format(name=name, namespace=registry_namespace)
@@ -334,7 +484,7 @@ spec:
 
     def get_docker_image_repository(self, name, namespace):
         cmd = f'{ctx.cli} get is {name} -n {namespace} -o "jsonpath={{.status.dockerImageRepository}}"'
-        (output, exit_code) = self.cmd.run(cmd)
+        (output, exit_code) = self.get("is", name, namespace, "jsonpath={.status.dockerImageRepository}")
         assert exit_code == 0, f"cmd-{cmd} result for getting docker image repository is {output} with exit code-{exit_code} not equal to 0"
         return output
 
@@ -348,26 +498,22 @@ spec:
         return self.apply(knative_service_yaml)
 
     def wait_for_build_pod_status(self, build_pod_name, namespace, wait_for_status="Succeeded", timeout=780):
-        cmd = f'{ctx.cli} get pod {build_pod_name} -n {namespace} -o "jsonpath={{.status.phase}}"'
-        status_found, output, exit_status = self.cmd.run_wait_for_status(cmd, wait_for_status, timeout=timeout)
+        status_found, output, exit_status = self.wait_for_output("pod", build_pod_name, namespace, "jsonpath={.status.phase}", wait_for_status, timeout=timeout)
         return status_found, output
 
     def get_deployment_name_in_namespace(self, deployment_name_pattern, namespace, wait=False, interval=5, timeout=120, resource="deployment"):
         if wait:
-            start = 0
-            while ((start + interval) <= timeout):
+            for _ in wait_policy.attempts(timeout, interval):
                 deployment = self.search_resource_in_namespace(resource, deployment_name_pattern, namespace)
                 if deployment is not None:
                     return deployment
-                time.sleep(interval)
-                start += interval
             return None
         else:
             return self.search_resource_in_namespace(resource, deployment_name_pattern, namespace)
 
     def get_knative_route_host(self, name, namespace):
         cmd = f'{ctx.cli} get rt {name} -n {namespace} -o "jsonpath={{.status.url}}"'
-        output, exit_code = self.cmd.run(cmd)
+        output, exit_code = self.get("rt", name, namespace, "jsonpath={.status.url}")
         assert exit_code == 0, f"cmd-{cmd} result for getting knative route is {output} with exit code not equal to 0"
         return output
 
@@ -376,7 +522,7 @@ spec:
 
     def get_last_revision_status(self, revision, namespace):
         cmd = f'{ctx.cli} get rev {revision} -n {namespace} -o "jsonpath={{.status.conditions[*].status}}"'
-        (output, exit_code) = self.cmd.run(cmd)
+        (output, exit_code) = self.get("rev", revision, namespace, "jsonpath={.status.conditions[*].status}")
         assert exit_code == 0, f"cmd-{cmd} for getting last revision status is {output} with exit code not equal to 0"
         last_revision_status = output.split(" ")[-1]
         return last_revision_status
@@ -384,7 +530,7 @@ spec:
     def create_operator_subscription_to_namespace(self, package_name, namespace, operator_source_name, channel, csv_version=None):
         operator_subscription = self.operator_subscription_to_namespace_yaml_template.format(
             name=package_name, namespace=namespace, operator_source_name=operator_source_name, olm_namespace=self.olm_namespace,
-            channel=channel, csv_version=self.get_current_csv(package_name, operator_source_name, channel) if csv_version is None else csv_version)
+            channel=channel, csv_version=(self.get_current_csv(package_name, operator_source_name, channel) or "") if csv_version is None else csv_version)
         return self.apply(operator_subscription)
 
     def create_operator_subscription(self, package_name, operator_source_name, channel, csv_version=None):
@@ -422,17 +568,27 @@ spec:
         return None
 
     def lookup_namespace_for_resource(self, resource_plural, name):
-        output, code = self.cmd.run(
-            f"{ctx.cli} get {resource_plural} --all-namespaces -o json"
-            + f" | jq -rc '.items[] | select(.metadata.name == \"{name}\").metadata.namespace'")
-        assert code == 0, f"Non-zero return code while trying to detect namespace for {resource_plural} '{name}': {output}"
-        output = str(output).strip()
+        resources = self.get_object(resource_plural, all_namespaces=True)
+        assert resources is not None, f"Unable to list {resource_plural} while trying to detect namespace for {resource_plural} '{name}'"
+        output = jq(resources, f'.items[] | select(.metadata.name == "{name}").metadata.namespace', raw=True, compact=True)
+        output = output.strip()
         if output != "":
             return output
         else:
             return None
 
     def apply_yaml_file(self, yaml, namespace=None, validate=False):
+        if ctx.backend == "api":
+            if re.match(r"^https?://", yaml):
+                response = requests.get(yaml, timeout=(10, 60))
+                response.raise_for_status()
+                content = response.text
+            else:
+                with open(yaml, "r") as f:
+                    content = f.read()
+            output, exit_code = self.api_apply(content, namespace, validate=validate)
+            assert exit_code == 0, "Applying yaml file failed as the exit code is not 0"
+            return output
         if namespace is not None:
             ns_arg = f"-n {namespace}"
         else:
@@ -451,8 +607,7 @@ spec:
         # Expected result from 'oc' (openshift client) v4.6+
         expected_secretRef_oc_46 = f'{{"secretRef":{{"name":"{intermediate_secret_name}"}}}}'
         if wait:
-            start = 0
-            while ((start + interval) <= timeout):
+            for _ in wait_policy.attempts(timeout, interval):
                 deployment_list = self.get_deployment_names_of_given_pattern(deployment_name_pattern, namespace)
                 if deployment_list is not None:
                     for deployment in deployment_list:
@@ -466,8 +621,6 @@ spec:
                                 {expected_secretRef_oc_45} \nbut was: {result}\n")
                 else:
                     print(f"No deployment that matches {deployment_name_pattern} found.\n")
-                time.sleep(interval)
-                start += interval
         else:
             deployment_list = self.get_deployment_names_of_given_pattern(deployment_name_pattern, namespace)
             if deployment_list is not None:
@@ -501,7 +654,45 @@ spec:
                 (output, exit_code) = self.cmd.run(cmd)
         assert exit_code == 0, f"Non-zero exit code ({exit_code}) returned when attempting to create a new app using following command line {cmd}\n: {output}"
 
+    def reset_deployment(self, name, namespace, env=None):
+        """
+        Strips whatever a previous binding might have injected into the pod template of the deployment:
+        the environment variables (except for the given ones), envFrom, volumes and volume mounts.
+        """
+        obj = self.get_object("deployment", name, namespace)
+        assert obj is not None, f"Unable to get deployment {name} in {namespace} namespace to reset it"
+        pod_spec = obj["spec"]["template"]["spec"]
+        ops = []
+        for i, container in enumerate(pod_spec.get("containers", [])):
+            path = f"/spec/template/spec/containers/{i}"
+            ops.extend({"op": "remove", "path": f"{path}/{field}"} for field in ("envFrom", "volumeMounts") if field in container)
+            if env and container.get("env") != env:
+                ops.append({"op": "add", "path": f"{path}/env", "value": env})
+            elif not env and "env" in container:
+                ops.append({"op": "remove", "path": f"{path}/env"})
+        if "volumes" in pod_spec:
+            ops.append({"op": "remove", "path": "/spec/template/spec/volumes"})
+        if len(ops) == 0:
+            return
+        if ctx.backend == "api":
+            try:
+                kubeapi.client().patch("deployments", name, ops, namespace, patch_type="application/json-patch+json")
+            except ApiError as err:
+                assert False, f"Unable to reset deployment {name}: {err}"
+            return
+        cmd = f"{ctx.cli} patch deployment {name} -n {namespace} --type=json -p '{json.dumps(ops)}'"
+        (output, exit_code) = self.cmd.run(cmd)
+        assert exit_code == 0, f"Non-zero exit code ({exit_code}) returned when attempting to reset deployment: {cmd}\n: {output}"
+
     def set_label(self, name, label, namespace):
+        if ctx.backend == "api":
+            key, _, value = label.partition("=")
+            labels = {key[:-1]: None} if value == "" and key.endswith("-") else {key: value}
+            try:
+                kubeapi.client().patch("deployments", name, {"metadata": {"labels": labels}}, namespace)
+            except ApiError as err:
+                assert False, f"Unable to set label {label} on deployment {name}: {err}"
+            return
         cmd = f"{ctx.cli} label deployments {name} '{label}' -n {namespace}"
         (output, exit_code) = self.cmd.run(cmd)
         assert exit_code == 0, f"Non-zero exit code ({exit_code}) returned when attempting set label: {cmd}\n: {output}"
@@ -512,12 +703,21 @@ spec:
         return output
 
     def check_for_condition(self, resource, name, namespace, condition, value, timeout=0):
+        if ctx.backend == "api":
+            for _ in wait_policy.attempts(float(timeout)):
+                obj = self.get_object(resource, name, namespace)
+                if obj is not None:
+                    for c in obj.get("status", {}).get("conditions", []):
+                        if c["type"].lower() == condition.lower() and str(c["status"]).lower() == str(value).lower():
+                            return
+            assert False, f"Condition {condition}={value} for {resource}/{name} in {namespace} namespace was not met\n: {obj}"
         output, exit_code = self.cmd.run(f'{ctx.cli} wait --for=condition={condition}={value} {resource}/{name} --timeout={timeout}s -n {namespace}')
         assert exit_code == 0, f"Condition {condition}={value} for {resource}/{name} in {namespace} namespace was not met\n: {output}"
 
 
 @step(u"Condition {condition}={value} for {resource}/{name} resource is met")
 @step(u"Condition {condition}={value} for {resource}/{name} resource is met in less then {timeout} seconds")
+@deferred.assertion
 def condition_is_met_for_resource(context, condition, value, resource, name, timeout=600):
     openshift = Openshift()
     openshift.check_for_condition(resource, name, context.namespace.name, condition, value, timeout=timeout)
@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+
+
+class PackageManifestIndex(object):
+    """
+    In-memory index of the package manifests of the catalogs, (package, catalog source, channel) -> current CSV.
+
+    The index is built from a single list of all the package manifests and rebuilt once it is older than `ttl` seconds.
+    A lookup missing from the index rebuilds it as well, at most once per `miss_interval` seconds,
+    so that polling for a catalog source being populated sees its packages without listing the whole catalog on every poll.
+    """
+
+    def __init__(self, ttl, miss_interval=5):
+        self.ttl = ttl
+        self.miss_interval = miss_interval
+        self.lock = threading.Lock()
+        self.index = None
+        self.built = 0
+
+    def build(self, manifests):
+        index = {}
+        for item in manifests["items"]:
+            for channel in item.get("status", {}).get("channels", []):
+                index[(item["metadata"]["name"], item["status"].get("catalogSource"), channel["name"])] = channel.get("currentCSV")
+        return index
+
+    def refresh(self, list_manifests, max_age):
+        if self.index is not None and time.monotonic() - self.built < max_age:
+            return
+        manifests = list_manifests()
+        if manifests is None:
+            return
+        self.index = self.build(manifests)
+        self.built = time.monotonic()
+        print(f"Indexed {len(self.index)} package manifest channels")
+
+    def current_csv(self, list_manifests, package_name, catalog, channel):
+        """
+        Returns the current CSV of the channel of the package in the catalog source, None if there is none (yet).
+        list_manifests() returns the list of all the package manifests, or None in case they cannot be listed.
+        """
+        key = (package_name, catalog, channel)
+        with self.lock:
+            self.refresh(list_manifests, self.ttl)
+            if self.index is not None and key not in self.index:
+                self.refresh(list_manifests, self.miss_interval)
+            return self.index.get(key) if self.index is not None else None
+
+    def clear(self):
+        with self.lock:
+            self.index = None
+
+
+index = PackageManifestIndex(float(os.getenv("TEST_ACCEPTANCE_PACKAGE_MANIFEST_TTL", "300")))
+
+
+def current_csv(list_manifests, package_name, catalog, channel):
+    return index.current_csv(list_manifests, package_name, catalog, channel)
+
+
+def clear():
+    index.clear()
@@ -1,10 +1,12 @@
-from olm import Operator
+from olm import Operator, provision, provisions
 from environment import ctx
 from behave import given
 
 
 class PerconaMysqlOperator(Operator):
 
+    namespaced = True
+
     def __init__(self, name="percona-xtradb-cluster-operator"):
         self.name = name
         if ctx.cli == "oc":
@@ -14,36 +16,36 @@ class PerconaMysqlOperator(Operator):
         self.operator_catalog_channel = "stable"
         self.package_name = "percona-xtradb-cluster-operator"
 
-
-@given(u'Percona Mysql operator is running')
-def install(context):
-    operator = PerconaMysqlOperator()
-    operator.openshift.operators_namespace = context.namespace.name
-    if not operator.is_running():
+    def install(self):
         subscription = f'''
 ---
 apiVersion: operators.coreos.com/v1
 kind: OperatorGroup
 metadata:
   name: operatorgroup
-  namespace: {operator.openshift.operators_namespace}
+  namespace: {self.openshift.operators_namespace}
 spec:
   targetNamespaces:
-  - {operator.openshift.operators_namespace}
+  - {self.openshift.operators_namespace}
 ---
 apiVersion: operators.coreos.com/v1alpha1
 kind: Subscription
 metadata:
-  name: '{operator.name}'
-  namespace: {operator.openshift.operators_namespace}
+  name: '{self.name}'
+  namespace: {self.openshift.operators_namespace}
 spec:
-  channel: '{operator.operator_catalog_channel}'
+  channel: '{self.operator_catalog_channel}'
   installPlanApproval: Automatic
-  name: '{operator.package_name}'
-  source: '{operator.operator_catalog_source_name}'
-  sourceNamespace: {operator.openshift.olm_namespace}
+  name: '{self.package_name}'
+  source: '{self.operator_catalog_source_name}'
+  sourceNamespace: {self.openshift.olm_namespace}
         '''
         print(subscription)
-        operator.openshift.apply(subscription)
-        operator.is_running(wait=True)
+        self.openshift.apply(subscription)
+
+
+@given(u'Percona Mysql operator is running')
+@provisions(PerconaMysqlOperator)
+def install(context):
+    provision(PerconaMysqlOperator, context.namespace.name)
     print("Percona Mysql operator is running")
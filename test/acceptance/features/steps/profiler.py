@@ -0,0 +1,154 @@
+import json
+import os
+import re
+import shlex
+import threading
+import step_metrics
+
+# upper bounds (in seconds) of the latency histogram buckets
+buckets = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+# verbs followed by the type of the resource they act on
+resource_verbs = ("get", "describe", "delete", "wait", "label", "annotate", "patch", "expose", "edit", "scale")
+read_verbs = ("get", "describe", "api-resources", "api-versions", "explain", "version", "whoami", "config")
+# options of the CLI taking a value as the following argument
+value_options = ("-n", "--namespace", "-o", "--output", "-f", "--filename", "-l", "--selector", "--field-selector", "-p", "--patch", "--type",
+                 "--as", "--for", "--timeout", "-c", "--container", "--context", "--kubeconfig", "--template", "--sort-by", "--name", "--port")
+
+
+class CallStats(object):
+    """
+    Number of calls of a single verb on a single resource type and the histogram of their latencies.
+    """
+
+    def __init__(self, verb, resource):
+        self.verb = verb
+        self.resource = resource
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.histogram = [0] * len(buckets)
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        self.min = duration if self.min is None else min(self.min, duration)
+        self.max = max(self.max, duration)
+        self.histogram[next(i for i, bound in enumerate(buckets) if duration <= bound)] += 1
+
+    def merge(self, other):
+        self.count += other["count"]
+        self.total += other["total"]
+        self.min = other["min"] if self.min is None else min(self.min, other["min"])
+        self.max = max(self.max, other["max"])
+        for i, bucket in enumerate(buckets):
+            self.histogram[i] += other["histogram"].get(bucket_name(bucket), 0)
+
+    def to_dict(self):
+        return {"verb": self.verb, "resource": self.resource, "count": self.count, "total": round(self.total, 3),
+                "mean": round(self.total / self.count, 3), "min": round(self.min, 3), "max": round(self.max, 3),
+                "histogram": {bucket_name(bound): n for bound, n in zip(buckets, self.histogram)}}
+
+
+def bucket_name(bound):
+    return f"<={bound}s" if bound != float("inf") else f">{buckets[-2]}s"
+
+
+def classify(cmd):
+    """
+    Returns the verb and the resource type of the command, e.g. ('get', 'secret') for 'oc get secret/foo -n bar -o yaml'.
+    Commands other than oc or kubectl are classified by the program run, everything after a pipe is ignored.
+    """
+    try:
+        args = shlex.split(cmd.split("|")[0])
+    except ValueError:
+        args = cmd.split()
+    if len(args) == 0:
+        return "", None
+    program = os.path.basename(args[0])
+    if program not in ("oc", "kubectl"):
+        return program, None
+    positional = []
+    skip = False
+    for arg in args[1:]:
+        if skip:
+            skip = False
+        elif arg in value_options:
+            skip = True
+        elif not arg.startswith("-"):
+            positional.append(arg)
+    if len(positional) == 0:
+        return program, None
+    verb = positional[0]
+    if verb not in resource_verbs:
+        return verb, None
+    resource = positional[1].split("/")[0].lower() if len(positional) > 1 else None
+    if resource is not None and not re.match(r"^[a-z0-9.-]+$", resource):
+        resource = None
+    return verb, resource
+
+
+calls = {}
+reads = {}
+lock = threading.Lock()
+
+
+def path():
+    return os.getenv("TEST_ACCEPTANCE_PROFILE")
+
+
+def record(cmd, duration):
+    """
+    Records a command run, in case the profiler is enabled by TEST_ACCEPTANCE_PROFILE.
+    """
+    if path() is None:
+        return
+    verb, resource = classify(cmd)
+    step = step_metrics.current()
+    with lock:
+        key = (verb, resource)
+        if key not in calls:
+            calls[key] = CallStats(verb, resource)
+        calls[key].add(duration)
+        if step is not None and verb in read_verbs:
+            read = (step.scenario, step.location, step.step, cmd)
+            reads[read] = reads.get(read, 0) + 1
+
+
+def profile():
+    with lock:
+        duplicates = [{"scenario": scenario, "location": location, "step": step, "command": cmd, "count": count}
+                      for (scenario, location, step, cmd), count in reads.items() if count > 1]
+        return {"calls": sorted([stats.to_dict() for stats in calls.values()], key=lambda c: c["total"], reverse=True),
+                "duplicate_reads": sorted(duplicates, key=lambda d: d["count"], reverse=True)}
+
+
+def merge(profiles):
+    """
+    Merges several profiles (e.g. of parallel workers) into one.
+    """
+    merged = {}
+    duplicates = []
+    for p in profiles:
+        for call in p["calls"]:
+            key = (call["verb"], call["resource"])
+            if key not in merged:
+                merged[key] = CallStats(call["verb"], call["resource"])
+            merged[key].merge(call)
+        duplicates.extend(p["duplicate_reads"])
+    return {"calls": sorted([stats.to_dict() for stats in merged.values()], key=lambda c: c["total"], reverse=True),
+            "duplicate_reads": sorted(duplicates, key=lambda d: d["count"], reverse=True)}
+
+
+def write(profile_path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(profile_path)), exist_ok=True)
+    with open(profile_path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def print_summary(data, top=10):
+    print(f"\nCommands taking the most time ({len(data['calls'])} kind(s) of command in total):")
+    for call in data["calls"][:top]:
+        print(f"{call['total']:9.1f}s {call['count']:6d} call(s), mean {call['mean']:.2f}s, max {call['max']:.2f}s  {call['verb']} {call['resource'] or ''}")
+    count = sum(d["count"] - 1 for d in data["duplicate_reads"])
+    print(f"{count} read(s) repeating an identical read of the same step, {len(data['duplicate_reads'])} distinct read(s) repeated")
@@ -1,7 +1,7 @@
 from command import Command
 import re
-import time
-import requests
+import wait_policy
+import endpoints
 from openshift import Openshift
 
 
@@ -50,17 +50,14 @@ class QuarkusApplication(object):
         route_url = self.openshift.get_knative_route_host(self.name, self.namespace)
         if route_url is None:
             return None
-        url = f"{route_url}{endpoint}"
+        client = endpoints.client(route_url)
         if wait:
-            start = 0
-            while ((start + interval) <= timeout):
-                db_name = requests.get(url)
+            for _ in wait_policy.attempts(timeout, interval):
+                db_name = client.get(endpoint)
                 if db_name.status_code == 200:
                     return db_name.text
-                time.sleep(interval)
-                start += interval
         else:
-            db_name = requests.get(url)
+            db_name = client.get(endpoint)
             if db_name.status_code == 200:
                 return db_name.text
         return None
@@ -73,21 +70,17 @@ class QuarkusApplication(object):
         return pattern.format(name=self.name)
 
     def get_redeployed_rev_name(self, old_rev_name, interval=5, timeout=300):
-        start = 0
-        while ((start + interval) <= timeout):
+        for _ in wait_policy.attempts(timeout, interval):
             revisions = self.openshift.get_revisions(self.namespace)
             for rev in revisions:
                 if rev != old_rev_name and re.match(self.name, rev) is not None:
                     new_revision = self.openshift.get_last_revision_status(rev, self.namespace)
                     if new_revision == 'True':
                         return rev
-            time.sleep(interval)
-            start += interval
         return None
 
     def get_rev_name_redeployed_by_generation(self, old_generation, interval=5, timeout=300):
-        start = 0
-        while ((start + interval) <= timeout):
+        for _ in wait_policy.attempts(timeout, interval):
             current_generation = self.get_generation()
             revisions = self.openshift.get_revisions(self.namespace)
             for rev in revisions:
@@ -95,8 +88,6 @@ class QuarkusApplication(object):
                     new_revision = self.openshift.get_last_revision_status(rev, self.namespace)
                     if new_revision == 'True':
                         return rev
-            time.sleep(interval)
-            start += interval
         return None
 
     def get_generation(self):
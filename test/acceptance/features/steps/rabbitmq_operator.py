@@ -1,4 +1,4 @@
-from olm import Operator
+from olm import Operator, provision, provisions
 from behave import given
 
 
@@ -6,13 +6,14 @@ class RabbitMqOperator(Operator):
 
     def __init__(self, name="rabbitmq-cluster-operator"):
         self.name = name
+        self.openshift.operators_namespace = "rabbitmq-system"
+
+    def install(self):
+        self.openshift.apply_yaml_file("https://github.com/rabbitmq/cluster-operator/releases/download/v1.9.0/cluster-operator.yml")
 
 
 @given(u'RabbitMQ operator is running')
+@provisions(RabbitMqOperator)
 def install(_context):
-    operator = RabbitMqOperator()
-    operator.openshift.operators_namespace = "rabbitmq-system"
-    if not operator.is_running():
-        operator.openshift.apply_yaml_file("https://github.com/rabbitmq/cluster-operator/releases/download/v1.9.0/cluster-operator.yml")
-        operator.is_running(wait=True)
+    provision(RabbitMqOperator)
     print("RabbitMQ operator is running")
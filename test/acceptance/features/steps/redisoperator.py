@@ -1,4 +1,4 @@
-from olm import Operator
+from olm import Operator, provision, provisions
 from environment import ctx
 from behave import given
 
@@ -16,9 +16,7 @@ class RedisOperator(Operator):
 
 
 @given(u'Opstree Redis operator is running')
+@provisions(RedisOperator)
 def install_redis_operator(_context):
-    operator = RedisOperator()
-    if not operator.is_running():
-        operator.install_operator_subscription()
-        operator.is_running(wait=True)
+    provision(RedisOperator)
     print("Opstree Redis operator is running")
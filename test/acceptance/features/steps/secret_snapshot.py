@@ -0,0 +1,71 @@
+import base64
+import binascii
+import wait_policy
+
+from openshift import Openshift
+
+
+class SecretSnapshot(object):
+    """
+    The data of a secret with all its keys decoded at once. Each refresh reads the secret
+    (from the informer cache when there is one), but decodes it again only when its resourceVersion has changed.
+    """
+
+    def __init__(self, name, namespace):
+        self.name = name
+        self.namespace = namespace
+        self.openshift = Openshift()
+        self.resource_version = None
+        self.data = None
+
+    def refresh(self):
+        obj = self.openshift.get_object("secrets", self.name, self.namespace)
+        if obj is None:
+            self.resource_version = None
+            self.data = None
+        elif obj["metadata"].get("resourceVersion") != self.resource_version or self.data is None:
+            self.data = {key: decode(value) for key, value in (obj.get("data") or {}).items()}
+            self.resource_version = obj["metadata"].get("resourceVersion")
+            print(f"Secret {self.name} at resourceVersion {self.resource_version} has keys {sorted(self.data)}")
+        return self
+
+    def get(self, key):
+        """
+        Returns the decoded value of the key, an empty string if the secret does not have the key (the same as its jsonpath would).
+        """
+        return self.data.get(key, "") if self.data is not None else None
+
+    def wait(self, predicate, max_interval=5, timeout=120):
+        """
+        Waits for the predicate to hold for the snapshot. The secret is read again before each check, the snapshot of an earlier step
+        might be stale already, but it is decoded only once it has changed.
+        """
+        return wait_policy.poll(lambda: self.refresh(), check_success=lambda s: s.data is not None and predicate(s),
+                                max_interval=max_interval, timeout=timeout)
+
+
+def decode(value):
+    try:
+        return base64.b64decode(value).decode("utf-8", errors="replace")
+    except binascii.Error:
+        return value
+
+
+def of(context, name):
+    """
+    Returns the snapshot of the secret in the namespace of the scenario, kept for the rest of the scenario.
+    """
+    key = (context.namespace.name, name)
+    if key not in context.secret_snapshots:
+        context.secret_snapshots[key] = SecretSnapshot(name, context.namespace.name)
+    return context.secret_snapshots[key]
+
+
+def of_binding(context):
+    """
+    Returns the snapshot of the secret of the (first) service binding of the scenario.
+    """
+    sb = list(context.bindings.values())[0]
+    secret = wait_policy.poll(lambda: sb.get_secret_name(), max_interval=100, timeout=1000, ignore_exceptions=(ValueError,),
+                              check_success=lambda v: v is not None)
+    return of(context, secret)
@@ -1,6 +1,6 @@
 from olm import Operator
 from environment import ctx
-import polling2
+import wait_policy
 
 
 class ServerlessOperator(Operator):
@@ -12,11 +12,14 @@ class ServerlessOperator(Operator):
         self.name = "knative-operator" if ctx.cli == "kubectl" else name
         self.package_name = self.name
 
-    def is_running(self, wait=False):
+    def check_running(self, wait=False):
         currentCSV = self.openshift.get_current_csv(self.name, self.operator_catalog_source_name, self.operator_catalog_channel)
+        if currentCSV is None:
+            print(f"No package manifest of {self.name} found in {self.operator_catalog_source_name} catalog")
+            return False
         if wait:
-            polling2.poll(lambda: self.openshift.search_resource_in_namespace("csvs", currentCSV, self.openshift.operators_namespace),
-                          check_success=lambda v: v is not None, step=1, timeout=100)
+            wait_policy.poll(lambda: self.openshift.search_resource_in_namespace("csvs", currentCSV, self.openshift.operators_namespace),
+                             check_success=lambda v: v is not None, max_interval=1, timeout=100)
         else:
             if self.openshift.search_resource_in_namespace("csvs", currentCSV, self.openshift.operators_namespace) is None:
                 return False
@@ -1,10 +1,13 @@
 import os
 import yaml
-import polling2
+import deferred
 import json
+import secret_snapshot
 from behave import step, when, then
 from openshift import Openshift
 from util import substitute_scenario_id
+import waiter
+from waiter import Waiter
 
 
 class ServiceBinding(object):
@@ -48,11 +51,28 @@ class ServiceBinding(object):
         else:
             return self.openshift.get_resource_info_by_jq(self.crdName, self.name, self.namespace, json_path)
 
+    def get_info_from(self, obj, json_path):
+        if json_path.startswith("{"):
+            return self.openshift.resource_info_by_jsonpath(self.crdName, obj, json_path)
+        else:
+            return self.openshift.resource_info_by_jq(obj, json_path)
+
+    def get_infos_from(self, obj, json_paths):
+        return [self.get_info_from(obj, json_path) for json_path in json_paths]
+
     def get_secret_name(self):
         output = self.get_info_by_jsonpath(self.secretPath)
         assert output is not None, "Failed to fetch secret name from ServiceBinding"
         return output.strip().strip('"')
 
+    def get_secret_name_from(self, obj):
+        output = self.get_info_from(obj, self.secretPath)
+        assert output is not None, "Failed to fetch secret name from ServiceBinding"
+        return output.strip().strip('"')
+
+    def wait(self, predicate, timeout=800, ignore_exceptions=(), terminal=None):
+        return Waiter(self.crdName, self.name, self.namespace).wait(predicate, timeout, ignore_exceptions, terminal=terminal)
+
     def delete(self):
         self.openshift.delete(self.yamlContent, self.namespace)
 
@@ -102,32 +122,51 @@ def sbo_is_ready(context, sbr_name=None):
         sbr_name = list(context.bindings.values())[0].name
     else:
         sbr_name = substitute_scenario_id(context, sbr_name)
-    sbo_jq_is(context, '.status.conditions[] | select(.type=="CollectionReady").status', sbr_name, 'True')
-    sbo_jq_is(context, '.status.conditions[] | select(.type=="InjectionReady").status', sbr_name, 'True')
-    sbo_jq_is(context, '.status.conditions[] | select(.type=="Ready").status', sbr_name, 'True')
     sb = context.bindings[sbr_name]
+    # all the conditions, the generations and the secret name are read from the same fetched binding
+    conditions = [f'.status.conditions[] | select(.type=="{condition}").status' for condition in ("CollectionReady", "InjectionReady", "Ready")]
+    obj = sb.wait(lambda obj: all(json.loads(status) == 'True' for status in sb.get_infos_from(obj, conditions)), timeout=800,
+                  ignore_exceptions=(json.JSONDecodeError,), terminal=binding_terminal_state(context))
     if sb.crdName == "servicebindings.servicebinding.io":
-        generation = sb.get_info_by_jsonpath("{.metadata.generation}")
+        generation, observedGeneration = sb.get_infos_from(obj, ["{.metadata.generation}", "{.status.observedGeneration}"])
         assert generation is not None, f"Unable to get Service Binding {sb.name} generation"
-        observedGeneration = sb.get_info_by_jsonpath("{.status.observedGeneration}")
         assert observedGeneration is not None, f"Unable to get Service Binding {sb.name} observed generation"
         assert generation == observedGeneration, \
             f"Service binding {sb.name} observed generation ({observedGeneration}) not equal to generation ({generation})"
-    context.sb_secret = context.bindings[sbr_name].get_secret_name()
+    context.sb_secret = sb.get_secret_name_from(obj)
 
 
 # STEP
 @step(u'jq "{jq_expression}" of Service Binding "{sbr_name}" should be changed to "{json_value}"')
 @step(u'jq "{jq_expression}" of Service Binding should be changed to "{json_value}"')
+@deferred.assertion
 def sbo_jq_is(context, jq_expression, sbr_name=None, json_value=""):
     if sbr_name is None:
         sbr_name = list(context.bindings.values())[0].name
     else:
         sbr_name = substitute_scenario_id(context, sbr_name)
     json_value = substitute_scenario_id(context, json_value)
-    polling2.poll(lambda: json.loads(
-        context.bindings[sbr_name].get_info_by_jsonpath(jq_expression)) == json_value,
-                  step=5, timeout=800, ignore_exceptions=(json.JSONDecodeError,))
+    sb = context.bindings[sbr_name]
+    sb.wait(lambda obj: json.loads(sb.get_info_from(obj, jq_expression)) == json_value, timeout=800, ignore_exceptions=(json.JSONDecodeError,),
+            terminal=binding_terminal_state(context))
+
+
+def binding_terminal_state(context):
+    """
+    Returns the function describing the terminal state of a service binding for Waiter.wait: the conditions of the binding
+    and the containers of the application of the scenario in a terminal state, for the terminal reasons of the current step.
+    """
+    reasons = waiter.terminal_reasons(context.current_step if "current_step" in context else None)
+    if len(reasons) == 0:
+        return None
+    application = context.application if "application" in context else None
+
+    def terminal(obj):
+        state = waiter.condition_terminal_state(obj, reasons)
+        if state is None and application is not None and application.resource in ("deployment", "deploymentconfig"):
+            state = waiter.workload_terminal_state(application.resource, application.name, application.namespace, reasons)
+        return state
+    return terminal
 
 
 @when(u'Service binding "{sb_name}" is deleted')
@@ -151,25 +190,24 @@ def validate_persistent_sb(context, sb_name):
 
 @step(u'Service Binding "{sbr_name}" has the binding secret name set in the status')
 @step(u'Service Binding has the binding secret name set in the status')
+@deferred.assertion
 def sbo_secret_name_has_been_set(context, sbr_name=None):
     if sbr_name is None:
         sbr_name = list(context.bindings.values())[0].name
     else:
         sbr_name = substitute_scenario_id(context, sbr_name)
-    polling2.poll(lambda: context.bindings[sbr_name].get_secret_name() != "",
-                  step=5, timeout=800,  ignore_exceptions=(json.JSONDecodeError,))
+    sb = context.bindings[sbr_name]
+    sb.wait(lambda obj: sb.get_secret_name_from(obj) != "", timeout=800, ignore_exceptions=(json.JSONDecodeError,))
 
 
 @step(u'Service Binding {condition}.{field} is "{field_value}"')
+@deferred.assertion
 def check_sb_condition_field_value(context, condition, field, field_value):
     sb = list(context.bindings.values())[0]
     sbo_jq_is(context, f'.status.conditions[] | select(.type=="{condition}").{field}', sb.name, field_value)
 
 
 @step(u'Service Binding secret contains "{secret_key}" key')
+@deferred.assertion
 def check_secret_key(context, secret_key):
-    sb = list(context.bindings.values())[0]
-    openshift = Openshift()
-    secret = polling2.poll(lambda: sb.get_secret_name(), step=100, timeout=1000, ignore_exceptions=(ValueError,), check_success=lambda v: v is not None)
-    json_path = f'{{.data.{secret_key}}}'
-    polling2.poll(lambda: openshift.get_resource_info_by_jsonpath("secrets", secret, context.namespace.name, json_path) != "", step=5, timeout=120,)
+    secret_snapshot.of_binding(context).wait(lambda secret: secret.get(secret_key) != "")
@@ -0,0 +1,82 @@
+import copy
+import threading
+
+import cassette
+
+
+class Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.shared = 0
+
+
+class Group(object):
+    """
+    Coalesces identical calls in flight: a call made while another one with the same key is running waits for it
+    and gets its result (or its exception) instead of running again. Nothing is cached once the call has returned.
+    A call joins only those issued since the last write (see wrote()), so that a caller reading what it has just written
+    does not get a response read before its write.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.writes = 0
+
+    def wrote(self):
+        with self.lock:
+            self.writes += 1
+
+    def do(self, key, fn):
+        with self.lock:
+            key = (self.writes, key)
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = Call()
+                self.calls[key] = call
+            else:
+                call.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+        result = None
+        try:
+            result = fn()
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            if call.shared > 0:
+                # copied before the caller gets the result, so that the waiting callers do not see the changes it makes to it
+                call.result = copy.deepcopy(result)
+                print(f"{call.shared} identical read(s) of {key[1]} shared the same response")
+            call.done.set()
+
+
+group = Group()
+
+
+def do(key, fn):
+    """
+    Runs fn, unless an identical call (by key) is in flight already, in which case its result is shared.
+    The calls are not coalesced with cassettes, each of them is replayed as it has been recorded.
+    """
+    if cassette.mode() is not None:
+        return fn()
+    return group.do(key, fn)
+
+
+def wrote():
+    """
+    Records that the cluster might have changed (e.g. by an apply), the reads in flight are not shared with the later ones.
+    """
+    group.wrote()
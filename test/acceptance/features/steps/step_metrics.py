@@ -0,0 +1,170 @@
+import json
+import os
+import re
+import threading
+import yaml
+
+
+class StepMetrics(object):
+    """
+    What a single step cost: its wall time, the CLI commands it ran and the time it spent sleeping in polls
+    or blocked on watches waiting for the cluster.
+    """
+
+    def __init__(self, step, scenario, definition):
+        self.location = str(step.location)
+        self.scenario = scenario
+        self.step = f"{step.keyword} {step.name}"
+        self.definition = definition
+        self.status = None
+        self.duration = 0
+        self.commands = 0
+        self.command_time = 0
+        self.poll_wait = 0
+        self.budget = None
+
+    def over_budget(self):
+        return self.budget is not None and self.duration > self.budget
+
+    def to_dict(self):
+        return {"location": self.location, "scenario": self.scenario, "step": self.step, "definition": self.definition, "status": self.status,
+                "duration": round(self.duration, 3), "commands": self.commands, "command_time": round(self.command_time, 3),
+                "poll_wait": round(self.poll_wait, 3), "budget": self.budget, "over_budget": self.over_budget()}
+
+
+class BackgroundMetrics(object):
+    """
+    What was run outside of the steps: by the threads other than behave's (e.g. the warm pool, the teardown or the deferred
+    assertions) or by behave's own between the steps, which is not charged to the step running meanwhile.
+    """
+
+    def __init__(self):
+        self.commands = 0
+        self.command_time = 0
+        self.poll_wait = 0
+
+    def merge(self, other):
+        self.commands += other["commands"]
+        self.command_time += other["command_time"]
+        self.poll_wait += other["poll_wait"]
+
+    def to_dict(self):
+        return {"commands": self.commands, "command_time": round(self.command_time, 3), "poll_wait": round(self.poll_wait, 3)}
+
+
+# the step running on behave's thread, set only on that thread
+running = threading.local()
+background = BackgroundMetrics()
+recorded = []
+lock = threading.Lock()
+budgets = None
+
+
+def load_budgets():
+    """
+    Reads the time budgets from the YAML file given by TEST_ACCEPTANCE_STEP_BUDGETS, mapping a regular expression
+    matched against the step text (e.g. 'Then Service Binding is ready') to the maximum duration in seconds.
+    """
+    global budgets
+    if budgets is None:
+        budgets = []
+        path = os.getenv("TEST_ACCEPTANCE_STEP_BUDGETS")
+        if path is not None:
+            with open(path, "r") as f:
+                budgets = [(re.compile(pattern), float(seconds)) for pattern, seconds in (yaml.safe_load(f) or {}).items()]
+    return budgets
+
+
+def budget_of(step_text):
+    for pattern, seconds in load_budgets():
+        if pattern.search(step_text) is not None:
+            return seconds
+    return None
+
+
+def enforce_budgets():
+    return os.getenv("TEST_ACCEPTANCE_STEP_BUDGETS_FAIL", "false").lower() == "true"
+
+
+def current():
+    """
+    Returns the metrics of the step running on the calling thread, None on any other thread than behave's or between the steps.
+    """
+    return getattr(running, "step", None)
+
+
+def start(step, scenario, definition=None):
+    running.step = StepMetrics(step, scenario, definition)
+
+
+def finish(step):
+    metrics = current()
+    running.step = None
+    if metrics is None:
+        return None
+    metrics.status = step.status.name
+    metrics.duration = step.duration
+    metrics.budget = budget_of(metrics.step)
+    recorded.append(metrics)
+    if metrics.over_budget():
+        print(f"Step '{metrics.step}' at {metrics.location} took {metrics.duration:.1f}s, over its budget of {metrics.budget:.1f}s")
+    return metrics
+
+
+def command_ran(duration):
+    metrics = current() or background
+    with lock:
+        metrics.commands += 1
+        metrics.command_time += duration
+
+
+def waited(duration):
+    metrics = current() or background
+    with lock:
+        metrics.poll_wait += duration
+
+
+def report(steps, background_metrics=None):
+    """
+    Ranks the recorded steps (as dicts) from the slowest and sums them up per step definition,
+    along with what was run outside of the steps (as a dict).
+    """
+    definitions = {}
+    for step in steps:
+        definition = step["definition"] or step["step"]
+        total = definitions.setdefault(definition, {"definition": definition, "count": 0, "duration": 0, "max_duration": 0, "commands": 0, "poll_wait": 0})
+        total["count"] += 1
+        total["duration"] = round(total["duration"] + step["duration"], 3)
+        total["max_duration"] = max(total["max_duration"], step["duration"])
+        total["commands"] += step["commands"]
+        total["poll_wait"] = round(total["poll_wait"] + step["poll_wait"], 3)
+    return {"steps": sorted(steps, key=lambda s: s["duration"], reverse=True),
+            "definitions": sorted(definitions.values(), key=lambda d: d["duration"], reverse=True),
+            "over_budget": len([s for s in steps if s["over_budget"]]),
+            "background": background_metrics or BackgroundMetrics().to_dict()}
+
+
+def write_report(path, steps, background_metrics=None):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report(steps, background_metrics), f, indent=2)
+
+
+def read_report(path):
+    """
+    Returns the steps and what was run outside of them, as written by write_report().
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    return data["steps"], data.get("background", BackgroundMetrics().to_dict())
+
+
+def print_summary(steps, background_metrics=None, top=10):
+    ranked = report(steps, background_metrics)
+    print(f"\nSlowest {min(top, len(steps))} of {len(steps)} step(s):")
+    for step in ranked["steps"][:top]:
+        print(f"{step['duration']:9.1f}s {step['commands']:4d} cmd(s) {step['poll_wait']:8.1f}s waiting  {step['step']}  ({step['location']})")
+    for step in [s for s in ranked["steps"] if s["over_budget"]]:
+        print(f"OVER BUDGET: {step['step']} ({step['location']}) took {step['duration']:.1f}s, budget is {step['budget']:.1f}s")
+    outside = ranked["background"]
+    print(f"Outside of the steps: {outside['commands']} cmd(s) taking {outside['command_time']:.1f}s, {outside['poll_wait']:.1f}s waiting")
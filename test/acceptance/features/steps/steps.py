@@ -6,13 +6,14 @@ import ipaddress
 import os
 import re
 import polling2
+import wait_policy
 import parse
-import binascii
 import yaml
 import json
 import time
 
 from behave import given, register_type, then, when, step
+from behave.step_registry import registry
 from knative_serving import KnativeServing
 from namespace import Namespace
 from nodejs_application import NodeJSApp
@@ -21,13 +22,21 @@ from quarkus_application import QuarkusApplication
 from serverless_operator import ServerlessOperator
 from servicebindingoperator import Servicebindingoperator
 from app import App
+import deferred
+import fixtures
+import informer
+import secret_snapshot
 from util import substitute_scenario_id
+from waiter import Waiter
 
 
 # STEP
 @given(u'Namespace "{namespace_name}" exists')
 def namespace_maybe_create(context, namespace_name):
     namespace = Namespace(substitute_scenario_id(context, namespace_name))
+    if namespace.lease():
+        print(f"Namespace {namespace.name} is leased from the pool")
+        return namespace
     if not namespace.is_present():
         print("Namespace is not present, creating namespace: {}...".format(namespace_name))
         assert namespace.create(), f"Unable to create namespace '{namespace_name}'"
@@ -38,6 +47,7 @@ def namespace_maybe_create(context, namespace_name):
 @given(u'Namespace "{namespace_name}" is used')
 def namespace_is_used(context, namespace_name):
     context.namespace = namespace_maybe_create(context, namespace_name)
+    informer.start(context.namespace.name)
 
 
 # STEP
@@ -55,6 +65,7 @@ sbo_is_running_in_namespace_step = u'Service Binding Operator is running in "{op
 
 @given(sbo_is_running_in_namespace_step)
 @when(sbo_is_running_in_namespace_step)
+@fixtures.fixture(scope="feature")
 def sbo_is_running_in_namespace(context, operator_namespace):
     """
     Checks if the SBO is up and running in the given namespace
@@ -161,16 +172,18 @@ def then_application_redeployed(context):
 
 # STEP
 @then(u'application should be connected to the DB "{db_name}"')
+@deferred.assertion
 def then_app_is_connected_to_db(context, db_name):
     db_endpoint = "/api/status/dbNameCM"
-    polling2.poll(lambda: context.application.get_response_from_api(endpoint=db_endpoint) == db_name, step=5, timeout=600)
+    wait_policy.poll(lambda: context.application.get_response_from_api(endpoint=db_endpoint) == db_name, max_interval=5, timeout=600)
 
 
 @step(u'Service Binding secret is not present')
+@deferred.assertion
 def sb_secret_is_not_present(context):
     openshift = Openshift()
-    polling2.poll(lambda: openshift.search_resource_in_namespace("secrets", context.sb_secret, context.namespace.name),
-                  step=100, timeout=1000, ignore_exceptions=(ValueError,), check_success=lambda v: v is None)
+    wait_policy.poll(lambda: openshift.search_resource_in_namespace("secrets", context.sb_secret, context.namespace.name),
+                     max_interval=100, timeout=1000, ignore_exceptions=(ValueError,), check_success=lambda v: v is None)
 
 
 @given(u'Openshift Serverless Operator is running')
@@ -221,6 +234,7 @@ def quarkus_app_is_imported_as_knative_service(context, application_name):
 # STEP
 @given(u'CustomResourceDefinition backends.stable.example.com is available')
 @given(u'OLM Operator "{backend_service}" is running')
+@fixtures.fixture(scope="namespace")
 def operator_manifest_installed(context, backend_service=None):
     openshift = Openshift()
     if "namespace" in context:
@@ -229,9 +243,16 @@ def operator_manifest_installed(context, backend_service=None):
         ns = None
 
     if backend_service is None:
-        _ = openshift.apply_yaml_file(os.path.join(os.getcwd(), "test/acceptance/resources/backend_crd.yaml"), namespace=ns)
+        manifest = os.path.join(os.getcwd(), "test/acceptance/resources/backend_crd.yaml")
     else:
-        _ = openshift.apply_yaml_file(os.path.join(os.getcwd(), "test/acceptance/resources/", backend_service + ".operator.manifest.yaml"), namespace=ns)
+        manifest = os.path.join(os.getcwd(), "test/acceptance/resources/", backend_service + ".operator.manifest.yaml")
+    with open(manifest) as f:
+        resources = [r for r in yaml.full_load_all(f) if r is not None]
+    for resource in resources:
+        # the manifests overlap (e.g. two versions of the same CRD), applying one drops the others applied before
+        fixtures.modified(resource["kind"], resource["metadata"]["name"])
+        fixtures.provides(resource["kind"], resource["metadata"]["name"])
+    _ = openshift.apply_yaml_file(manifest, namespace=ns)
 
 
 @parse.with_pattern(r'.*')
@@ -242,28 +263,26 @@ def parse_nullable_string(text):
 register_type(NullableString=parse_nullable_string)
 
 
+def is_ip_address(value):
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
+
+
 # STEP
 @step(u'Secret contains "{secret_key}" key with value "{secret_value:NullableString}"')
+@deferred.assertion
 def check_secret_key_value(context, secret_key, secret_value):
-    sb = list(context.bindings.values())[0]
-    openshift = Openshift()
-    secret = polling2.poll(lambda: sb.get_secret_name(), step=100, timeout=1000, ignore_exceptions=(ValueError,), check_success=lambda v: v is not None)
-    json_path = f'{{.data.{secret_key}}}'
-    polling2.poll(lambda: openshift.get_resource_info_by_jsonpath("secrets", secret, context.namespace.name,
-                                                                  json_path) == secret_value,
-                  step=5, timeout=120, ignore_exceptions=(binascii.Error,))
+    secret_snapshot.of_binding(context).wait(lambda secret: secret.get(secret_key) == secret_value)
 
 
 # STEP
 @then(u'Secret contains "{secret_key}" key with dynamic IP addess as the value')
+@deferred.assertion
 def check_secret_key_with_ip_value(context, secret_key):
-    sb = list(context.bindings.values())[0]
-    openshift = Openshift()
-    secret = polling2.poll(lambda: sb.get_secret_name(), step=100, timeout=1000, ignore_exceptions=(ValueError,), check_success=lambda v: v is not None)
-    json_path = f'{{.data.{secret_key}}}'
-    polling2.poll(lambda: ipaddress.ip_address(
-        openshift.get_resource_info_by_jsonpath("secrets", secret, context.namespace.name, json_path)),
-        step=5, timeout=120, ignore_exceptions=(ValueError,))
+    secret_snapshot.of_binding(context).wait(lambda secret: is_ip_address(secret.get(secret_key)))
 
 
 # STEP
@@ -281,21 +300,58 @@ def check_secret_key_with_ip_value(context, secret_key):
 def apply_yaml(context, user=None):
     openshift = Openshift()
     resource = substitute_scenario_id(context, context.text)
-    metadata = yaml.full_load(resource)["metadata"]
+    obj = yaml.full_load(resource)
+    metadata = obj["metadata"]
     metadata_name = metadata["name"]
-    if "namespace" in metadata:
-        ns = metadata["namespace"]
-    else:
-        if "namespace" in context:
-            ns = context.namespace.name
-        else:
-            ns = None
-    output = openshift.apply(resource, ns, user)
-    result = re.search(rf'.*{metadata_name}.*(created|unchanged|configured)', output)
-    assert result is not None, f"Unable to apply YAML for CR '{metadata_name}': {output}"
+    ns = yaml_namespace(context, metadata)
+    fixtures.modified(obj["kind"], metadata_name)
+    results = context.applied.pop(context.current_step, None)
+    if results is None:
+        # apply the YAMLs of the consecutive steps following this one in the same batch
+        steps = [context.current_step] + (following_apply_yaml_steps(context, ns) if user is None else [])
+        batch = openshift.apply_many([substitute_scenario_id(context, s.text) for s in steps], ns, user)
+        context.applied.update(zip(steps[1:], batch[1:]))
+        results = batch[0]
+    assert len(results) > 0, f"Unable to apply YAML for CR '{metadata_name}': no object applied"
+    failed = [result for result in results if result.action is None]
+    output = "\n".join(f"{result.kind}/{result.name}: {result}" for result in failed)
+    assert len(failed) == 0, f"Unable to apply YAML for CR '{metadata_name}', {len(failed)} object(s) failed:\n{output}"
     return metadata
 
 
+def yaml_namespace(context, metadata):
+    if "namespace" in metadata:
+        return metadata["namespace"]
+    if "namespace" in context:
+        return context.namespace.name
+    return None
+
+
+def following_apply_yaml_steps(context, namespace):
+    """
+    Returns the consecutive steps right after the current one that apply a YAML into the same namespace.
+    The batch stops at any other step, at a step of another type (e.g. a When step after Given ones) or with a table,
+    and at an object which is already in it, a later step might be changing it on purpose.
+    """
+    current = context.current_step
+    steps = list(context.scenario.all_steps)
+    resource = yaml.full_load(substitute_scenario_id(context, context.text))
+    batched = {(resource["kind"], resource["metadata"]["name"])}
+    following = []
+    for s in steps[steps.index(current) + 1:]:
+        if s.step_type != current.step_type or s.table is not None or current.table is not None or s.text is None:
+            break
+        match = registry.find_match(s)
+        if match is None or match.func.__name__ != apply_yaml.__name__:
+            break
+        resource = yaml.full_load(substitute_scenario_id(context, s.text))
+        if yaml_namespace(context, resource["metadata"]) != namespace or (resource["kind"], resource["metadata"]["name"]) in batched:
+            break
+        batched.add((resource["kind"], resource["metadata"]["name"]))
+        following.append(s)
+    return following
+
+
 # STEP
 @given(u'BackingService is deleted')
 @when(u'BackingService is deleted')
@@ -303,8 +359,10 @@ def apply_yaml(context, user=None):
 def delete_yaml(context):
     openshift = Openshift()
     text = substitute_scenario_id(context, context.text)
-    metadata = yaml.full_load(text)["metadata"]
+    obj = yaml.full_load(text)
+    metadata = obj["metadata"]
     metadata_name = metadata["name"]
+    fixtures.modified(obj["kind"], metadata_name)
     if "namespace" in metadata:
         ns = metadata["namespace"]
     else:
@@ -317,14 +375,22 @@ def delete_yaml(context):
     assert result is not None, f"Unable to delete CR '{metadata_name}': {output}"
 
 
+@step(u'The deferred assertions are met')
+@deferred.barrier
+def deferred_assertions_are_met(context):
+    failures = deferred.settle()
+    assert failures is None, failures
+
+
 @step(u'Secret has been injected in to CR "{cr_name}" of kind "{crd_name}" at path "{json_path}"')
 def verify_injected_secretRef(context, cr_name, crd_name, json_path):
     sb = list(context.bindings.values())[0]
     name = substitute_scenario_id(context, cr_name)
     openshift = Openshift()
-    secret = polling2.poll(lambda: sb.get_secret_name(), step=100, timeout=1000, ignore_exceptions=(ValueError,), check_success=lambda v: v is not None)
-    polling2.poll(lambda: openshift.get_resource_info_by_jsonpath(crd_name, name, context.namespace.name, json_path) == secret,
-                  step=5, timeout=400)
+    secret = wait_policy.poll(lambda: sb.get_secret_name(), max_interval=100, timeout=1000, ignore_exceptions=(ValueError,),
+                              check_success=lambda v: v is not None)
+    wait_policy.poll(lambda: openshift.get_resource_info_by_jsonpath(crd_name, name, context.namespace.name, json_path) == secret,
+                     max_interval=5, timeout=400)
 
 
 @then(u'Error message is thrown')
@@ -340,35 +406,34 @@ def validate_error(context, err_msg=None):
 @then(u'Service Binding "{sb_name}" is not persistent in the cluster')
 def validate_absent_sb(context, sb_name):
     openshift = Openshift()
-    polling2.poll(lambda: openshift.search_resource_in_namespace("servicebindings", sb_name, context.namespace.name),
-                  step=5, timeout=400, check_success=lambda v: v is None)
+    wait_policy.poll(lambda: openshift.search_resource_in_namespace("servicebindings", sb_name, context.namespace.name),
+                     max_interval=5, timeout=400, check_success=lambda v: v is None)
 
 
 @then(u'Secret does not contain "{key}"')
+@deferred.assertion
 def check_secret_key(context, key):
-    sb = list(context.bindings.values())[0]
-    openshift = Openshift()
-    secret = polling2.poll(lambda: sb.get_secret_name(context), step=100, timeout=1000, ignore_exceptions=(ValueError,), check_success=lambda v: v is not None)
-    json_path = f'{{.data.{key}}}'
-    polling2.poll(lambda: openshift.get_resource_info_by_jsonpath("secrets", secret, context.namespace.name,
-                                                                  json_path) == "",
-                  step=5, timeout=120, ignore_exceptions=(binascii.Error,))
+    secret_snapshot.of_binding(context).wait(lambda secret: secret.get(key) == "")
 
 
-def assert_generation(context, count):
-    context.latest_application_generation = context.application.get_generation()
+def assert_generation(context, count, obj):
+    context.latest_application_generation = int(obj["metadata"]["generation"])
     return context.latest_application_generation - context.original_application_generation == int(count)
 
 
 @then(u'The application got redeployed {count} times so far')
 def check_generation(context, count):
-    polling2.poll(lambda: assert_generation(context, count), step=5, timeout=400)
+    application = context.application
+    Waiter(application.resource, application.name, application.namespace).wait(lambda obj: assert_generation(context, count, obj),
+                                                                               timeout=400, ignore_exceptions=(TypeError,))
 
 
 @then(u'The application does not get redeployed again with {time} minutes')
 def check_no_redeployment(context, time):
     try:
-        polling2.poll(lambda: context.application.get_generation() > context.latest_application_generation, step=5, timeout=int(time)*60)
+        # the window is part of the assertion, it is not scaled by the wait profile
+        wait_policy.poll(lambda: context.application.get_generation() > context.latest_application_generation, max_interval=5, timeout=int(time)*60,
+                         scale_timeout=False)
         assert False, "Application has redeployed again unexpectedly"
     except polling2.TimeoutException:
         pass
@@ -406,7 +471,7 @@ def check_resource_readable(context, user, resource, namespace=None):
 
 @step(u'Kind {kind} with apiVersion {group}/{version} is listed in bindable kinds')
 def assert_bindable_kind(context, kind, group, version):
-    polling2.poll(lambda: exist_bindable_kind(kind, group, version), step=5, timeout=400)
+    wait_policy.poll(lambda: exist_bindable_kind(kind, group, version), max_interval=5, timeout=400)
 
 
 def exist_bindable_kind(kind, group, version):
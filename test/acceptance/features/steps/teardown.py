@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import fixtures
+import namespace
+import warm_pool
+
+from openshift import Openshift
+from util import scenario_id_of
+
+
+class Teardown(object):
+    """
+    Deletes the namespaces of the finished scenarios in the background, at most `concurrency` of them at once.
+    Each deletion waits up to `timeout` seconds for its namespace to be gone; those still present are reported by report().
+    """
+
+    interval = 5
+
+    def __init__(self, concurrency, timeout=300):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.done = {}
+        self.stopped = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="teardown")
+
+    def delete(self, name):
+        with self.lock:
+            if name in self.pending or name in self.done:
+                return
+            self.pending[name] = time.monotonic()
+        print(f"Namespace {name} is going to be deleted in the background")
+        fixtures.invalidate(scope="namespace", key=name)
+        self.executor.submit(self.run, name)
+
+    def run(self, name):
+        ns = namespace.Namespace(name)
+        gone = ns.delete()
+        deadline = time.monotonic() + self.timeout
+        while gone and ns.is_present():
+            if time.monotonic() > deadline or self.stopped.wait(self.interval):
+                gone = False
+                break
+        with self.lock:
+            started = self.pending.pop(name)
+            self.done[name] = (started, time.monotonic() - started if gone else None)
+
+    def stop(self):
+        self.stopped.set()
+        self.executor.shutdown(wait=False)
+
+    def report(self, grace=30):
+        """
+        Waits up to `grace` seconds for the deletions in progress, then prints the namespaces not gone (yet)
+        together with their phase and conditions, and returns their names.
+        """
+        deadline = time.monotonic() + grace
+        while len(self.pending) > 0 and time.monotonic() < deadline:
+            time.sleep(1)
+        with self.lock:
+            left = dict(self.pending)
+            left.update({name: started for name, (started, duration) in self.done.items() if duration is None})
+            deleted = sorted(duration for _, duration in self.done.values() if duration is not None)
+        if len(deleted) > 0:
+            print(f"{len(deleted)} namespace(s) deleted in the background, the slowest in {deleted[-1]:.1f}s")
+        stuck = []
+        openshift = Openshift()
+        for name, started in sorted(left.items()):
+            obj = openshift.get_object("namespaces", name)
+            if obj is None:
+                continue
+            stuck.append(name)
+            status = obj.get("status", {})
+            conditions = [f"{c.get('type')}: {c.get('message')}" for c in status.get("conditions", []) if c.get("status") == "True"]
+            print(f"Namespace {name} is still {status.get('phase')} {time.monotonic() - started:.0f}s after its deletion"
+                  + (f" ({'; '.join(conditions)})" if conditions else ""))
+        return stuck
+
+
+teardown = None
+# scenario id -> namespaces to delete after the scenario
+owned = {}
+# namespace -> number of the selected scenarios using it which have not finished yet
+uses = {}
+
+
+def concurrency():
+    return int(os.getenv("TEST_ACCEPTANCE_NAMESPACE_TEARDOWN", "0"))
+
+
+def start(features, step_registry, config):
+    """
+    Plans the deletion of the namespaces the selected scenarios of the given features use by name,
+    each after the last scenario using it.
+    """
+    global teardown
+    owned.clear()
+    uses.clear()
+    if concurrency() <= 0:
+        return
+    for scenario in warm_pool.scenarios_to_run(features, config):
+        names = namespace.named_namespaces(scenario, [(step, step_registry.find_match(step)) for step in scenario.all_steps])
+        owned[scenario_id_of(scenario)] = names
+        for name in names:
+            uses[name] = uses.get(name, 0) + 1
+    teardown = Teardown(concurrency())
+
+
+def scenario_finished(scenario):
+    """
+    Deletes the namespaces no other selected scenario is going to use, in case they have been created during the run.
+    """
+    if teardown is None:
+        return
+    for name in owned.pop(scenario_id_of(scenario), []):
+        uses[name] -= 1
+        if uses[name] == 0 and name in namespace.created:
+            teardown.delete(name)
+
+
+def stop():
+    """
+    Reports the namespaces stuck in deletion and stops deleting them.
+    """
+    global teardown
+    if teardown is None:
+        return []
+    stuck = teardown.report()
+    teardown.stop()
+    teardown = None
+    return stuck
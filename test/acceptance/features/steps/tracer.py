@@ -0,0 +1,114 @@
+import itertools
+import json
+import os
+import threading
+import time
+
+
+class Span(object):
+    """
+    Context manager recording the time spent in its block as a complete event, e.g. 'with tracer.Span("probe", path):'.
+    """
+
+    def __init__(self, category, name, **args):
+        self.category = category
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, _tb):
+        if exc is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        complete(self.category, self.name, time.monotonic() - self.start, **self.args)
+        return False
+
+
+events = []
+lock = threading.Lock()
+# spans opened by the hooks, by their category (feature, scenario, step)
+opened = {}
+named_threads = set()
+async_ids = itertools.count(1)
+
+
+def path():
+    return os.getenv("TEST_ACCEPTANCE_TRACE")
+
+
+def timestamp(seconds_ago=0):
+    # wall clock in microseconds, so that the traces of parallel workers line up when merged
+    return (time.time() - seconds_ago) * 1000000
+
+
+def emit(event):
+    thread = threading.current_thread()
+    event.update(pid=os.getpid(), tid=thread.ident)
+    with lock:
+        if thread.ident not in named_threads:
+            named_threads.add(thread.ident)
+            events.append({"ph": "M", "name": "thread_name", "pid": os.getpid(), "tid": thread.ident, "args": {"name": thread.name}})
+        events.append(event)
+
+
+def begin(category, name, **args):
+    """
+    Opens the span of the given category (e.g. the step in before_step), closed by end().
+    """
+    if path() is None:
+        return
+    opened[category] = (time.monotonic(), name, args)
+
+
+def end(category, **args):
+    if path() is None or category not in opened:
+        return
+    start, name, opened_args = opened.pop(category)
+    opened_args.update(args)
+    complete(category, name, time.monotonic() - start, **opened_args)
+
+
+def complete(category, name, duration, asynchronous=False, **args):
+    """
+    Records a span which has just finished after the given duration. Asynchronous spans (e.g. the commands run concurrently
+    by asyncio on the same thread) get a track of their own instead of being nested into the spans of the thread.
+    """
+    if path() is None:
+        return
+    start = timestamp(duration)
+    if not asynchronous:
+        emit({"ph": "X", "cat": category, "name": name, "ts": start, "dur": duration * 1000000, "args": args})
+        return
+    span_id = next(async_ids)
+    emit({"ph": "b", "cat": category, "name": name, "id": span_id, "ts": start, "args": args})
+    emit({"ph": "e", "cat": category, "name": name, "id": span_id, "ts": start + duration * 1000000})
+
+
+def instant(category, name, **args):
+    if path() is None:
+        return
+    emit({"ph": "i", "s": "t", "cat": category, "name": name, "ts": timestamp(), "args": args})
+
+
+def trace(process_name=None):
+    with lock:
+        recorded = list(events)
+    if process_name is not None:
+        recorded.insert(0, {"ph": "M", "name": "process_name", "pid": os.getpid(), "args": {"name": process_name}})
+    return {"traceEvents": recorded, "displayTimeUnit": "ms"}
+
+
+def merge(traces):
+    """
+    Merges several traces (e.g. of parallel workers) into one, each worker keeps its own process track.
+    """
+    return {"traceEvents": [event for t in traces for event in t["traceEvents"]], "displayTimeUnit": "ms"}
+
+
+def write(trace_path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(trace_path)), exist_ok=True)
+    with open(trace_path, "w") as f:
+        json.dump(data, f)
@@ -1,10 +1,36 @@
+import asyncio
+import functools
 import os
 from string import Template
 
 
 def scenario_id(context):
-    return f"{os.path.basename(os.path.splitext(context.scenario.filename)[0]).lower()}-{context.scenario.line}"
+    return scenario_id_of(context.scenario)
+
+
+def scenario_id_of(scenario):
+    return f"{os.path.basename(os.path.splitext(scenario.filename)[0]).lower()}-{scenario.line}"
 
 
 def substitute_scenario_id(context, text="$scenario_id"):
-    return Template(text).substitute(scenario_id=scenario_id(context))
+    return substitute_scenario_id_of(context.scenario, text)
+
+
+def substitute_scenario_id_of(scenario, text="$scenario_id"):
+    return Template(text).substitute(scenario_id=scenario_id_of(scenario))
+
+
+def run_concurrently(*coroutines):
+    """
+    Runs the given coroutines concurrently from a (synchronous) step and returns their results in the same order.
+    """
+    async def gather():
+        return await asyncio.gather(*coroutines)
+    return asyncio.run(gather())
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs a blocking call (e.g. an Openshift method) in a worker thread, so that it does not block the other coroutines.
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,150 @@
+import asyncio
+import functools
+import random
+import time
+import cassette
+import polling2
+import step_metrics
+import tracer
+
+from environment import ctx
+
+
+class WaitProfile(object):
+    """
+    How to wait for a condition: the first interval between two attempts, the factor the interval grows by after
+    each attempt up to the maximum, the relative jitter applied to every interval and the factor scaling the timeouts
+    (a slower cluster needs more time rather than more frequent checks).
+    """
+
+    def __init__(self, initial_interval, factor, max_interval, jitter, timeout_factor):
+        self.initial_interval = initial_interval
+        self.factor = factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.timeout_factor = timeout_factor
+
+
+profiles = {
+    "default": WaitProfile(initial_interval=1, factor=1.5, max_interval=10, jitter=0.2, timeout_factor=1),
+    "kind": WaitProfile(initial_interval=0.5, factor=1.5, max_interval=5, jitter=0.2, timeout_factor=1),
+    "openshift-ci": WaitProfile(initial_interval=1, factor=1.5, max_interval=15, jitter=0.2, timeout_factor=1.5),
+    "perf": WaitProfile(initial_interval=2, factor=2, max_interval=30, jitter=0.3, timeout_factor=2),
+}
+
+
+def profile():
+    assert ctx.wait_profile in profiles, f"Unknown wait profile '{ctx.wait_profile}', it should be one of {', '.join(profiles)}"
+    return profiles[ctx.wait_profile]
+
+
+class Backoff(object):
+    """
+    Jittered exponential backoff bounded by a deadline: the last attempt happens right at the deadline.
+    The max_interval given by a call site can only make the intervals shorter than the profile's maximum.
+    The timeout is scaled by the profile, unless it is the window of an assertion (e.g. something does not happen within it).
+
+    When replaying cassettes the delays are compressed (see cassette.scale_delay()), so the deadline is measured on a virtual clock
+    advancing by the delays as they would have been, rather than on the real one: a replayed poll makes about as many attempts
+    as the recorded one did instead of spinning through the real timeout.
+    """
+
+    def __init__(self, timeout, max_interval=None, scale_timeout=True):
+        self.profile = profile()
+        self.virtual = cassette.mode() == "replay"
+        self.elapsed = 0
+        self.deadline = self.now() + timeout * (self.profile.timeout_factor if scale_timeout else 1)
+        self.max_interval = self.profile.max_interval if max_interval is None else min(max_interval, self.profile.max_interval)
+        self.interval = min(self.profile.initial_interval, self.max_interval)
+
+    def now(self):
+        return self.elapsed if self.virtual else time.monotonic()
+
+    def next_delay(self):
+        """
+        Returns how long to wait before the next attempt, None if the deadline has passed already.
+        """
+        remaining = self.deadline - self.now()
+        if remaining <= 0:
+            return None
+        delay = self.interval * (1 + random.uniform(-self.profile.jitter, self.profile.jitter))
+        self.interval = min(self.interval * self.profile.factor, self.max_interval)
+        delay = min(delay, remaining)
+        self.elapsed += delay
+        return delay
+
+
+def attempts(timeout, max_interval=None, scale_timeout=True):
+    """
+    Yields the sequence number of each attempt, sleeping between them, until the timeout expires.
+    The caller breaks out of the loop once its condition holds.
+    """
+    backoff = Backoff(timeout, max_interval, scale_timeout)
+    attempt = 0
+    while True:
+        tracer.instant("poll", "attempt", attempt=attempt)
+        yield attempt
+        delay = backoff.next_delay()
+        if delay is None:
+            return
+        delay = cassette.scale_delay(delay)
+        step_metrics.waited(delay)
+        with tracer.Span("poll", "sleep", attempt=attempt):
+            time.sleep(delay)
+        attempt += 1
+
+
+def poll(target, timeout, check_success=polling2.is_truthy, ignore_exceptions=(), max_interval=None, scale_timeout=True):
+    """
+    Drop-in replacement of polling2.poll following the wait profile: returns the first value of the target
+    for which check_success holds, raises polling2.TimeoutException if there was none within the timeout.
+    """
+    values = []
+    for _ in attempts(timeout, max_interval, scale_timeout):
+        try:
+            value = target()
+        except ignore_exceptions as err:
+            values.append(err)
+            continue
+        values.append(value)
+        if check_success(value):
+            return value
+    raise polling2.TimeoutException(values, values[-1] if values else None)
+
+
+async def poll_async(target, timeout, check_success=polling2.is_truthy, ignore_exceptions=(), max_interval=None):
+    """
+    Asynchronous counterpart of poll awaiting the target coroutine function.
+    """
+    values = []
+    backoff = Backoff(timeout, max_interval)
+    attempt = 0
+    while True:
+        tracer.instant("poll", "attempt", attempt=attempt)
+        try:
+            value = await target()
+            values.append(value)
+            if check_success(value):
+                return value
+        except ignore_exceptions as err:
+            values.append(err)
+        delay = backoff.next_delay()
+        if delay is None:
+            raise polling2.TimeoutException(values, values[-1] if values else None)
+        delay = cassette.scale_delay(delay)
+        step_metrics.waited(delay)
+        await asyncio.sleep(delay)
+        tracer.complete("poll", "sleep", delay, asynchronous=True, attempt=attempt)
+        attempt += 1
+
+
+def poll_decorator(timeout, check_success=polling2.is_truthy, ignore_exceptions=(), max_interval=None):
+    """
+    Drop-in replacement of polling2.poll_decorator, polls the decorated function following the wait profile.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return poll(lambda: func(*args, **kwargs), timeout, check_success, ignore_exceptions, max_interval)
+        return wrapper
+    return decorator
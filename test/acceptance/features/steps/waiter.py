@@ -0,0 +1,211 @@
+import json
+import os
+import re
+import time
+import kubeapi
+import polling2
+import step_metrics
+import wait_policy
+import yaml
+
+from queue import Queue
+from environment import ctx
+from kubeapi import ApiError
+from openshift import Openshift
+
+
+class TerminalStateError(AssertionError):
+    """
+    Raised when the awaited resource got into a state it is not going to leave by itself.
+    """
+
+
+class TerminalState(object):
+    """
+    Tracks whether a resource is in a terminal state, as given by terminal(obj) returning its description (None if it is not).
+    The state has to last `settle` seconds to be considered terminal, so that the transient states of a reconcile do not abort the wait.
+    """
+
+    def __init__(self, description, terminal, settle):
+        self.description = description
+        self.terminal = terminal
+        self.settle = settle
+        self.since = None
+
+    def check(self, obj):
+        state = self.terminal(obj)
+        if state is None:
+            self.since = None
+            return
+        now = time.monotonic()
+        if self.since is None:
+            print(f"{self.description} is in a terminal state, failing unless it leaves it within {self.settle}s: {state}")
+            self.since = now
+        if now - self.since >= self.settle:
+            raise TerminalStateError(f"{self.description} is in a terminal state: {state}")
+
+
+class Waiter(object):
+    """
+    Waits until a predicate on a single resource holds.
+
+    With the api backend the resource is listed once and then watched from the last seen resourceVersion,
+    so the predicate is evaluated on every change as soon as it happens. An expired watch (410 Gone) is
+    recovered by listing the resource again. The cli backend falls back to polling.
+    """
+
+    openshift = Openshift()
+
+    def __init__(self, resource_type, name, namespace=None, user=None):
+        self.resource_type = resource_type
+        self.name = name
+        self.namespace = namespace
+        self.user = user
+
+    def wait(self, predicate, timeout=800, ignore_exceptions=(), interval=5, terminal=None):
+        """
+        Returns the resource (None if it does not exist) for which the predicate has been satisfied,
+        raises polling2.TimeoutException if that did not happen within the timeout.
+
+        terminal(obj) describes the state of the resource in case it is not going to satisfy the predicate anymore, None otherwise.
+        The wait then fails fast with TerminalStateError once such a state has lasted for the settle time (see terminal_settle()).
+        """
+        state = TerminalState(f"{self.resource_type}/{self.name}", terminal, terminal_settle()) if terminal is not None else None
+        if ctx.backend != "api":
+            return wait_policy.poll(lambda: self.get_if(predicate, ignore_exceptions, state), max_interval=interval, timeout=timeout,
+                                    check_success=lambda result: result[0])[1]
+        started = time.monotonic()
+        try:
+            return self.watch(predicate, timeout, ignore_exceptions, state, interval)
+        finally:
+            step_metrics.waited(time.monotonic() - started)
+
+    def get_if(self, predicate, ignore_exceptions, state=None):
+        obj = self.openshift.get_object(self.resource_type, self.name, self.namespace, user=self.user)
+        satisfied = self.check(predicate, obj, ignore_exceptions)
+        if not satisfied and state is not None:
+            state.check(obj)
+        return satisfied, obj
+
+    def check(self, predicate, obj, ignore_exceptions):
+        try:
+            return bool(predicate(obj))
+        except ignore_exceptions:
+            return False
+
+    def watch(self, predicate, timeout, ignore_exceptions, state=None, interval=5):
+        api = kubeapi.client(self.user)
+        deadline = time.monotonic() + timeout
+        values = Queue()
+        resource_version = None
+        obj = None
+        while True:
+            try:
+                if resource_version is None:
+                    resources = api.list(self.resource_type, self.namespace, field_selector=f"metadata.name={self.name}")
+                    obj = resources["items"][0] if len(resources["items"]) > 0 else None
+                    values.put(obj)
+                    if self.check(predicate, obj, ignore_exceptions):
+                        return obj
+                    resource_version = resources["metadata"]["resourceVersion"]
+                    if state is not None:
+                        state.check(obj)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                # the terminal state is checked again every interval even if the resource does not change, e.g. to see it has lasted
+                for event in api.watch(self.resource_type, self.namespace, self.name, resource_version,
+                                       remaining if state is None else min(remaining, interval)):
+                    resource_version = event["object"]["metadata"]["resourceVersion"]
+                    if event["type"] == "BOOKMARK":
+                        continue
+                    obj = None if event["type"] == "DELETED" else event["object"]
+                    values.put(obj)
+                    if self.check(predicate, obj, ignore_exceptions):
+                        return obj
+                    if state is not None:
+                        state.check(obj)
+                    if time.monotonic() >= deadline:
+                        break
+                else:
+                    if state is not None:
+                        state.check(obj)
+            except ApiError as err:
+                if err.status == 410:
+                    print(f"Watch of {self.resource_type}/{self.name} expired, listing it again: {err}")
+                elif err.status == 0:
+                    print(f"Watch of {self.resource_type}/{self.name} interrupted, listing it again: {err}")
+                    time.sleep(1)
+                else:
+                    raise
+                resource_version = None
+            if time.monotonic() >= deadline:
+                break
+        raise polling2.TimeoutException(values, obj)
+
+
+# reasons of the conditions of service bindings and of the waiting states of workload containers which do not resolve by themselves;
+# ServiceNotFound and ApplicationNotFound are not among them, a binding created before its service or application
+# stays in them until the operator's requeue backoff expires, which may take longer than the settle time
+default_terminal_reasons = ("BindingFailed", "ImagePullBackOff", "CrashLoopBackOff")
+terminal_reasons_by_step = None
+
+
+def terminal_settle():
+    return float(os.getenv("TEST_ACCEPTANCE_TERMINAL_SETTLE", "30"))
+
+
+def terminal_reasons(step):
+    """
+    Returns the terminal reasons for the given step. They are read from the YAML file given by TEST_ACCEPTANCE_TERMINAL_REASONS,
+    mapping a regular expression matched against the step text (e.g. 'Then Service Binding is ready') to the list of the reasons,
+    where an empty list disables failing fast. The steps not matched by any of the expressions get the default ones.
+    """
+    global terminal_reasons_by_step
+    if terminal_reasons_by_step is None:
+        terminal_reasons_by_step = []
+        path = os.getenv("TEST_ACCEPTANCE_TERMINAL_REASONS")
+        if path is not None:
+            with open(path, "r") as f:
+                terminal_reasons_by_step = [(re.compile(pattern), tuple(reasons or ())) for pattern, reasons in (yaml.safe_load(f) or {}).items()]
+    if step is not None:
+        for pattern, reasons in terminal_reasons_by_step:
+            if pattern.search(f"{step.keyword} {step.name}") is not None:
+                return reasons
+    return default_terminal_reasons
+
+
+def condition_terminal_state(obj, reasons):
+    """
+    Returns the conditions of the resource which are False for one of the given reasons, None if there are none.
+    """
+    if obj is None:
+        return None
+    conditions = [c for c in obj.get("status", {}).get("conditions", []) if c.get("status") == "False" and c.get("reason") in reasons]
+    return json.dumps(conditions) if len(conditions) > 0 else None
+
+
+def workload_terminal_state(resource_type, name, namespace, reasons):
+    """
+    Returns the containers of the pods of the workload waiting for one of the given reasons, None if there are none.
+    """
+    openshift = Waiter.openshift
+    workload = openshift.get_object(resource_type, name, namespace)
+    if workload is None:
+        return None
+    selector = workload["spec"].get("selector") or {}
+    labels = selector.get("matchLabels", selector)
+    if len(labels) == 0:
+        return None
+    pods = openshift.get_object("pods", namespace=namespace)
+    waiting = []
+    for pod in (pods or {}).get("items", []):
+        if any(pod["metadata"].get("labels", {}).get(key) != value for key, value in labels.items()):
+            continue
+        status = pod.get("status", {})
+        for container in status.get("initContainerStatuses", []) + status.get("containerStatuses", []):
+            state = container.get("state", {}).get("waiting", {})
+            if state.get("reason") in reasons:
+                waiting.append({"pod": pod["metadata"]["name"], "container": container["name"], "reason": state["reason"],
+                                "message": state.get("message")})
+    return json.dumps(waiting) if len(waiting) > 0 else None
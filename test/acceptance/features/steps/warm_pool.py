@@ -0,0 +1,135 @@
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WarmPool(object):
+    """
+    Prepares the given items (e.g. the namespaces or the applications the scenarios are going to use) in the background,
+    in their order and at most `size` of them ahead of the scenarios claiming them. Each claim tops the pool up with the next item.
+    """
+
+    def __init__(self, kind, items, size, prepare):
+        self.kind = kind
+        self.pending = list(items)
+        self.size = size
+        self.prepare = prepare
+        self.prepared = {}
+        self.claimed = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"warm-{kind}")
+
+    def start(self):
+        with self.lock:
+            self.top_up()
+
+    def top_up(self):
+        while len(self.prepared) < self.size and len(self.pending) > 0:
+            item = self.pending.pop(0)
+            self.prepared[item] = self.executor.submit(self.prepare, item)
+
+    def schedule(self, item):
+        if item in self.pending:
+            # the scenarios have overtaken the pool
+            self.pending.remove(item)
+            self.prepared[item] = self.executor.submit(self.prepare, item)
+
+    def claim(self, item):
+        """
+        Waits for the item to be prepared and returns the result of its preparation,
+        None if the pool does not prepare the item or it has been claimed already.
+        """
+        with self.lock:
+            self.schedule(item)
+            future = self.prepared.pop(item, None)
+            if future is not None:
+                self.claimed[item] = future
+            self.top_up()
+        return future.result() if future is not None else None
+
+    def wait(self, item):
+        """
+        Waits for the item to be prepared the same as claim(), but leaves it to be claimed,
+        e.g. when preparing another item that depends on it.
+        """
+        with self.lock:
+            self.schedule(item)
+            future = self.prepared.get(item, self.claimed.get(item))
+        return future.result() if future is not None else None
+
+    def shutdown(self):
+        with self.lock:
+            self.pending = []
+        self.executor.shutdown(wait=False)
+
+
+# kind -> (variable with the size of the pool, function planning the items for the scenarios to run, function preparing an item)
+kinds = {}
+pools = {}
+lock = threading.Lock()
+
+
+def register(kind, size_variable, plan, prepare):
+    """
+    Registers a kind of pool, started by start() in case the environment variable gives it a size greater than zero.
+    plan(scenario, steps) returns the items a scenario needs, given the list of its steps together with their matched definitions.
+    The first registration of a kind wins, as behave executes the modules of the steps directory once more besides their imports.
+    """
+    with lock:
+        kinds.setdefault(kind, (size_variable, plan, prepare))
+
+
+def size_of(kind):
+    return int(os.getenv(kinds[kind][0], "0"))
+
+
+def scenarios_to_run(features, config):
+    for feature in features:
+        for scenario in feature.walk_scenarios():
+            if scenario.should_run(config):
+                yield scenario
+
+
+def start(features, step_registry, config):
+    """
+    Starts the pools of the registered kinds, preparing the items the selected scenarios of the given features need.
+    """
+    stop()
+    scenarios = [(scenario, [(step, step_registry.find_match(step)) for step in scenario.all_steps]) for scenario in scenarios_to_run(features, config)]
+    started = {}
+    for kind, (_, plan, prepare) in list(kinds.items()):
+        size = size_of(kind)
+        if size <= 0:
+            continue
+        items = []
+        for scenario, steps in scenarios:
+            for item in plan(scenario, steps):
+                if item not in items:
+                    items.append(item)
+        if len(items) > 0:
+            print(f"Preparing {len(items)} {kind} in the background, {size} at most ahead of the scenarios")
+            started[kind] = WarmPool(kind, items, size, prepare)
+    # all the pools are in place before any starts preparing, as the items of one might wait for the items of another
+    with lock:
+        pools.update(started)
+    for pool in started.values():
+        pool.start()
+
+
+def stop():
+    with lock:
+        stopped = list(pools.values())
+        pools.clear()
+    for pool in stopped:
+        pool.shutdown()
+
+
+def claim(kind, item):
+    pool = pools.get(kind)
+    return pool.claim(item) if pool is not None else None
+
+
+def wait(kind, item):
+    pool = pools.get(kind)
+    return pool.wait(item) if pool is not None else None
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Runs the acceptance tests sharded across several behave processes running in parallel.
+
+Each worker gets a namespace of its own (TEST_NAMESPACE suffixed with the worker's number) and a private
+copy of the kubeconfig, so that switching the current project in one worker does not affect the others.
+Scenarios tagged with @exclusive need cluster-scoped resources for themselves, so they are run serially
+by a single behave process after all the workers have finished.
+
+The scenarios are assigned to the workers longest-first, each to the least loaded worker, using the durations
+recorded by the previous runs (see --durations); scenarios without any history are estimated by the average.
+
+The JUnit reports of the workers are merged into the directory given by --junit-directory.
+
+Usage:
+    parallel.py [--workers N] [--junit-directory DIR] [--durations FILE] [--step-report FILE] [behave options] [features or feature:line]
+"""
+
+import argparse
+import glob
+import heapq
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from xml.etree import ElementTree
+
+from behave.parser import parse_file
+from behave.tag_expression import TagExpression
+
+acceptance_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(acceptance_dir, "features", "steps"))
+
+from command import Command  # noqa: E402
+from environment import ctx  # noqa: E402
+from namespace import Namespace  # noqa: E402
+import profiler  # noqa: E402
+import step_metrics  # noqa: E402
+import tracer  # noqa: E402
+from util import scenario_id_of  # noqa: E402
+
+EXCLUSIVE_TAG = "exclusive"
+
+
+class Scenario(object):
+
+    def __init__(self, locations, tags, ids):
+        # locations and scenario ids of the scenario or of all the examples of an outline
+        self.locations = locations
+        self.tags = tags
+        self.ids = ids
+
+    def is_exclusive(self):
+        return EXCLUSIVE_TAG in self.tags
+
+
+class Worker(object):
+
+    def __init__(self, name, namespace, scenarios, work_dir):
+        self.name = name
+        self.namespace = namespace
+        self.scenarios = scenarios
+        self.work_dir = os.path.join(work_dir, name)
+        self.junit_dir = os.path.join(self.work_dir, "junit")
+        self.process = None
+        self.log = None
+        self.started = None
+        self.duration = None
+        self.durations_file = os.path.join(self.work_dir, "durations.jsonl")
+        self.step_report = os.path.join(self.work_dir, "steps.json")
+        self.profile = os.path.join(self.work_dir, "profile.json")
+        self.trace = os.path.join(self.work_dir, "trace.json")
+
+    def prepare(self, cmd):
+        os.makedirs(self.junit_dir, exist_ok=True)
+        output, exit_code = cmd.run(f"{ctx.cli} config view --raw")
+        assert exit_code == 0, f"Unable to read kubeconfig for worker {self.name}: {output}"
+        with open(os.path.join(self.work_dir, "kubeconfig"), "w") as kubeconfig:
+            kubeconfig.write(output)
+        if self.namespace != os.getenv("TEST_NAMESPACE"):
+            # remove whatever a previous run left behind, the same way 'make test-cleanup' does for TEST_NAMESPACE
+            cleanup = Command()
+            cleanup.setenv("TEST_NAMESPACE", self.namespace)
+            output, exit_code = cleanup.run(os.path.join(acceptance_dir, "..", "..", "hack", "test-cleanup.sh"))
+            assert exit_code == 0, f"Unable to clean namespace {self.namespace} up: {output}"
+        namespace = Namespace(self.namespace)
+        if not namespace.is_present():
+            assert namespace.create(), f"Unable to create namespace {self.namespace}"
+
+    def env(self):
+        env = dict(os.environ)
+        env.update(TEST_NAMESPACE=self.namespace, KUBECONFIG=os.path.join(self.work_dir, "kubeconfig"), TEST_ACCEPTANCE_WORKER=self.name,
+                   TEST_ACCEPTANCE_DURATIONS_FILE=self.durations_file, TEST_ACCEPTANCE_STEP_REPORT=self.step_report)
+        if profiler.path() is not None:
+            env.update(TEST_ACCEPTANCE_PROFILE=self.profile)
+        if tracer.path() is not None:
+            env.update(TEST_ACCEPTANCE_TRACE=self.trace)
+        return env
+
+    def start(self, behave_args, log_dir):
+        self.log = open(os.path.join(log_dir, f"{self.name}.log"), "w")
+        locations = [location for scenario in self.scenarios for location in scenario.locations]
+        args = [sys.executable, "-m", "behave", "--junit", "--junit-directory", self.junit_dir] + behave_args + locations
+        print(f"Starting {self.name} with {len(self.scenarios)} scenario(s) in namespace {self.namespace}, log: {self.log.name}")
+        self.started = time.monotonic()
+        self.process = subprocess.Popen(args, stdout=self.log, stderr=subprocess.STDOUT, env=self.env())
+
+    def wait(self):
+        exit_code = self.process.wait()
+        self.duration = time.monotonic() - self.started
+        self.log.close()
+        print(f"{self.name} finished with exit code {exit_code} in {self.duration:.0f}s")
+        return exit_code
+
+
+def feature_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*.feature"), recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+
+def collect_scenarios(paths, tags):
+    """
+    Returns the scenarios of the given features matching the tag expression, an outline is kept together with its examples.
+    A path can point to a single scenario as feature:line, the same way behave accepts it.
+    """
+    expression = TagExpression(tags)
+    scenarios = []
+    for path in feature_files(paths):
+        filename, _, line = path.partition(":")
+        feature = parse_file(filename)
+        if feature is None:
+            continue
+        for scenario in feature.scenarios:
+            if line != "" and scenario.line != int(line):
+                continue
+            scenario_tags = set(feature.tags) | set(scenario.tags)
+            if expression.check(scenario_tags):
+                examples = scenario.scenarios if scenario.type == "scenario_outline" else [scenario]
+                scenarios.append(Scenario([f"{filename}:{s.line}" for s in examples], scenario_tags, [scenario_id_of(s) for s in examples]))
+    return scenarios
+
+
+def load_durations(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_durations(path, durations, workers):
+    """
+    Updates the duration history with the durations recorded by the workers' after_scenario hook.
+    """
+    for worker in workers:
+        if not os.path.exists(worker.durations_file):
+            continue
+        with open(worker.durations_file, "r") as f:
+            for line in f:
+                record = json.loads(line)
+                durations[record["scenario"]] = round(record["duration"], 3)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(durations, f, indent=2, sort_keys=True)
+
+
+def shard(scenarios, count, durations):
+    """
+    Splits the scenarios into the given number of shards, assigning the longest scenarios first,
+    each one to the shard with the least expected duration so far.
+    """
+    default = sum(durations.values()) / len(durations) if len(durations) > 0 else 60
+
+    def estimate(scenario):
+        return sum(durations.get(i, default) for i in scenario.ids)
+
+    shards = [[] for _ in range(count)]
+    loads = [(0, i) for i in range(count)]
+    for scenario in sorted(scenarios, key=estimate, reverse=True):
+        load, i = heapq.heappop(loads)
+        shards[i].append(scenario)
+        heapq.heappush(loads, (load + estimate(scenario), i))
+    for load, i in sorted(loads, key=lambda entry: entry[1]):
+        print(f"worker-{i}: {len(shards[i])} scenario(s), expected to take {load:.0f}s")
+    return shards
+
+
+def merge_junit_reports(workers, junit_dir):
+    """
+    Merges the per-feature JUnit reports of the workers into a single report per feature.
+    Behave reports the scenarios a worker has not been given as skipped, so a test case which
+    has been run by any of the workers takes precedence over the skipped ones.
+    """
+    os.makedirs(junit_dir, exist_ok=True)
+    suites = {}
+    testcases = {}
+    for worker in workers:
+        for report in sorted(glob.glob(os.path.join(worker.junit_dir, "*.xml"))):
+            name = os.path.basename(report)
+            suite = ElementTree.parse(report).getroot()
+            suites.setdefault(name, suite)
+            cases = testcases.setdefault(name, {})
+            for testcase in suite.findall("testcase"):
+                key = (testcase.get("classname"), testcase.get("name"))
+                if key not in cases or (cases[key].find("skipped") is not None and testcase.find("skipped") is None):
+                    cases[key] = testcase
+    for name, suite in suites.items():
+        for testcase in suite.findall("testcase"):
+            suite.remove(testcase)
+        cases = list(testcases[name].values())
+        suite.extend(cases)
+        suite.set("tests", str(len(cases)))
+        for attr, element in (("errors", "error"), ("failures", "failure"), ("skipped", "skipped")):
+            suite.set(attr, str(len([c for c in cases if c.find(element) is not None])))
+        suite.set("time", str(round(sum(float(c.get("time", "0")) for c in cases), 6)))
+        ElementTree.ElementTree(suite).write(os.path.join(junit_dir, name), encoding="UTF-8", xml_declaration=True)
+    print(f"Merged {len(suites)} JUnit report(s) into {junit_dir}")
+
+
+def merge_step_reports(workers, path):
+    """
+    Merges the step timings recorded by the workers into a single report ranking the steps of all of them.
+    """
+    steps = []
+    background = step_metrics.BackgroundMetrics()
+    for worker in workers:
+        if os.path.exists(worker.step_report):
+            worker_steps, worker_background = step_metrics.read_report(worker.step_report)
+            steps.extend(worker_steps)
+            background.merge(worker_background)
+    if path is not None:
+        step_metrics.write_report(path, steps, background.to_dict())
+    step_metrics.print_summary(steps, background.to_dict())
+
+
+def merge_profiles(workers, path):
+    """
+    Merges the command profiles of the workers into a single one.
+    """
+    profiles = []
+    for worker in workers:
+        if os.path.exists(worker.profile):
+            with open(worker.profile, "r") as f:
+                profiles.append(json.load(f))
+    profile = profiler.merge(profiles)
+    profiler.write(path, profile)
+    profiler.print_summary(profile)
+
+
+def merge_traces(workers, path):
+    """
+    Merges the traces of the workers into a single one, showing each worker as a process of its own.
+    """
+    traces = []
+    for worker in workers:
+        if os.path.exists(worker.trace):
+            with open(worker.trace, "r") as f:
+                traces.append(json.load(f))
+    tracer.write(path, tracer.merge(traces))
+    print(f"Merged {len(traces)} trace(s) into {path}")
+
+
+def split_args(args):
+    paths = [a for a in args if os.path.isdir(a) or re.match(r".*\.feature(:\d+)?$", a)]
+    return paths, [a for a in args if a not in paths]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the acceptance tests in parallel behave processes.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TEST_ACCEPTANCE_WORKERS", "4")), help="number of parallel behave processes")
+    parser.add_argument("--junit-directory", default=os.getenv("TEST_ACCEPTANCE_OUTPUT_DIR", "out/acceptance-tests"),
+                        help="directory to write the merged JUnit reports and worker logs to")
+    parser.add_argument("--durations", default=os.getenv("TEST_ACCEPTANCE_DURATIONS"),
+                        help="file with the scenario durations of the previous runs, defaults to scenario-durations.json in the JUnit directory")
+    parser.add_argument("--step-report", default=os.getenv("TEST_ACCEPTANCE_STEP_REPORT"), help="file to write the merged step timings report to")
+    parser.add_argument("--tags", action="append", default=[], help="behave tag expression, can be given several times")
+    args, rest = parser.parse_known_args()
+    paths, behave_args = split_args(rest)
+    if len(paths) == 0:
+        paths = [os.path.join(acceptance_dir, "features")]
+    behave_args += [f"--tags={tags}" for tags in args.tags]
+
+    namespace = os.getenv("TEST_NAMESPACE")
+    assert namespace is not None, "TEST_NAMESPACE needs to be set in the environment"
+
+    scenarios = collect_scenarios(paths, args.tags)
+    exclusive = [s for s in scenarios if s.is_exclusive()]
+    shared = [s for s in scenarios if not s.is_exclusive()]
+    print(f"Collected {len(scenarios)} scenario(s), {len(exclusive)} of them exclusive")
+
+    work_dir = tempfile.mkdtemp(prefix="acceptance-workers-")
+    os.makedirs(args.junit_directory, exist_ok=True)
+    cmd = Command()
+    durations_path = args.durations or os.path.join(args.junit_directory, "scenario-durations.json")
+    durations = load_durations(durations_path)
+    workers = [Worker(f"worker-{i}", f"{namespace}-{i}", s, work_dir) for i, s in enumerate(shard(shared, max(1, args.workers), durations))
+               if len(s) > 0]
+    exit_code = 0
+    try:
+        for worker in workers:
+            worker.prepare(cmd)
+            worker.start(behave_args, args.junit_directory)
+        for worker in workers:
+            exit_code = max(exit_code, worker.wait())
+
+        if len(exclusive) > 0:
+            worker = Worker("exclusive", namespace, exclusive, work_dir)
+            workers.append(worker)
+            worker.prepare(cmd)
+            worker.start(behave_args, args.junit_directory)
+            exit_code = max(exit_code, worker.wait())
+
+        merge_junit_reports(workers, args.junit_directory)
+        save_durations(durations_path, durations, workers)
+        merge_step_reports(workers, args.step_report)
+        if profiler.path() is not None:
+            merge_profiles(workers, profiler.path())
+        if tracer.path() is not None:
+            merge_traces(workers, tracer.path())
+    finally:
+        for worker in workers:
+            if worker.process is not None and worker.process.poll() is None:
+                worker.process.kill()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""
+Runs the fake API server (fake/server.py) for the tests of the modules of the steps and makes those modules importable.
+"""
+
+import os
+import sys
+import tempfile
+
+acceptance = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(acceptance, "features", "steps"), os.path.join(acceptance, "fake")]
+
+import kubeapi  # noqa: E402
+import server  # noqa: E402
+
+namespace = "test-namespace"
+
+
+class FakeCluster(object):
+    """
+    A fake API server with its kubeconfig, serving until stop() is called.
+    """
+
+    def __init__(self):
+        self.store = server.new_store(namespace)
+        self.server = server.serve(self.store)
+        self.directory = tempfile.TemporaryDirectory(prefix="fake-cluster-")
+        self.kubeconfig = os.path.join(self.directory.name, "kubeconfig")
+        server.write_kubeconfig(self.kubeconfig, self.server.server_port, namespace)
+
+    def client(self):
+        return kubeapi.KubeApi(kubeapi.KubeConfig([self.kubeconfig]))
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
@@ -0,0 +1,129 @@
+import json
+import shutil
+import subprocess
+import unittest
+
+from fake_cluster import FakeCluster
+
+import jq
+
+config_map = {
+    "apiVersion": "v1",
+    "kind": "ConfigMap",
+    "metadata": {"name": "config", "labels": {"app.kubernetes.io/name": "app", "tier": "backend"}},
+    "data": {"host": "example.com", "port": "5432", "flags": "a,b"},
+}
+
+expressions = [
+    ".metadata.name",
+    ".data",
+    ".data | keys",
+    ".data | length",
+    ".missing",
+    ".missing.deeper",
+    '.metadata.labels["app.kubernetes.io/name"]',
+    '.metadata.labels."app.kubernetes.io/name"',
+    ".data[]",
+    "[.data[] | select(startswith(\"ex\"))]",
+    ".items[] | .metadata.name",
+    "[.items[] | .metadata.labels.tier] | length",
+    ".items[0].metadata.name, .items[-1].metadata.name",
+    ".items[10]",
+    '.items[] | select(.metadata.labels.tier == "backend") | .metadata.name',
+    '[.items[] | select(.data.port != null and (.data.port | test("^[0-9]+$"))) | .data.port]',
+    '.items | map(.metadata.name | endswith("g"))',
+    '.data | has("host"), has("missing")',
+    '[.data.host, .data.port] | contains(["example", "54"])',
+    ".data | keys | length",
+    "true | length",
+    '[..|.port?]',
+    ".data.port < .data.host",
+    "1 < \"a\"",
+    "null < false",
+    "[1, 2] < [1, 3]",
+    ".data.host | not",
+    "(.data.missing | not) or false",
+    ".metadata.name?",
+    ".data.host | .[0]?",
+]
+
+
+class JqTest(unittest.TestCase):
+    """
+    Evaluates the expressions on the objects as returned by the API, the expected outputs are those of 'jq'.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cluster = FakeCluster()
+        try:
+            api = cluster.client()
+            api.apply(config_map)
+            api.apply({"apiVersion": "v1", "kind": "ConfigMap", "metadata": {"name": "other", "labels": {"tier": "frontend"}}, "data": {}})
+            cls.config_map = api.get("configmap", "config")
+            cls.config_maps = api.list("configmaps")
+        finally:
+            cluster.stop()
+
+    def test_fields(self):
+        self.assertEqual('"config"\n', jq.jq(self.config_map, ".metadata.name"))
+        self.assertEqual("config\n", jq.jq(self.config_map, ".metadata.name", raw=True))
+        self.assertEqual('{"host":"example.com","port":"5432","flags":"a,b"}\n', jq.jq(self.config_map, ".data", compact=True))
+        self.assertEqual('[\n  "a,b",\n  "5432"\n]\n', jq.jq(self.config_map, "[.data.flags, .data.port]"))
+
+    def test_missing_fields_are_null(self):
+        self.assertEqual("null\n", jq.jq(self.config_map, ".missing.deeper"))
+        self.assertEqual("null\n", jq.jq(self.config_maps, ".items[10].metadata"))
+
+    def test_iteration_and_select(self):
+        self.assertEqual("config\n", jq.jq(self.config_maps, '.items[] | select(.metadata.labels.tier == "backend") | .metadata.name', raw=True))
+        self.assertEqual('["5432"]\n', jq.jq(self.config_maps, '[.items[] | .data.port | select(. != null)]', compact=True))
+        self.assertEqual("2\n", jq.jq(self.config_maps, ".items | length"))
+        self.assertEqual("config\nother\n", jq.jq(self.config_maps, ".items[0].metadata.name, .items[-1].metadata.name", raw=True))
+
+    def test_functions(self):
+        self.assertEqual("true\n", jq.jq(self.config_map, '.data.host | test("^example\\\\.")'))
+        self.assertEqual("true\nfalse\n", jq.jq(self.config_map, '.data | has("host"), has("missing")'))
+        self.assertEqual("true\n", jq.jq(self.config_map, '[.metadata.labels.tier] | contains(["back"])'))
+        self.assertEqual('["flags","host","port"]\n', jq.jq(self.config_map, ".data | keys", compact=True))
+        self.assertEqual("[true,false]\n", jq.jq(self.config_maps, '.items | map(.metadata.name | endswith("g"))', compact=True))
+        self.assertEqual("false\n", jq.jq(self.config_map, ".data.host | not"))
+
+    def test_recursion_with_optional_access(self):
+        self.assertEqual('[null,null,null,"5432"]\n', jq.jq(self.config_map, "[..|.port?]", compact=True))
+
+    def test_comparisons_order_values_of_different_types(self):
+        for expression in ('1 < "a"', "null < false", "false < true", '"z" < []', "[1, 2] < [1, 3]", '[1, 2] > [1]'):
+            self.assertEqual("true\n", jq.jq(None, expression), expression)
+        self.assertEqual("false\n", jq.jq(None, '1 == "1"'))
+
+    def test_errors(self):
+        for expression in (".metadata.name | .x", ".metadata.name | keys", "true | length", ".data | .[0]", ".metadata.name[]",
+                           '.metadata.name | startswith(1)'):
+            with self.assertRaises(jq.JqError, msg=expression):
+                jq.jq(self.config_map, expression)
+        self.assertEqual("", jq.jq(self.config_map, ".metadata.name | .x?"))
+
+    def test_syntax_errors(self):
+        for expression in (".data |", ".data[", "unknown(.data)", ".data )"):
+            with self.assertRaises(jq.JqError, msg=expression):
+                jq.jq(self.config_map, expression)
+
+    @unittest.skipIf(shutil.which("jq") is None, "jq is not installed")
+    def test_same_output_as_jq(self):
+        for obj in (self.config_map, self.config_maps):
+            for expression in expressions:
+                with self.subTest(expression=expression, obj=obj["kind"]):
+                    expected = subprocess.run(["jq", "-c", expression], input=json.dumps(obj), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                              universal_newlines=True)
+                    try:
+                        actual = jq.jq(obj, expression, compact=True)
+                    except jq.JqError as err:
+                        self.assertNotEqual(0, expected.returncode, f"jq has not failed while the evaluator has: {err}")
+                        continue
+                    self.assertEqual(0, expected.returncode, f"jq has failed: {expected.stderr}")
+                    self.assertEqual(expected.stdout, actual)
+
+
+if __name__ == "__main__":
+    unittest.main()
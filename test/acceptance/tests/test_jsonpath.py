@@ -0,0 +1,93 @@
+import unittest
+
+from fake_cluster import FakeCluster
+
+from jsonpath import jsonpath
+
+deployment = {
+    "apiVersion": "apps/v1",
+    "kind": "Deployment",
+    "metadata": {"name": "app", "labels": {"app.kubernetes.io/name": "app", "replicas": "2"}},
+    "spec": {
+        "replicas": 2,
+        "paused": False,
+        "selector": {"matchLabels": {"app": "app"}},
+        "template": {
+            "metadata": {"labels": {"app": "app"}},
+            "spec": {
+                "containers": [
+                    {"name": "app", "image": "quay.io/app:1", "ports": [{"containerPort": 8080}],
+                     "env": [{"name": "HOST", "value": "example.com"}, {"name": "PORT", "value": "5432"}]},
+                    {"name": "sidecar", "image": "quay.io/sidecar:2", "ports": [{"containerPort": 9090}],
+                     "envFrom": [{"secretRef": {"name": "binding"}}]},
+                ],
+            },
+        },
+    },
+}
+
+
+class JsonPathTest(unittest.TestCase):
+    """
+    Evaluates the templates on the objects as returned by the API, the expected outputs are those of 'kubectl get -o jsonpath'.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cluster = FakeCluster()
+        try:
+            api = cluster.client()
+            api.apply(deployment)
+            for name, tier in (("first", "a"), ("second", "b"), ("third", "a")):
+                api.apply({"apiVersion": "v1", "kind": "ConfigMap", "metadata": {"name": name, "labels": {"tier": tier}}, "data": {"tier": tier}})
+            cls.deployment = api.get("deployment", "app")
+            cls.config_maps = api.list("configmaps")
+        finally:
+            cluster.stop()
+
+    def test_fields(self):
+        self.assertEqual("app", jsonpath(self.deployment, "{.metadata.name}"))
+        self.assertEqual("2", jsonpath(self.deployment, "{.spec.replicas}"))
+        self.assertEqual("false", jsonpath(self.deployment, "{.spec.paused}"))
+        self.assertEqual('{"app":"app"}', jsonpath(self.deployment, "{.spec.selector.matchLabels}"))
+
+    def test_missing_fields_are_empty(self):
+        self.assertEqual("", jsonpath(self.deployment, "{.status.missing}"))
+        self.assertEqual("", jsonpath(self.deployment, "{.spec.template.spec.containers[5].name}"))
+        self.assertEqual("", jsonpath(self.deployment, "{.metadata.name.deeper}"))
+
+    def test_escaped_dots(self):
+        self.assertEqual("app", jsonpath(self.deployment, r"{.metadata.labels.app\.kubernetes\.io/name}"))
+
+    def test_text_around_the_paths(self):
+        self.assertEqual("app=2 replicas", jsonpath(self.deployment, "{.metadata.name}={.spec.replicas} replicas"))
+
+    def test_indices_slices_and_wildcards(self):
+        containers = "{.spec.template.spec.containers"
+        self.assertEqual("app", jsonpath(self.deployment, containers + "[0].name}"))
+        self.assertEqual("sidecar", jsonpath(self.deployment, containers + "[-1].name}"))
+        self.assertEqual("app sidecar", jsonpath(self.deployment, containers + "[*].name}"))
+        self.assertEqual("app", jsonpath(self.deployment, containers + "[0:1].name}"))
+        self.assertEqual("first second third", jsonpath(self.config_maps, "{.items[*].metadata.name}"))
+
+    def test_recursive_descent(self):
+        self.assertEqual("8080 9090", jsonpath(self.deployment, "{..containerPort}"))
+        self.assertEqual("binding", jsonpath(self.deployment, "{..secretRef.name}"))
+
+    def test_filters(self):
+        containers = "{.spec.template.spec.containers"
+        self.assertEqual("quay.io/sidecar:2", jsonpath(self.deployment, containers + '[?(@.name=="sidecar")].image}'))
+        self.assertEqual("quay.io/app:1", jsonpath(self.deployment, containers + "[?(@.name!='sidecar')].image}"))
+        self.assertEqual("5432", jsonpath(self.deployment, containers + '[0].env[?(@.name=="PORT")].value}'))
+        self.assertEqual("sidecar", jsonpath(self.deployment, containers + "[?(@.envFrom)].name}"))
+        self.assertEqual("sidecar", jsonpath(self.deployment, containers + "[?(@.ports[0].containerPort > 8080)].name}"))
+        self.assertEqual("app sidecar", jsonpath(self.deployment, containers + "[?(@.ports[0].containerPort >= 8080)].name}"))
+        self.assertEqual("", jsonpath(self.deployment, containers + '[?(@.name=="missing")].image}'))
+        self.assertEqual("first third", jsonpath(self.config_maps, '{.items[?(@.metadata.labels.tier=="a")].metadata.name}'))
+
+    def test_filter_comparing_different_types_does_not_match(self):
+        self.assertEqual("", jsonpath(self.deployment, "{.spec.template.spec.containers[?(@.name > 1)].name}"))
+
+
+if __name__ == "__main__":
+    unittest.main()
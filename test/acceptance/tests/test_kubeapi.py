@@ -0,0 +1,133 @@
+import unittest
+
+from fake_cluster import FakeCluster, namespace
+
+import kubeapi
+
+crd = {
+    "apiVersion": "apiextensions.k8s.io/v1",
+    "kind": "CustomResourceDefinition",
+    "metadata": {"name": "backends.stable.example.com"},
+    "spec": {"group": "stable.example.com", "scope": "Namespaced",
+             "names": {"plural": "backends", "singular": "backend", "kind": "Backend", "shortNames": ["bk"]},
+             "versions": [{"name": "v1", "served": True, "storage": True}]},
+}
+
+
+def config_map(name, data, labels=None, ns=None):
+    metadata = {"name": name, "labels": labels or {}}
+    if ns is not None:
+        metadata["namespace"] = ns
+    return {"apiVersion": "v1", "kind": "ConfigMap", "metadata": metadata, "data": data}
+
+
+class KubeApiTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cluster = FakeCluster()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cluster.stop()
+
+    def setUp(self):
+        self.api = self.cluster.client()
+
+    def test_finds_resources_by_any_of_their_names(self):
+        for resource_type in ("deployments", "deployment", "Deployment", "deploy", "deployments.apps", "deployments.v1.apps"):
+            resource = self.api.resource(resource_type)
+            self.assertEqual(("apps", "v1", "deployments", "Deployment", True),
+                             (resource.group, resource.version, resource.name, resource.kind, resource.namespaced), resource_type)
+        self.assertFalse(self.api.resource("ns").namespaced)
+        self.assertEqual("/api/v1/namespaces/n/secrets/s", self.api.resource("secret").path("n", "s"))
+        self.assertEqual("/api/v1/namespaces", self.api.resource("namespace").path("n"))
+
+    def test_unknown_resource_type(self):
+        with self.assertRaises(kubeapi.ApiError) as raised:
+            self.api.resource("unknowns")
+        self.assertEqual(404, raised.exception.status)
+
+    def test_apply_reports_the_action(self):
+        obj = config_map("apply-action", {"key": "value"})
+        applied, action, resource = self.api.apply(obj)
+        self.assertEqual("created", action)
+        self.assertEqual("configmaps", resource.name)
+        self.assertEqual(namespace, applied["metadata"]["namespace"])
+        self.assertEqual("unchanged", self.api.apply(obj)[1])
+        _, action, _ = self.api.apply(config_map("apply-action", {"key": "changed"}))
+        self.assertEqual("configured", action)
+        self.assertEqual({"key": "changed"}, self.api.get("configmap", "apply-action")["data"])
+
+    def test_get_missing_object(self):
+        with self.assertRaises(kubeapi.ApiError) as raised:
+            self.api.get("configmap", "missing")
+        self.assertEqual(404, raised.exception.status)
+        self.assertEqual("NotFound", raised.exception.reason)
+
+    def test_list_with_selectors(self):
+        self.api.apply(config_map("list-a", {}, {"app": "list", "tier": "a"}))
+        self.api.apply(config_map("list-b", {}, {"app": "list", "tier": "b"}))
+        self.api.apply(config_map("list-c", {}, {"app": "other"}))
+        listed = self.api.list("configmaps", label_selector="app=list")
+        self.assertEqual("List", listed["kind"])
+        self.assertEqual(["list-a", "list-b"], [item["metadata"]["name"] for item in listed["items"]])
+        self.assertTrue(all(item["kind"] == "ConfigMap" and item["apiVersion"] == "v1" for item in listed["items"]))
+        self.assertEqual(["list-b"], [item["metadata"]["name"] for item in self.api.list("configmaps", label_selector="app=list,tier!=a")["items"]])
+        self.assertEqual(["list-c"], [item["metadata"]["name"] for item in self.api.list("configmaps", field_selector="metadata.name=list-c")["items"]])
+        self.assertEqual([], self.api.list("configmaps", namespace="default", label_selector="app=list")["items"])
+
+    def test_patch(self):
+        self.api.apply(config_map("patched", {"a": "1"}))
+        self.api.patch("configmap", "patched", {"data": {"b": "2"}})
+        self.assertEqual({"a": "1", "b": "2"}, self.api.get("configmap", "patched")["data"])
+        self.api.patch("configmap", "patched", [{"op": "remove", "path": "/data/a"}], patch_type="application/json-patch+json")
+        self.assertEqual({"b": "2"}, self.api.get("configmap", "patched")["data"])
+
+    def test_delete(self):
+        self.api.apply(config_map("deleted", {}))
+        resource, status = self.api.delete(config_map("deleted", {}))
+        self.assertEqual("configmaps", resource.name)
+        self.assertEqual("Success", status["status"])
+        with self.assertRaises(kubeapi.ApiError):
+            self.api.get("configmap", "deleted")
+
+    def test_custom_resource_is_discovered_once_its_crd_is_applied(self):
+        self.api.apply(crd)
+        backend = {"apiVersion": "stable.example.com/v1", "kind": "Backend", "metadata": {"name": "backend"}, "spec": {"host": "example.com"}}
+        _, action, resource = self.api.apply(backend)
+        self.assertEqual("created", action)
+        self.assertEqual("backend.stable.example.com", resource.qualified_kind())
+        self.assertEqual("example.com", self.api.get("bk", "backend")["spec"]["host"])
+
+    def test_apply_many_applies_the_prerequisites_first(self):
+        objects = [config_map("in-new-namespace", {}, ns="apply-many"),
+                   {"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": "apply-many"}},
+                   {"apiVersion": "example.com/v1", "kind": "Unknown", "metadata": {"name": "unknown"}}]
+        results = self.api.apply_many(objects)
+        self.assertEqual("created", results[0][1])
+        self.assertEqual("apply-many", results[0][0]["metadata"]["namespace"])
+        self.assertEqual("created", results[1][1])
+        self.assertIsInstance(results[2], kubeapi.ApiError)
+        self.assertEqual(404, results[2].status)
+
+    def test_watch_from_resource_version(self):
+        resource_version = self.api.list("configmaps")["metadata"]["resourceVersion"]
+        self.api.apply(config_map("watched", {"a": "1"}))
+        self.api.apply(config_map("not-watched", {}))
+        self.api.patch("configmap", "watched", {"data": {"a": "2"}})
+        events = []
+        for event in self.api.watch("configmaps", name="watched", resource_version=resource_version, timeout=1):
+            if event["type"] != "BOOKMARK":
+                events.append((event["type"], event["object"]["data"]["a"]))
+            if len(events) == 2:
+                break
+        self.assertEqual([("ADDED", "1"), ("MODIFIED", "2")], events)
+
+    def test_load_documents(self):
+        documents = kubeapi.load_documents("a: 1\n---\n---\nkind: List\nitems:\n- b: 2\n- c: 3\n")
+        self.assertEqual([{"a": 1}, {"b": 2}, {"c": 3}], documents)
+
+
+if __name__ == "__main__":
+    unittest.main()
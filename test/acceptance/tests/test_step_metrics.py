@@ -0,0 +1,38 @@
+import importlib
+import threading
+import unittest
+
+from types import SimpleNamespace
+
+# makes the modules of the steps importable
+importlib.import_module("fake_cluster")
+
+import step_metrics  # noqa: E402
+
+
+class StepMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        step_metrics.background = step_metrics.BackgroundMetrics()
+        step_metrics.recorded = []
+
+    def test_commands_of_other_threads_are_not_charged_to_the_step(self):
+        step = SimpleNamespace(location="a.feature:1", keyword="Given", name="something", status=SimpleNamespace(name="passed"), duration=2)
+        step_metrics.start(step, "scenario")
+        step_metrics.command_ran(0.5)
+        step_metrics.waited(1)
+        background = threading.Thread(target=lambda: (step_metrics.command_ran(3), step_metrics.waited(4)))
+        background.start()
+        background.join()
+        metrics = step_metrics.finish(step)
+        self.assertEqual((1, 0.5, 1), (metrics.commands, metrics.command_time, metrics.poll_wait))
+        self.assertEqual({"commands": 1, "command_time": 3, "poll_wait": 4}, step_metrics.background.to_dict())
+
+    def test_commands_between_the_steps_are_background(self):
+        step_metrics.command_ran(1)
+        self.assertIsNone(step_metrics.current())
+        self.assertEqual(1, step_metrics.background.commands)
+
+
+if __name__ == "__main__":
+    unittest.main()
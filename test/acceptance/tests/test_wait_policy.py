@@ -0,0 +1,48 @@
+import importlib
+import os
+import time
+import unittest
+
+from unittest import mock
+
+# makes the modules of the steps importable
+importlib.import_module("fake_cluster")
+
+import polling2  # noqa: E402
+import wait_policy  # noqa: E402
+
+from environment import ctx  # noqa: E402
+
+
+class ReplayTest(unittest.TestCase):
+    """
+    Replaying cassettes compresses the waits between polls, the polls must not spin through their real timeouts instead.
+    """
+
+    def setUp(self):
+        patches = [mock.patch.dict(os.environ, {"TEST_ACCEPTANCE_CASSETTES": "replay", "TEST_ACCEPTANCE_CASSETTES_DELAY": "0"}),
+                   mock.patch.object(ctx, "backend", "cli"),
+                   mock.patch.object(ctx, "wait_profile", "default")]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_replayed_poll_ends_long_before_its_timeout(self):
+        started = time.monotonic()
+        with self.assertRaises(polling2.TimeoutException):
+            wait_policy.poll(lambda: False, timeout=300, scale_timeout=False)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_replayed_poll_makes_as_many_attempts_as_a_real_one(self):
+        count = sum(1 for _ in wait_policy.attempts(300, max_interval=5, scale_timeout=False))
+        # 300s at intervals growing from 1s up to 5s (give or take the jitter)
+        self.assertGreater(count, 50)
+        self.assertLess(count, 80)
+
+    def test_replayed_poll_returns_once_the_condition_holds(self):
+        values = iter([None, None, "done"])
+        self.assertEqual("done", wait_policy.poll(lambda: next(values), timeout=5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import importlib
+import os
+import threading
+import time
+import unittest
+
+from unittest import mock
+
+from fake_cluster import FakeCluster, namespace
+
+import informer
+import kubeapi
+
+from environment import ctx
+
+cluster = None
+patches = []
+
+
+def setUpModule():
+    global cluster
+    cluster = FakeCluster()
+    patches.extend([mock.patch.dict(os.environ, {"KUBECONFIG": cluster.kubeconfig}),
+                    mock.patch.dict(kubeapi.clients, clear=True),
+                    mock.patch.object(ctx, "backend", "api")])
+    for patch in patches:
+        patch.start()
+
+
+def tearDownModule():
+    for patch in reversed(patches):
+        patch.stop()
+    cluster.stop()
+
+
+def config_map(value):
+    return {"apiVersion": "v1", "kind": "ConfigMap", "metadata": {"name": "watched", "namespace": namespace}, "data": {"value": value}}
+
+
+class WatchExpiryTest(unittest.TestCase):
+    """
+    A watch expiring (410 Gone) while the cluster is being watched is recovered by listing again and watching
+    from the resourceVersion of that list, so a change made after the expiry is still seen.
+    """
+
+    def setUp(self):
+        self.api = kubeapi.client()
+        self.api.apply(config_map("1"))
+        # the lists of config maps made by the code under test
+        self.lists = []
+        self.listed = threading.Condition()
+        list_function = kubeapi.KubeApi.list
+
+        def list_counted(api, resource_type, *args, **kwargs):
+            result = list_function(api, resource_type, *args, **kwargs)
+            with self.listed:
+                self.lists.append(result["metadata"]["resourceVersion"])
+                self.listed.notify_all()
+            return result
+        patch = mock.patch.object(kubeapi.KubeApi, "list", list_counted)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def wait_for_lists(self, count):
+        with self.listed:
+            self.assertTrue(self.listed.wait_for(lambda: len(self.lists) >= count, timeout=10), f"listed {len(self.lists)} time(s)")
+
+    def expire_watches(self):
+        # let the watch start before its resourceVersion expires
+        time.sleep(0.5)
+        cluster.store.compact()
+
+    def test_waiter_lists_again(self):
+        # the waiter needs the kubeconfig of the fake cluster as soon as it is imported
+        waiter = importlib.import_module("waiter")
+        waited = {}
+        thread = threading.Thread(target=lambda: waited.update(obj=waiter.Waiter("configmap", "watched", namespace).wait(
+            lambda obj: obj is not None and obj["data"]["value"] == "2", timeout=20)))
+        thread.start()
+        self.wait_for_lists(1)
+        self.expire_watches()
+        self.wait_for_lists(2)
+        self.api.apply(config_map("2"))
+        thread.join(20)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual("2", waited["obj"]["data"]["value"])
+        self.assertEqual(2, len(self.lists))
+        self.assertNotEqual(self.lists[0], self.lists[1])
+
+    def test_informer_lists_again(self):
+        cache = informer.Informer(namespace)
+        self.addCleanup(cache.stop)
+        self.assertEqual("1", cache.get("configmap", "watched")["data"]["value"])
+        self.wait_for_lists(1)
+        self.expire_watches()
+        self.wait_for_lists(2)
+        self.api.apply(config_map("2"))
+        deadline = time.monotonic() + 10
+        while cache.get("configmap", "watched")["data"]["value"] != "2":
+            self.assertLess(time.monotonic(), deadline, "the informer has not seen the change made after the watch expired")
+            time.sleep(0.1)
+        self.assertEqual(2, len(self.lists))
+        self.assertNotEqual(self.lists[0], self.lists[1])
+
+
+if __name__ == "__main__":
+    unittest.main()